@@ -0,0 +1,59 @@
+"""
+Benchmark: per-cell ``df.map(safe_convert)`` vs column-wise
+``unwrap_numpy_scalars`` on a vendor-price-like sheet.
+
+Usage: python benchmarks/bench_cleaning.py [rows] [vendors]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from inspire_core.cleaning import safe_convert, unwrap_numpy_scalars
+
+
+def make_sheet(rows, vendors, seed=0):
+    rng = np.random.default_rng(seed)
+    data = {
+        "SCOPE": [f"Item {i}" for i in range(rows)],
+        "UOM": rng.choice(["Lot", "Unit", "Month"], rows),
+    }
+    for v in range(vendors):
+        prices = rng.integers(1_000, 5_000_000, rows).astype(float)
+        prices[rng.random(rows) < 0.05] = np.nan   # vendor tidak ikut
+        data[f"VENDOR {v + 1}"] = prices
+    data["NOTE"] = ["incl. PPN" if r < 0.5 else 1 for r in rng.random(rows)]   # kolom campuran
+    return pd.DataFrame(data)
+
+
+def best_of(fn, repeat=5):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    vendors = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+
+    df = make_sheet(rows, vendors).convert_dtypes()
+    pd.testing.assert_frame_equal(df.map(safe_convert), unwrap_numpy_scalars(df))
+
+    t_map = best_of(lambda: df.map(safe_convert))
+    t_vec = best_of(lambda: unwrap_numpy_scalars(df))
+
+    print(f"{rows:,} rows x {df.shape[1]} cols ({df.size:,} cells)")
+    print(f"  df.map(safe_convert)    : {t_map * 1000:9.1f} ms")
+    print(f"  unwrap_numpy_scalars(df): {t_vec * 1000:9.1f} ms  ({t_map / t_vec:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
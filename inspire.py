@@ -0,0 +1,149 @@
+"""
+Headless batch runner for the analysis modules (no Streamlit session).
+
+Usage:
+    python inspire.py run tco-by-year --in bids/ --out reports/ [--jobs N] [--verbose]
+    python inspire.py list
+
+Every tender under ``--in`` is one workbook (one folder of round workbooks
+for the round-by-round modules). Tenders are processed in parallel worker
+processes; each writes the module's Super Download workbook(s) - the same
+stages and sheet builders as the page, with every sheet and no filter - to
+``--out/<tender>/``. With ``--verbose`` every written sheet is reported.
+"""
+
+import argparse
+import importlib
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from inspire_core.batch import find_tenders, run_batch
+
+
+MODULES = {
+    "tco-by-year": "pages.TCO_by_Year",
+    "tco-by-region": "pages.TCO_by_Region",
+    "tco-by-year-region": "pages.TCO_by_Year_Region",
+    "tco-by-round": "pages.TCO_by_Round",
+    "upl-comparison": "pages.UPL_Comparison",
+    "upl-comparison-round": "pages.UPL_Comparison_Round",
+    "standard-deviation": "pages.Standard_Deviation",
+}
+
+
+def load_batch(module):
+    return importlib.import_module(MODULES[module]).batch
+
+
+def report_sheet(tender, file_name, sheet, done, total):
+    # Progress per sheet (--verbose); satu write per baris supaya output
+    # beberapa worker tidak tercampur di tengah baris
+    sys.stdout.write(f"    {tender}: {file_name} [{done}/{total}] {sheet}\n")
+    sys.stdout.flush()
+
+
+def run_tender(module, tender, out_dir, verbose=False):
+    # Dijalankan di worker process -> harus top-level supaya bisa di-pickle
+    batch = load_batch(module)
+    started = time.perf_counter()
+
+    target = os.path.join(out_dir, tender.name)
+    os.makedirs(target, exist_ok=True)
+
+    written = []
+    source = tender.paths if batch.rounds else tender.paths[0]
+    on_sheet = partial(report_sheet, tender.name) if verbose else None
+    for file_name, data in run_batch(batch, source, on_sheet=on_sheet):
+        path = os.path.join(target, file_name)
+        with open(path, "wb") as f:
+            f.write(data)
+        written.append(path)
+    return written, time.perf_counter() - started
+
+
+def _pool(jobs):
+    # "fork": worker mewarisi modul yang sudah di-import (pages, pandas, ...)
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if "fork" in methods else None)
+    return ProcessPoolExecutor(max_workers=jobs, mp_context=context)
+
+
+def run(module, in_dir, out_dir, jobs=None, verbose=False):
+    batch = load_batch(module)
+    tenders = find_tenders(in_dir, rounds=batch.rounds)
+    if not tenders:
+        print(f"No workbooks found under {in_dir}", file=sys.stderr)
+        return 1
+
+    jobs = max(1, min(jobs or os.cpu_count() or 1, len(tenders)))
+    if jobs > 1:
+        # Paralel per tender; parse di dalam tender tidak perlu pool lagi
+        os.environ.setdefault("INSPIRE_PARSE_WORKERS", "1")
+
+    print(f"{module}: {len(tenders)} tender(s), {jobs} worker(s)")
+    started = time.perf_counter()
+    failed = 0
+
+    def report(done, tender, result):
+        # ``result``: (file yang ditulis, detik) atau exception dari tender itu
+        nonlocal failed
+        if isinstance(result, Exception):
+            failed += 1
+            print(f"[{done}/{len(tenders)}] {tender.name}: FAILED ({type(result).__name__}: {result})", file=sys.stderr)
+        else:
+            written, seconds = result
+            print(f"[{done}/{len(tenders)}] {tender.name}: {len(written)} workbook(s) in {seconds:.1f}s")
+
+    if jobs == 1:
+        for done, tender in enumerate(tenders, start=1):
+            try:
+                result = run_tender(module, tender, out_dir, verbose)
+            except Exception as e:
+                result = e
+            report(done, tender, result)
+    else:
+        with _pool(jobs) as pool:
+            futures = {pool.submit(run_tender, module, t, out_dir, verbose): t for t in tenders}
+            for done, future in enumerate(as_completed(futures), start=1):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = e
+                report(done, futures[future], result)
+
+    print(f"Done in {time.perf_counter() - started:.1f}s: {len(tenders) - failed} ok, {failed} failed -> {out_dir}")
+    return 1 if failed else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="inspire", description="Run analysis modules without the UI.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_cmd = commands.add_parser("run", help="run a module over a folder of tenders")
+    run_cmd.add_argument("module", choices=sorted(MODULES))
+    run_cmd.add_argument("--in", dest="in_dir", required=True, help="folder with the tender workbooks")
+    run_cmd.add_argument("--out", dest="out_dir", required=True, help="folder for the Excel reports")
+    run_cmd.add_argument("--jobs", type=int, default=None, help="worker processes (default: CPU count)")
+    run_cmd.add_argument("--verbose", "-v", action="store_true", help="report every written sheet")
+
+    commands.add_parser("list", help="list the available modules")
+
+    args = parser.parse_args(argv)
+    if args.command == "list":
+        for name in sorted(MODULES):
+            print(name)
+        return 0
+
+    if not os.path.isdir(args.in_dir):
+        parser.error(f"--in {args.in_dir} is not a folder")
+    return run(args.module, args.in_dir, args.out_dir, args.jobs, args.verbose)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""
+Shared cleaning, analysis and export helpers for the inspire analysis pages.
+
+Everything here is UI-free (no Streamlit imports) so the same code path can be
+cached once in the pages and reused outside the app.
+"""
+
+from inspire_core.formatting import (
+    round_half_up,
+    format_rupiah,
+    highlight_total_row,
+    highlight_total_row_v2,
+    highlight_1st_2nd_vendor,
+    highlight_rank_summary,
+)
+from inspire_core.display import (
+    rupiah_strings,
+    rupiah_formatter,
+    rupiah_formats,
+    row_styles,
+    total_row_styles,
+    total_row_styles_v2,
+    rank_summary_styles,
+    vendor_rank_styles,
+)
+from inspire_core.cleaning import (
+    safe_convert,
+    unwrap_numpy_scalars,
+    drop_blank,
+    promote_header,
+    normalize_dtypes,
+    clean_dataframe,
+)
+from inspire_core.tables import (
+    split_tables,
+    header_scores,
+    title_rows,
+    find_header_row,
+)
+from inspire_core.analysis import (
+    extract_round_number,
+    rank_bids,
+    add_bid_analysis,
+    add_price_movement,
+    ordinal,
+    summary_deviation,
+)
+from inspire_core.totals import (
+    mark_totals,
+    total_row_mask,
+    drop_total_rows,
+    add_group_totals,
+)
+from inspire_core.ingest import (
+    resolve_engine,
+    read_excel_sheets,
+    parse_workbooks,
+)
+from inspire_core.parse_cache import (
+    ParseCache,
+    parse_cache,
+    read_workbook,
+    read_workbooks,
+)
+from inspire_core.rounds import (
+    RoundStore,
+)
+from inspire_core.progress import (
+    sheet_progress,
+    clean_progress,
+    upload_summary,
+)
+from inspire_core.paging import (
+    TableWindow,
+    page_rows,
+    filter_rows,
+    sort_rows,
+    page_count,
+    table_window,
+)
+from inspire_core.deferred import (
+    ExportCache,
+    export_cache,
+    deferred,
+    lazy_export,
+)
+from inspire_core.pipeline import (
+    Stage,
+    Pipeline,
+    PipelineRun,
+)
+from inspire_core.batch import (
+    SuperDownload,
+    Batch,
+    Tender,
+    sheet_frames,
+    build_super_download,
+    run_batch,
+    find_tenders,
+)
+from inspire_core.currency import (
+    RateTable,
+    parse_amount,
+    read_rates,
+    default_rates,
+    convert_frame,
+)
+from inspire_core.export import (
+    get_excel_download,
+    get_excel_download_tables,
+    get_excel_download_highlight,
+    get_excel_download_highlight_total,
+    get_excel_download_highlight_summary,
+    get_excel_download_highlight_1st_2nd_lowest,
+    get_excel_download_with_highlight,
+    get_excel_download_with_highlight_v2,
+    get_excel_download_highlight_price_trend,
+)
+from inspire_core.multi_sheet import (
+    SheetPlan,
+    plan_ranking_sheet,
+    plan_year_region_sheet,
+    plan_round_sheet,
+    plan_deviation_sheet,
+    build_multi_sheet_excel,
+)
@@ -0,0 +1,228 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+
+def extract_round_number(name):
+    """
+    Extracts the round number from various round naming formats:
+    - 'L2R4' -> 4
+    - 'Round 3' -> 3
+    - '4' -> 4
+    If no number is found, returns a large number to push it to the end.
+    """
+    name = str(name)
+
+    # Coba cari pola R<number> dulu (untuk L2R4)
+    m = re.search(r'R(\d+)', name)
+    if m:
+        return int(m.group(1))
+
+    # Kalau tidak ada, ambil angka pertama yang muncul di string
+    m2 = re.search(r'\d+', name)
+    if m2:
+        return int(m2.group())
+
+    # Jika tidak ketemu angka sama sekali
+    return 9999
+
+
+def rank_bids(prices):
+    """
+    Bid ranking kernel over a (line items x vendors) float matrix where NaN
+    means "no bid". Every row is sorted once; from the sorted row:
+    - lowest = first value, second = first value strictly greater than lowest,
+    - median = mean of the middle value(s) of the valid bids.
+    Ties are explicit: vendors sharing the lowest price all count as 1st, so
+    the 2nd lowest is the next *distinct* price; the reported vendor for a
+    price is the first one in column order. Rows without a (2nd) bid get
+    NaN values and vendor position -1.
+    """
+    prices = np.asarray(prices, dtype=float)
+    if prices.shape[1] == 0:
+        prices = np.full((prices.shape[0], 1), np.nan)
+    rows = np.arange(prices.shape[0])
+
+    ordered = np.sort(prices, axis=1)           # NaN otomatis di belakang
+    n_valid = (~np.isnan(prices)).sum(axis=1)
+    has_bid = n_valid > 0
+
+    lowest = ordered[:, 0]
+
+    above = ordered > lowest[:, None]
+    has_second = above.any(axis=1)
+    second = np.where(has_second, ordered[rows, above.argmax(axis=1)], np.nan)
+
+    lo = np.maximum(n_valid - 1, 0) // 2
+    hi = np.minimum(n_valid // 2, prices.shape[1] - 1)
+    median = np.where(has_bid, (ordered[rows, lo] + ordered[rows, hi]) / 2, np.nan)
+
+    first_vendor = np.where(has_bid, (prices == lowest[:, None]).argmax(axis=1), -1)
+    second_vendor = np.where(has_second, (prices == second[:, None]).argmax(axis=1), -1)
+
+    return {
+        "lowest": lowest,
+        "second": second,
+        "median": median,
+        "first_vendor": first_vendor,
+        "second_vendor": second_vendor,
+    }
+
+
+def add_bid_analysis(df, vendor_cols):
+    """
+    Appends the Bid & Price Analysis columns to a copy of ``df``:
+    1st/2nd Lowest and Vendor, Gap 1 to 2 (%), Median Price and
+    '<vendor> to Median (%)'. Zero prices mean the vendor did not bid.
+    """
+    df = df.copy()
+    vendor_cols = list(vendor_cols)
+
+    # Penanganan untuk 0 value
+    vendor_values = df[vendor_cols].replace(0, pd.NA)
+    vendor_values = vendor_values.apply(pd.to_numeric, errors="coerce")
+
+    ranks = rank_bids(vendor_values.to_numpy(dtype=float, na_value=np.nan))
+    vendor_names = np.array(vendor_cols + [None], dtype=object)   # index -1 -> None
+
+    # Harga integer semua (tanpa kosong) -> 1st Lowest tetap int64, seperti DataFrame.min
+    lowest = ranks["lowest"]
+    if len(df) and len(vendor_cols) and all(isinstance(t, np.dtype) and t.kind in "iu" for t in vendor_values.dtypes):
+        lowest = lowest.astype("int64")
+
+    df["1st Lowest"] = lowest
+    df["1st Vendor"] = vendor_names[ranks["first_vendor"]]
+    df["2nd Lowest"] = ranks["second"]
+    df["2nd Vendor"] = vendor_names[ranks["second_vendor"]]
+
+    # Hitung gap antara 1st dan 2nd lowest (%)
+    df["Gap 1 to 2 (%)"] = ((df["2nd Lowest"] - df["1st Lowest"]) / df["1st Lowest"] * 100).round(2)
+
+    # Hitung median price
+    df["Median Price"] = ranks["median"]
+
+    # Hitung selisih tiap vendor dengan median (%) -> satu operasi untuk semua vendor
+    to_median = (
+        df[vendor_cols].sub(df["Median Price"], axis=0)
+        .div(df["Median Price"], axis=0)
+        .mul(100)
+        .round(2)
+    )
+    to_median.columns = [f"{v} to Median (%)" for v in vendor_cols]
+    df[to_median.columns] = to_median
+
+    return df
+
+
+def _valid_steps(prices):
+    # Bandingkan tiap harga valid dengan harga valid sebelumnya (NaN di antaranya dilewati)
+    prev = pd.DataFrame(prices).ffill(axis=1).shift(1, axis=1).to_numpy()
+    step = ~np.isnan(prices) & ~np.isnan(prev)
+    return prev, step
+
+
+def add_price_movement(df, round_cols, reduction="first_minus_last"):
+    """
+    Appends the Price Movement columns computed over the (line items x
+    rounds) price matrix, with empty rounds skipped:
+    - PRICE REDUCTION (VALUE / %): first vs last valid price
+      (``reduction="first_minus_last"`` or ``"last_minus_first"``),
+    - PRICE TREND: Consistently Down / Up, No Change, Fluctuating,
+      Insufficient Data (< 2 prices),
+    - STANDARD DEVIATION and PRICE STABILITY INDEX (%) = range / mean.
+    """
+    df = df.copy()
+    prices = df[round_cols].to_numpy(dtype=float, na_value=np.nan)
+    rows = np.arange(prices.shape[0])
+
+    valid = ~np.isnan(prices)
+    n_valid = valid.sum(axis=1)
+
+    # Harga valid pertama & terakhir per baris
+    first = prices[rows, valid.argmax(axis=1)]
+    last = prices[rows, prices.shape[1] - 1 - valid[:, ::-1].argmax(axis=1)]
+
+    if reduction == "first_minus_last":
+        reduction_value = first - last
+    elif reduction == "last_minus_first":
+        reduction_value = last - first
+    else:
+        raise ValueError(f"Unknown reduction '{reduction}'")
+
+    enough = n_valid >= 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        df["PRICE REDUCTION (VALUE)"] = np.where(enough, reduction_value, np.nan)
+        df["PRICE REDUCTION (%)"] = np.round(np.where(enough, reduction_value / first * 100, np.nan), 2)
+
+    # PRICE TREND: cek semua langkah antar harga valid sekaligus
+    prev, step = _valid_steps(prices)
+    all_down = np.where(step, prices < prev, True).all(axis=1)
+    all_up = np.where(step, prices > prev, True).all(axis=1)
+    all_same = np.where(step, prices == prev, True).all(axis=1)
+
+    df["PRICE TREND"] = np.select(
+        [n_valid <= 1, all_down, all_up, all_same],
+        ["Insufficient Data", "Consistently Down", "Consistently Up", "No Change"],
+        default="Fluctuating"
+    ).astype(object)
+
+    # PRICE STABILITY INDEX (PSI)
+    df["STANDARD DEVIATION"] = df[round_cols].std(axis=1, ddof=0).round(4)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        masked = np.where(valid, prices, 0.0)
+        mean = masked.sum(axis=1) / n_valid
+        spread = np.where(valid, prices, -np.inf).max(axis=1) - np.where(valid, prices, np.inf).min(axis=1)
+        df["PRICE STABILITY INDEX (%)"] = np.round(np.where(n_valid > 0, spread / mean * 100, np.nan), 2)
+
+    return df
+
+
+def ordinal(n):
+    if 10 <= n % 100 <= 20:
+        suf = "th"
+    else:
+        suf = {1: "st", 2: "nd", 3: "rd"}.get(n % 10, "th")
+    return f"{n}{suf}"
+
+
+def summary_deviation(df_long, key_cols, vendor_col="Vendor", price_col="[PRICE]", rank_col="Rank"):
+    """
+    One row per item (``key_cols``, sorted like groupby) with the vendors in
+    rank order and each vendor's deviation (%) to the 1st:
+    keys, 1st Rank, Best Price, 2nd Rank, Dev. 2nd to 1st (%), 3rd Rank, ...
+    Equal ranks keep the vendor column order (stable sort). A Best Price
+    of 0 gives NaN deviations.
+    """
+    group_id = df_long.groupby(key_cols, sort=True).ngroup()
+
+    df_sorted = (
+        df_long.assign(__group=group_id)
+        .loc[group_id >= 0]     # key NaN tidak ikut (sama seperti groupby)
+        .sort_values(["__group", rank_col], kind="stable")
+    )
+    if df_sorted.empty:
+        return pd.DataFrame()
+    df_sorted["__pos"] = df_sorted.groupby("__group").cumcount()
+
+    keys = df_sorted.groupby("__group")[key_cols].first()
+    vendors = df_sorted.pivot(index="__group", columns="__pos", values=vendor_col)
+    prices = df_sorted.pivot(index="__group", columns="__pos", values=price_col)
+
+    # Best Price diambil langsung (bukan dari pivot) supaya dtype harga tetap
+    base_price = df_sorted.loc[df_sorted["__pos"] == 0].set_index("__group")[price_col]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        deviation = prices.sub(base_price, axis=0).div(base_price, axis=0).mul(100)
+    deviation = deviation.where(base_price != 0)
+
+    columns = {col: keys[col] for col in key_cols}
+    columns["1st Rank"] = vendors[0]
+    columns["Best Price"] = base_price
+
+    for pos in vendors.columns[1:]:
+        r = pos + 1
+        columns[f"{ordinal(r)} Rank"] = vendors[pos]
+        columns[f"Dev. {ordinal(r)} to 1st (%)"] = deviation[pos]
+
+    return pd.DataFrame(columns).reset_index(drop=True)
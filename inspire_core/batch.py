@@ -0,0 +1,108 @@
+"""
+Headless runs of the analysis modules, without a Streamlit session.
+
+A page describes its Super Download as a ``Batch``: how one tender is read
+into pipeline sources, and which pipeline stage fills which sheet of which
+workbook. A tender is a single workbook, or a folder of round workbooks for
+the round-by-round modules (``rounds=True``)::
+
+    batch = Batch(pipeline, read_tender, [SUPER_DOWNLOAD])
+    for file_name, data in run_batch(batch, "bids/tender-01.xlsx"):
+        ...
+
+``run_batch`` runs the same stages as the page and builds each workbook with
+``build_multi_sheet_excel``, with every sheet selected and no UI filter.
+``on_sheet(file_name, sheet, done, total)`` reports each written sheet.
+"""
+
+import os
+from collections import namedtuple
+from functools import partial
+
+from inspire_core.analysis import extract_round_number
+from inspire_core.multi_sheet import build_multi_sheet_excel
+
+
+EXCEL_EXTENSIONS = (".xlsx", ".xls")
+
+# sheets: nama sheet -> nama stage, atau (nama stage, fungsi) kalau hasil
+# stage masih diolah dulu sebelum ditulis (mis. NaN -> "")
+SuperDownload = namedtuple("SuperDownload", ["file_name", "sheets", "plan_sheet", "options"])
+
+Batch = namedtuple("Batch", ["pipeline", "sources", "downloads", "rounds"], defaults=[False])
+
+Tender = namedtuple("Tender", ["name", "paths"])
+
+
+def _stage_of(spec):
+    return spec[0] if isinstance(spec, tuple) else spec
+
+
+def sheet_frames(download, run):
+    # {sheet: DataFrame} dari hasil stage, dalam urutan sheet
+    frames = {}
+    for sheet, spec in download.sheets.items():
+        df = run[_stage_of(spec)]
+        frames[sheet] = spec[1](df) if isinstance(spec, tuple) else df
+    return frames
+
+
+def build_super_download(download, frames, selected_sheets=None, on_sheet=None):
+    # Workbook Super Download dari ``frames`` (default: semua sheet);
+    # ``on_sheet(sheet, done, total)`` dipanggil tiap sheet selesai ditulis
+    selected_sheets = list(download.sheets if selected_sheets is None else selected_sheets)
+    return build_multi_sheet_excel(
+        selected_sheets, frames, download.plan_sheet, on_sheet=on_sheet, **download.options
+    )
+
+
+def run_batch(batch, tender, on_sheet=None):
+    """
+    ``[(file_name, workbook bytes), ...]`` for one tender: a workbook path,
+    or the list of round workbook paths when ``batch.rounds``.
+    """
+    targets = sorted({_stage_of(spec) for d in batch.downloads for spec in d.sheets.values()})
+    run = batch.pipeline.run(targets, **batch.sources(tender))
+    return [
+        (d.file_name, build_super_download(
+            d, sheet_frames(d, run),
+            on_sheet=None if on_sheet is None else partial(on_sheet, d.file_name),
+        ))
+        for d in batch.downloads
+    ]
+
+
+def _is_workbook(name):
+    return name.lower().endswith(EXCEL_EXTENSIONS) and not name.startswith("~$")
+
+
+def round_order(path):
+    # Urutan round dari nama file (L2R1, L2R2, ...), lalu nama file
+    name = os.path.splitext(os.path.basename(path))[0]
+    return extract_round_number(name), name
+
+
+def find_tenders(root, rounds=False):
+    """
+    Tenders under ``root``, sorted by name. Without ``rounds`` every workbook
+    is a tender; with ``rounds`` every folder holding workbooks is one (its
+    workbooks are the rounds, in round order). A tender's name is its path
+    relative to ``root`` without the extension.
+    """
+    tenders = []
+    for folder, dirs, files in os.walk(root):
+        dirs.sort()
+        workbooks = sorted(os.path.join(folder, f) for f in files if _is_workbook(f))
+        if not workbooks:
+            continue
+
+        if rounds:
+            name = os.path.relpath(folder, root)
+            name = os.path.basename(os.path.abspath(root)) if name == os.curdir else name
+            tenders.append(Tender(name, sorted(workbooks, key=round_order)))
+        else:
+            tenders.extend(
+                Tender(os.path.splitext(os.path.relpath(path, root))[0], [path])
+                for path in workbooks
+            )
+    return sorted(tenders)
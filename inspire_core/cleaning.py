@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+
+
+def safe_convert(x):
+    # Bersihkan tipe numpy (np.int64, np.float64, ...) jadi tipe Python biasa
+    if isinstance(x, (np.generic, np.number)):
+        return x.item()
+    return x
+
+
+def _unwrap_column(s):
+    dtype = s.dtype
+
+    # Nullable Int*: tanpa NA -> int64, ada NA -> float64 (NA jadi NaN)
+    if isinstance(dtype, pd.api.extensions.ExtensionDtype) and pd.api.types.is_integer_dtype(dtype):
+        return s.astype("float64" if s.hasnans else "int64")
+    if pd.api.types.is_float_dtype(dtype):
+        return s.astype("float64")
+    if pd.api.types.is_integer_dtype(dtype):
+        return s.astype("int64")
+
+    # boolean: tanpa NA -> bool, ada NA -> object (True/False/<NA>)
+    if pd.api.types.is_bool_dtype(dtype):
+        return s.astype(object if s.hasnans else "bool")
+
+    # string -> object berisi str / <NA>
+    if pd.api.types.is_string_dtype(dtype) and dtype != object:
+        return s.astype(object)
+
+    if pd.api.types.is_datetime64_any_dtype(dtype) or pd.api.types.is_timedelta64_dtype(dtype):
+        return s
+
+    # Kolom object campuran (teks + angka) & tipe lain: tetap per-cell
+    return s.map(safe_convert)
+
+
+def unwrap_numpy_scalars(df):
+    """
+    Column-wise equivalent of ``df.map(safe_convert)`` after ``convert_dtypes``:
+    numeric / boolean / string columns are cast per dtype in one call each,
+    only mixed object columns still go through ``safe_convert`` per cell.
+    """
+    if df.empty:
+        return df.copy()
+
+    columns = {i: _unwrap_column(df.iloc[:, i]) for i in range(df.shape[1])}
+    out = pd.DataFrame(columns, index=df.index)
+    out.columns = df.columns
+    return out
+
+
+def drop_blank(df):
+    # Kosongkan cell whitespace, lalu buang baris & kolom yang kosong semua
+    df_clean = df.replace(r'^\s*$', np.nan, regex=True)
+    return df_clean.dropna(how="all", axis=0).dropna(how="all", axis=1)
+
+
+def promote_header(df, mode="all"):
+    """
+    Header handling for sheets exported with an offset table:
+    - mode="all": if every column is 'Unnamed', use the first row as header,
+      otherwise drop the 'Unnamed' columns.
+    - mode="any": if any column is 'Unnamed', use the first row as header.
+    """
+    cols = df.columns.astype(str)
+
+    if mode == "any":
+        if any("Unnamed" in c for c in cols):
+            df = df.copy()
+            df.columns = df.iloc[0]
+            df = df[1:].reset_index(drop=True)
+        return df
+
+    # Case 1: Semua kolom 'Unnamed'
+    if len(cols) > 0 and all(c.startswith("Unnamed") for c in cols):
+        df = df.copy()
+        df.columns = df.iloc[0]
+        return df[1:].reset_index(drop=True)
+
+    # Case 2: Hanya beberapa kolom yang 'Unnamed'
+    return df.loc[:, ~cols.str.startswith("Unnamed")]
+
+
+def normalize_dtypes(df, text_first_col=False):
+    df_clean = df.copy()
+
+    # Konversi tipe data otomatis
+    if text_first_col:
+        # Kolom pertama (misal Year) tetap sebagai teks
+        first_col = df_clean.columns[0]
+        df_clean[first_col] = df_clean[first_col].astype(str)
+        df_clean.iloc[:, 1:] = df_clean.iloc[:, 1:].convert_dtypes()
+    else:
+        df_clean = df_clean.convert_dtypes()
+
+    df_clean = unwrap_numpy_scalars(df_clean)
+    df_clean.columns = [safe_convert(c) for c in df_clean.columns]
+    df_clean.index = [safe_convert(i) for i in df_clean.index]
+
+    # Paksa semua header & index ke string agar JSON safe
+    df_clean.columns = df_clean.columns.map(str)
+    df_clean.index = df_clean.index.map(str)
+
+    return df_clean
+
+
+def clean_dataframe(df, header="all", text_first_col=False):
+    df_clean = drop_blank(df)
+    df_clean = promote_header(df_clean, mode=header)
+    return normalize_dtypes(df_clean, text_first_col=text_first_col)
@@ -0,0 +1,195 @@
+"""
+Currency conversion of the TCO tables from a local rate table.
+
+A rate table is a small CSV or JSON file read from disk or uploaded in the
+converter, so no network is needed:
+
+- CSV: ``currency,rate`` columns (otherwise the first two columns)
+- JSON: ``{"USD": 0.000064, ...}``, ``{"rates": {...}}`` or a list of
+  ``{"currency": ..., "rate": ...}`` records
+
+``rate`` is the factor the prices are multiplied by, the same number that
+can be typed into the converter, written as a plain number with a decimal
+point ("0.058"); unlike the amount box, a dot is never a thousands
+separator. ``convert_frame`` converts a table to every rate at once with
+one broadcasted multiply; a table's ``version`` is the hash of its rates,
+so results can be cached per rate table.
+
+Configuration:
+- INSPIRE_RATES_FILE : rate table used when none is uploaded (default
+  ``rates.csv`` in the app directory, skipped when missing)
+"""
+
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+import pandas as pd
+
+
+DEFAULT_RATES_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "rates.csv")
+
+MEMO_ENTRIES = 16
+
+RateTable = namedtuple("RateTable", ["currencies", "rates", "version"])
+
+_memo = OrderedDict()   # hash isi file -> RateTable
+_memo_lock = threading.Lock()
+
+
+def parse_amount(text):
+    """
+    Number typed by a user: "15000", "15.000", "15,000", "0,67", "Rp 1.234,5".
+    Raises ValueError when nothing numeric is left.
+    """
+    cleaned = re.sub(r"[^\d,\.]", "", str(text))
+    if "," in cleaned and "." not in cleaned:
+        cleaned = cleaned.replace(",", ".")
+
+    # Hapus tanda pemisah ribuan (baik koma maupun titik)
+    cleaned = re.sub(r"(?<=\d)[.,](?=\d{3}(\D|$))", "", cleaned)
+    return float(cleaned)
+
+
+def _to_rate(value):
+    # Angka biasa dengan titik desimal ("0.058"); ``parse_amount`` hanya untuk
+    # input bebas di converter (titik di sana bisa berarti pemisah ribuan)
+    if isinstance(value, str):
+        value = value.strip()
+    return float(value)
+
+
+def _json_pairs(data):
+    if isinstance(data, dict) and isinstance(data.get("rates"), (dict, list)):
+        data = data["rates"]
+    if isinstance(data, dict):
+        return list(data.items())
+    if isinstance(data, list):
+        pairs = []
+        for record in data:
+            record = {str(k).strip().lower(): v for k, v in record.items()}
+            pairs.append((record.get("currency"), record.get("rate")))
+        return pairs
+    raise ValueError("JSON rate table must be an object or a list of records")
+
+
+def _csv_pairs(raw):
+    df = pd.read_csv(io.BytesIO(raw), skipinitialspace=True)
+    columns = {str(c).strip().lower(): c for c in df.columns}
+    if "currency" in columns and "rate" in columns:
+        df = df[[columns["currency"], columns["rate"]]]
+    elif df.shape[1] < 2:
+        raise ValueError("CSV rate table needs a currency and a rate column")
+    return list(df.iloc[:, :2].itertuples(index=False, name=None))
+
+
+def _build_table(pairs):
+    rates = {}
+    for currency, rate in pairs:
+        if currency is None or pd.isna(currency) or not str(currency).strip():
+            continue
+        currency = str(currency).strip().upper()
+        try:
+            value = _to_rate(rate)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid rate for {currency}: {rate!r}")
+        if not np.isfinite(value) or value <= 0:
+            raise ValueError(f"Invalid rate for {currency}: {rate!r}")
+        rates[currency] = value   # mata uang dobel -> baris terakhir yang dipakai
+
+    if not rates:
+        raise ValueError("Rate table has no rates")
+
+    currencies = tuple(rates)
+    values = np.array([rates[c] for c in currencies], dtype=float)
+    version = hashlib.sha256(repr(list(zip(currencies, values.tolist()))).encode()).hexdigest()[:16]
+    return RateTable(currencies, values, version)
+
+
+def read_rates(source, name=None):
+    """
+    ``RateTable`` from a CSV / JSON rate file: a path, raw bytes or a file
+    object (e.g. an upload). ``name`` decides the format when ``source`` has
+    no file name; otherwise content starting with ``{`` or ``[`` is JSON.
+    Parsed tables are memoized by file content. Raises ValueError for a file
+    without usable rates.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        name = name or os.fspath(source)
+        with open(source, "rb") as f:
+            raw = f.read()
+    elif isinstance(source, bytes):
+        raw = source
+    else:
+        name = name or getattr(source, "name", None)
+        raw = source.getvalue() if hasattr(source, "getvalue") else source.read()
+
+    key = hashlib.sha256(raw).hexdigest()
+    with _memo_lock:
+        if key in _memo:
+            _memo.move_to_end(key)
+            return _memo[key]
+
+    ext = os.path.splitext(name or "")[1].lower()
+    is_json = ext == ".json" or (ext != ".csv" and raw.lstrip()[:1] in (b"{", b"["))
+    if is_json:
+        try:
+            data = json.loads(raw.decode("utf-8-sig"))
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            raise ValueError(f"Invalid JSON rate table: {e}")
+        table = _build_table(_json_pairs(data))
+    else:
+        table = _build_table(_csv_pairs(raw))
+
+    with _memo_lock:
+        _memo[key] = table
+        while len(_memo) > MEMO_ENTRIES:
+            _memo.popitem(last=False)
+    return table
+
+
+def default_rates():
+    # Tabel kurs bawaan (INSPIRE_RATES_FILE), None kalau file tidak ada
+    path = os.environ.get("INSPIRE_RATES_FILE") or DEFAULT_RATES_FILE
+    if not os.path.isfile(path):
+        return None
+    return read_rates(path)
+
+
+def convertible_columns(df):
+    # Posisi kolom selain kolom pertama yang punya minimal satu angka
+    return [
+        i for i in range(1, df.shape[1])
+        if pd.to_numeric(df.iloc[:, i], errors="coerce").notna().any()
+    ]
+
+
+def convert_frame(df, rates):
+    """
+    ``df`` converted at each of ``rates``: a list with one frame per rate.
+    The first column (the component label) is left alone; every other column
+    holding a number is coerced to float (text -> NaN) and multiplied. All
+    rates are applied in one broadcasted multiply.
+    """
+    rates = np.asarray(rates, dtype=float).reshape(-1)
+    positions = convertible_columns(df)
+
+    values = np.empty((len(df), len(positions)), dtype=float)
+    for j, i in enumerate(positions):
+        values[:, j] = pd.to_numeric(df.iloc[:, i], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+
+    # (rate, baris, kolom) sekaligus
+    converted = rates[:, None, None] * values[None, :, :]
+
+    frames = []
+    for block in converted:
+        out = df.copy()
+        for j, i in enumerate(positions):
+            out.isetitem(i, block[:, j])
+        frames.append(out)
+    return frames
@@ -0,0 +1,145 @@
+"""
+Deferred Excel exports for ``st.download_button(data=callable)``.
+
+``deferred(builder, *args)`` returns a zero-argument callable instead of the
+workbook bytes, so a page rerun does no export work at all: the workbook is
+built when the user clicks Download. The bytes are cached by the content hash
+of the arguments (DataFrames are hashed by value), so a second click, or the
+same data in another session, reuses them.
+
+The frames passed in are captured by reference; pages must not modify them in
+place after the download button is created.
+
+Configuration for the shared cache:
+- INSPIRE_EXPORT_CACHE_MB : in-memory budget for workbook bytes (default 256)
+"""
+
+import functools
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def frame_digest(df):
+    h = hashlib.sha256()
+    h.update(repr(list(df.columns)).encode())
+    h.update(repr(df.dtypes.astype(str).tolist()).encode())
+    if df.attrs:
+        # Metadata seperti flag baris TOTAL ikut menentukan hasil
+        h.update(repr(sorted(df.attrs.items())).encode())
+    try:
+        h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    except TypeError:
+        # Sel yang tidak bisa di-hash pandas (mis. list) -> hash dari pickle
+        h.update(pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL))
+    return h.hexdigest()
+
+
+def arg_digest(arg):
+    if isinstance(arg, pd.DataFrame):
+        return frame_digest(arg)
+    if isinstance(arg, pd.Series):
+        return frame_digest(arg.to_frame())
+    if isinstance(arg, dict):
+        return repr([(k, arg_digest(v)) for k, v in arg.items()])
+    if isinstance(arg, (list, tuple)):
+        return repr([arg_digest(v) for v in arg])
+    return repr(arg)
+
+
+def call_key(builder, args, kwargs):
+    name = f"{builder.__module__}.{builder.__qualname__}"
+    payload = arg_digest([name, list(args), sorted(kwargs.items())])
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ExportCache:
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()   # key -> bytes
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._total_bytes -= len(old)
+
+            self._entries[key] = data
+            self._total_bytes += len(data)
+
+            # LRU eviction sampai muat di budget
+            while self._total_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._total_bytes -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    @property
+    def total_bytes(self):
+        return self._total_bytes
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def _default_cache():
+    max_mb = os.environ.get("INSPIRE_EXPORT_CACHE_MB")
+    max_bytes = int(float(max_mb) * 1024 * 1024) if max_mb else DEFAULT_MAX_BYTES
+    return ExportCache(max_bytes=max_bytes)
+
+
+export_cache = _default_cache()
+
+
+def deferred(builder, *args, cache=None, **kwargs):
+    """
+    Zero-argument callable that returns ``builder(*args, **kwargs)``; the
+    call (and the hashing of the arguments) only happens on download.
+    """
+    def build():
+        store = export_cache if cache is None else cache
+        key = call_key(builder, args, kwargs)
+
+        data = store.get(key)
+        if data is None:
+            data = builder(*args, **kwargs)
+            store.put(key, data)
+        return data
+
+    return build
+
+
+def lazy_export(builder):
+    # lazy_export(get_excel_download)(df) -> callable untuk st.download_button
+    @functools.wraps(builder)
+    def wrapper(*args, **kwargs):
+        return deferred(builder, *args, **kwargs)
+
+    return wrapper
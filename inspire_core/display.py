@@ -0,0 +1,217 @@
+"""
+Vectorized display layer for the Styler tables.
+
+``Styler.format(format_rupiah)`` and ``Styler.apply(highlight_*, axis=1)``
+call Python once per cell / per row on every rerun. The helpers here compute
+the same output once per data version:
+
+- ``rupiah_formats(df, cols)``: formatters backed by a lookup table of the
+  Rupiah strings of every distinct value in the column.
+- ``*_styles(df)``: style frames built from boolean masks, meant for
+  ``Styler.apply(func, axis=None)``; they render exactly like the row-wise
+  ``highlight_*`` functions in ``formatting``.
+
+Results are memoized by the content hash of the frame, so a rerun on the
+same data does not rebuild them.
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from inspire_core.formatting import (
+    STYLE_TOTAL,
+    STYLE_FIRST,
+    STYLE_SECOND,
+    format_rupiah,
+)
+from inspire_core.totals import total_row_mask
+from inspire_core.deferred import frame_digest
+
+
+MEMO_ENTRIES = 64
+
+_memo = OrderedDict()
+_memo_lock = threading.Lock()
+
+
+def _memoized(kind, df, params, build):
+    key = (kind, frame_digest(df), repr(params))
+    with _memo_lock:
+        if key in _memo:
+            _memo.move_to_end(key)
+            return _memo[key]
+
+    result = build()
+    with _memo_lock:
+        _memo[key] = result
+        while len(_memo) > MEMO_ENTRIES:
+            _memo.popitem(last=False)
+    return result
+
+
+# ================= RUPIAH STRINGS =================
+_SWAP_SEPARATORS = str.maketrans({",": ".", ".": ","})
+
+
+def rupiah_strings(values):
+    """
+    ``format_rupiah`` for an array of floats: "7.000" for whole numbers,
+    "7.000,5" / "7.000,25" otherwise, "" for NaN.
+    """
+    values = np.asarray(values, dtype=float)
+    out = np.full(len(values), "", dtype=object)
+
+    missing = np.isnan(values)
+    # Di luar rentang int64 tetap lewat jalur float (astype akan overflow)
+    whole = np.isfinite(values) & (values == np.floor(values)) & (np.abs(values) < 2**63)
+    frac = ~missing & ~whole
+
+    if whole.any():
+        out[whole] = (
+            pd.Series(values[whole].astype(np.int64)).map("{:,}".format)
+            .str.replace(",", ".", regex=False).to_numpy()
+        )
+    if frac.any():
+        # 2 desimal, separator ditukar (1,234.50 -> 1.234,50), ",00" dibuang
+        out[frac] = (
+            pd.Series(values[frac]).map("{:,.2f}".format)
+            .str.translate(_SWAP_SEPARATORS)
+            .str.replace(r",00$", "", regex=True).to_numpy()
+        )
+    return out
+
+
+def rupiah_formatter(series, suffix=""):
+    """
+    Styler formatter for one column: every distinct number is formatted once
+    up front; anything else (text, NaN) goes through ``format_rupiah``.
+    ``suffix`` (e.g. "%") is appended to every non-empty value.
+    """
+    uniques = pd.unique(series.to_numpy())
+    numbers = [
+        v for v in uniques
+        if isinstance(v, (int, float, np.number)) and not isinstance(v, (bool, np.bool_))
+        and not pd.isna(v)
+    ]
+    lookup = {v: f"{text}{suffix}" for v, text in zip(numbers, rupiah_strings(numbers))}
+
+    def fmt(x):
+        try:
+            return lookup[x]
+        except (KeyError, TypeError):
+            return "" if pd.isna(x) else f"{format_rupiah(x)}{suffix}"
+
+    return fmt
+
+
+def rupiah_formats(df, cols=None, suffix=""):
+    # {kolom: formatter} untuk Styler.format; default semua kolom.
+    # Selalu dict baru: page boleh menambah format kolom lain (update)
+    cols = list(df.columns if cols is None else cols)
+    return dict(_memoized(
+        "rupiah", df[cols], (cols, suffix),
+        lambda: {col: rupiah_formatter(df[col], suffix) for col in cols},
+    ))
+
+
+# ================= STYLE FRAMES =================
+def _blank_styles(df):
+    return np.full(df.shape, "", dtype=object)
+
+
+def _frame(df, styles):
+    # Yang di-memo hanya array style; index selalu ikut frame yang di-render
+    return pd.DataFrame(styles, index=df.index, columns=df.columns)
+
+
+def _row_styles(df, mask, style):
+    styles = _blank_styles(df)
+    styles[np.asarray(mask, dtype=bool)] = style
+    return styles
+
+
+def row_styles(df, mask, style):
+    # ``style`` di semua sel pada baris yang mask-nya True
+    return _frame(df, _row_styles(df, mask, style))
+
+
+def total_row_styles(df):
+    # = highlight_total_row: baris TOTAL bold
+    return _frame(df, _memoized(
+        "total", df, None,
+        lambda: _row_styles(df, total_row_mask(df), "font-weight: bold;"),
+    ))
+
+
+def total_row_styles_v2(df):
+    # = highlight_total_row_v2: baris TOTAL hijau bold
+    return _frame(df, _memoized(
+        "total_v2", df, None,
+        lambda: _row_styles(df, total_row_mask(df), STYLE_TOTAL),
+    ))
+
+
+def _rank_summary_styles(df, num_cols):
+    styles = _blank_styles(df)
+    num_cols = list(num_cols)
+    if not num_cols or df.empty:
+        return styles
+
+    values = df[num_cols].to_numpy(dtype=float, na_value=np.nan)
+    nan = np.isnan(values)
+    keep = values != 0   # NaN tetap ikut (sama seperti highlight_rank_summary)
+
+    # Urutan per baris: angka naik (stabil), lalu NaN, lalu nilai 0 (dibuang)
+    rank_class = np.where(keep, nan.astype(np.int8), 2)
+    order = np.lexsort((np.where(nan, 0, values), rank_class), axis=1)
+
+    rows = np.arange(len(df))
+    has_value = (keep & ~nan).any(axis=1)
+    n_keep = keep.sum(axis=1)
+
+    positions = np.array([df.columns.get_loc(c) for c in num_cols])
+    first = rows[has_value]
+    styles[first, positions[order[first, 0]]] = STYLE_FIRST
+
+    second = rows[has_value & (n_keep > 1)]
+    if len(second):
+        second_pos = positions[order[second, 1]]
+        # Nama kolom kosong/0 tidak di-highlight (cek truthy di versi lama)
+        named = np.array([bool(df.columns[p]) for p in second_pos], dtype=bool)
+        styles[second[named], second_pos[named]] = STYLE_SECOND
+
+    return styles
+
+
+def rank_summary_styles(df, num_cols):
+    # = highlight_rank_summary: vendor termurah & kedua per baris (nilai 0 diabaikan)
+    num_cols = list(num_cols)
+    return _frame(df, _memoized(
+        "rank_summary", df, num_cols,
+        lambda: _rank_summary_styles(df, num_cols),
+    ))
+
+
+def _vendor_rank_styles(df, columns):
+    styles = _blank_styles(df)
+    no_vendor = np.full(len(df), None, dtype=object)
+    first_vendor = df["1st Vendor"].to_numpy(dtype=object) if "1st Vendor" in df.columns else no_vendor
+    second_vendor = df["2nd Vendor"].to_numpy(dtype=object) if "2nd Vendor" in df.columns else no_vendor
+
+    for i, col in enumerate(columns):
+        is_first = first_vendor == col
+        styles[is_first, i] = STYLE_FIRST
+        styles[~is_first & (second_vendor == col), i] = STYLE_SECOND
+    return styles
+
+
+def vendor_rank_styles(df, columns=None):
+    # = highlight_1st_2nd_vendor: kolom vendor di "1st Vendor" / "2nd Vendor"
+    columns = list(df.columns if columns is None else columns)
+    return _frame(df, _memoized(
+        "vendor_rank", df, columns,
+        lambda: _vendor_rank_styles(df, columns),
+    ))
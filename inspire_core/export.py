@@ -0,0 +1,442 @@
+import datetime
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from inspire_core.totals import total_row_mask
+
+# File xlsx lebih besar dari ini (INSPIRE_EXPORT_SPOOL_MB, default 16) ditulis ke disk dulu
+EXPORT_SPOOL_BYTES = int(float(os.environ.get("INSPIRE_EXPORT_SPOOL_MB") or 16) * 1024 * 1024)
+
+# ================= XLSX FORMAT SPECS =================
+NUM_FORMAT_RUPIAH = "#,##0"
+NUM_FORMAT_PCT = '#,##0.0"%"'
+NUM_FORMAT_DATETIME = "yyyy-mm-dd hh:mm:ss"    # sama dengan default pandas.to_excel
+
+TOTAL_FORMAT = {"bold": True, "bg_color": "#D9EAD3", "font_color": "#1A5E20"}
+FIRST_FORMAT = {"bg_color": "#C6EFCE"}
+SECOND_FORMAT = {"bg_color": "#FFEB9C"}
+YEAR_TOTAL_FORMAT = {"bold": True, "bg_color": "#FFEB9C", "font_color": "#9C6500"}
+VENDOR_TOTAL_FORMAT = {"bold": True, "bg_color": "#C6EFCE", "font_color": "#006100"}
+
+
+def is_missing(val):
+    # NaN / inf tidak bisa ditulis sebagai number oleh xlsxwriter
+    return pd.isna(val) or (isinstance(val, (int, float)) and np.isinf(val))
+
+
+_is_inf = np.frompyfunc(lambda v: isinstance(v, (int, float)) and bool(np.isinf(v)), 1, 1)
+
+
+def missing_mask(series):
+    # Versi vektor dari is_missing untuk satu kolom
+    values = series.to_numpy()
+    missing = pd.isna(values)
+    if values.dtype.kind in "fc":
+        missing |= np.isinf(values)
+    elif values.dtype == object and len(values):
+        missing |= _is_inf(values).astype(bool)
+    return np.asarray(missing, dtype=bool)
+
+
+def pick(mask, if_false, if_true):
+    # Format per baris: if_true untuk baris yang mask-nya True
+    return np.array([if_false, if_true], dtype=object)[np.asarray(mask, dtype=np.intp)]
+
+
+def coerce_numeric(df):
+    # Kolom yang punya minimal satu nilai numerik dianggap kolom angka
+    df = df.copy()
+    numeric_cols = []
+
+    for col in df.columns:
+        coerced = pd.to_numeric(df[col], errors="coerce")
+        if coerced.notna().any():
+            df[col] = coerced
+            numeric_cols.append(col)
+
+    return df, numeric_cols
+
+
+def column_widths(df):
+    # Lebar kolom = teks terpanjang (header atau isi) + 2
+    return [
+        max(len(str(col)), df[col].astype(str).map(len).max()) + 2
+        for col in df.columns
+    ]
+
+
+def autofit_columns(worksheet, df):
+    for i, width in enumerate(column_widths(df)):
+        worksheet.set_column(i, i, width)
+
+
+def _per_row(fmt, start, stop):
+    if isinstance(fmt, np.ndarray):
+        return fmt[start:stop].tolist()
+    return [fmt] * (stop - start)
+
+
+WRITE_CHUNK_ROWS = 10_000
+
+
+def write_frame(worksheet, df, number_cols, formats, blank_formats=None):
+    """
+    Writes the data cells of ``df`` (below the header row) exactly once,
+    row by row, so it also works with xlsxwriter's ``constant_memory`` mode.
+
+    - ``number_cols``: column positions written with ``write_number``,
+      the rest go through ``write``.
+    - ``formats[c]``: the format of column ``c``, either one Format (or None)
+      for the whole column or an array with one format per row (see ``pick``).
+    - ``blank_formats[c]``: same shape, used for missing values (NaN / inf);
+      None leaves the cell as ``to_excel`` would (empty, inf as text).
+
+    Values are boxed into Python objects ``WRITE_CHUNK_ROWS`` rows at a time.
+    """
+    n_cols = df.shape[1]
+    blank_formats = blank_formats or [None] * n_cols
+    missing = [missing_mask(df.iloc[:, c]) for c in range(n_cols)]
+    writers = [
+        worksheet.write_number if c in number_cols else worksheet.write
+        for c in range(n_cols)
+    ]
+
+    for start in range(0, len(df), WRITE_CHUNK_ROWS):
+        stop = min(start + WRITE_CHUNK_ROWS, len(df))
+        columns = []
+        for c in range(n_cols):
+            chunk_missing = missing[c][start:stop]
+            columns.append((
+                c,
+                df.iloc[start:stop, c].tolist(),
+                _per_row(formats[c], start, stop),
+                _per_row(blank_formats[c], start, stop),
+                chunk_missing.tolist() if chunk_missing.any() else None,
+                writers[c],
+            ))
+
+        for r in range(stop - start):
+            row_idx = start + r + 1
+            for c, values, fmts, blanks, missing_rows, write in columns:
+                if missing_rows is not None and missing_rows[r]:
+                    value = values[r]
+                    if blanks[r] is not None:
+                        worksheet.write_blank(row_idx, c, None, blanks[r])
+                    elif isinstance(value, float) and np.isinf(value):
+                        # Sama dengan inf_rep bawaan pandas.to_excel
+                        worksheet.write_string(row_idx, c, "inf" if value > 0 else "-inf")
+                else:
+                    write(row_idx, c, values[r], fmts[r])
+
+
+def _write_workbook_sheets(sheets):
+    # sheets: [(df, sheet_name, write_sheet), ...] dalam urutan tab.
+    # constant_memory: xlsxwriter hanya menyimpan satu baris di memori (write_frame
+    # menulis urut per baris); file xlsx-nya di-spool ke disk kalau sudah besar
+    with tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_BYTES) as output:
+        with pd.ExcelWriter(
+            output, engine="xlsxwriter",
+            engine_kwargs={"options": {"constant_memory": True}},
+        ) as writer:
+            for df, sheet_name, write_sheet in sheets:
+                # Header saja lewat pandas (style header bawaan), isi ditulis sekali oleh write_sheet
+                df.iloc[:0].to_excel(writer, index=False, sheet_name=sheet_name)
+                write_sheet(writer.book, writer.sheets[sheet_name])
+                autofit_columns(writer.sheets[sheet_name], df)
+
+        output.seek(0)
+        return output.read()
+
+
+def _write_workbook(df, sheet_name, write_sheet):
+    return _write_workbook_sheets([(df, sheet_name, write_sheet)])
+
+
+# Download button to Excel
+def get_excel_download(df, sheet_name="Sheet1"):
+    num_cols = df.select_dtypes(include=["number"]).columns.tolist()
+    pct_cols = [c for c in df.columns if "%" in c]
+
+    def write_sheet(workbook, worksheet):
+        fmt_rupiah = workbook.add_format({"num_format": NUM_FORMAT_RUPIAH})
+        fmt_pct = workbook.add_format({"num_format": NUM_FORMAT_PCT})
+
+        number_cols, formats = set(), []
+        for col_idx, col_name in enumerate(df.columns):
+            fmt = None
+            if col_name in pct_cols:
+                fmt = fmt_pct
+            elif col_name in num_cols:
+                fmt = fmt_rupiah
+            if fmt is not None:
+                number_cols.add(col_idx)
+            formats.append(fmt)
+
+        write_frame(worksheet, df, number_cols, formats)
+
+    return _write_workbook(df, sheet_name, write_sheet)
+
+
+# Download banyak tabel sekaligus, satu tab per tabel (Table Extraction)
+def get_excel_download_tables(tables):
+    # tables: {nama tab: DataFrame}; format dibuat sekali per workbook
+    formats = {}
+
+    def sheet_writer(df):
+        num_cols = df.select_dtypes(include=["number"]).columns.tolist()
+        number_cols = {i for i, col in enumerate(df.columns) if col in num_cols}
+        # Tanggal tanpa format akan tampil sebagai angka serial Excel
+        date_rows = {}
+        for i in range(df.shape[1]):
+            if i in number_cols:
+                continue
+            col = df.iloc[:, i]
+            if pd.api.types.is_datetime64_any_dtype(col):
+                date_rows[i] = np.ones(len(df), dtype=bool)
+            elif col.dtype == object:
+                mask = col.map(lambda v: isinstance(v, (datetime.date, datetime.time))).to_numpy(dtype=bool)
+                if mask.any():
+                    date_rows[i] = mask
+
+        def write_sheet(workbook, worksheet):
+            if not formats:
+                formats["rupiah"] = workbook.add_format({"num_format": NUM_FORMAT_RUPIAH})
+                formats["datetime"] = workbook.add_format({"num_format": NUM_FORMAT_DATETIME})
+            write_frame(worksheet, df, number_cols, [
+                formats["rupiah"] if i in number_cols
+                else pick(date_rows[i], None, formats["datetime"]) if i in date_rows
+                else None
+                for i in range(df.shape[1])
+            ])
+
+        return write_sheet
+
+    return _write_workbook_sheets([(df, name, sheet_writer(df)) for name, df in tables.items()])
+
+
+# Download highlight nilai minimum per baris (Standard Deviation)
+def get_excel_download_highlight(df, sheet_name="Sheet1"):
+    df_to_write, numeric_cols = coerce_numeric(df)
+    numeric_idx = [i for i, c in enumerate(df_to_write.columns) if c in numeric_cols]
+
+    def write_sheet(workbook, worksheet):
+        fmt_pct = workbook.add_format({"num_format": NUM_FORMAT_PCT})
+        fmt_min = workbook.add_format({"bg_color": "#D9EAD3", "num_format": NUM_FORMAT_PCT})
+
+        for col_idx in range(len(df_to_write.columns)):
+            worksheet.set_column(col_idx, col_idx, 15)
+
+        # Nilai minimum per baris (NaN dilewati)
+        values = df_to_write.iloc[:, numeric_idx].to_numpy(dtype=float, na_value=np.nan)
+        row_min = np.fmin.reduce(values, axis=1, initial=np.inf)
+        is_min = values == row_min[:, None]
+
+        formats = [None] * len(df_to_write.columns)
+        for k, col_idx in enumerate(numeric_idx):
+            formats[col_idx] = pick(is_min[:, k], fmt_pct, fmt_min)
+
+        write_frame(worksheet, df_to_write, set(numeric_idx), formats)
+
+    return _write_workbook(df_to_write, sheet_name, write_sheet)
+
+
+# Download highlight total
+def get_excel_download_highlight_total(df, sheet_name="Sheet1"):
+    num_cols = df.select_dtypes(include=["number"]).columns
+
+    def write_sheet(workbook, worksheet):
+        fmt_rupiah = workbook.add_format({"num_format": NUM_FORMAT_RUPIAH})
+        fmt_total = workbook.add_format({**TOTAL_FORMAT, "num_format": NUM_FORMAT_RUPIAH})
+
+        is_total = total_row_mask(df)
+        number_cols, formats = set(), []
+        for col_idx, col_name in enumerate(df.columns):
+            if col_name in num_cols:
+                number_cols.add(col_idx)
+                formats.append(pick(is_total, fmt_rupiah, fmt_total))
+            else:
+                formats.append(pick(is_total, None, fmt_total))
+
+        # Sel kosong di baris TOTAL tetap diberi warna
+        blank_formats = [pick(is_total, None, fmt_total)] * len(df.columns)
+
+        write_frame(worksheet, df, number_cols, formats, blank_formats)
+
+    return _write_workbook(df, sheet_name, write_sheet)
+
+
+# Download highlight 1st & 2nd vendor per baris (TOTAL ikut di-bold)
+def get_excel_download_highlight_summary(df, sheet_name="Sheet1"):
+    num_cols = df.select_dtypes(include=["number"]).columns
+
+    def write_sheet(workbook, worksheet):
+        fmt_rupiah = workbook.add_format({"num_format": NUM_FORMAT_RUPIAH})
+        fmt_bold = workbook.add_format({"bold": True})
+        fmt_bold_rupiah = workbook.add_format({"bold": True, "num_format": NUM_FORMAT_RUPIAH})
+        fmt_first = workbook.add_format({**FIRST_FORMAT, "num_format": NUM_FORMAT_RUPIAH})
+        fmt_second = workbook.add_format({**SECOND_FORMAT, "num_format": NUM_FORMAT_RUPIAH})
+        fmt_first_bold = workbook.add_format({**FIRST_FORMAT, "bold": True, "num_format": NUM_FORMAT_RUPIAH})
+        fmt_second_bold = workbook.add_format({**SECOND_FORMAT, "bold": True, "num_format": NUM_FORMAT_RUPIAH})
+
+        is_total = total_row_mask(df)
+
+        # ===== RANKING (EXCLUDE 0) =====
+        # Urutan stabil: harga sama -> vendor yang kolomnya lebih dulu
+        num_idx = [df.columns.get_loc(c) for c in num_cols]
+        values = df.iloc[:, num_idx].to_numpy(dtype=float, na_value=np.nan)
+        values[values == 0] = np.nan
+        ranked = np.argsort(values, axis=1, kind="stable")
+        n_valid = (~np.isnan(values)).sum(axis=1)
+        first = np.where(n_valid >= 1, ranked[:, 0] if len(num_idx) else -1, -1)
+        second = np.where(n_valid >= 2, ranked[:, 1] if len(num_idx) > 1 else -1, -1)
+
+        number_cols, formats = set(), []
+        for col_idx in range(len(df.columns)):
+            if col_idx in num_idx:
+                k = num_idx.index(col_idx)
+                fmt = pick(is_total, fmt_rupiah, fmt_bold_rupiah)
+                fmt = np.where(second == k, pick(is_total, fmt_second, fmt_second_bold), fmt)
+                fmt = np.where(first == k, pick(is_total, fmt_first, fmt_first_bold), fmt)
+                number_cols.add(col_idx)
+                formats.append(fmt)
+            else:
+                formats.append(pick(is_total, None, fmt_bold))
+
+        blank_formats = [pick(is_total, None, fmt_bold)] * len(df.columns)
+
+        write_frame(worksheet, df, number_cols, formats, blank_formats)
+
+    return _write_workbook(df, sheet_name, write_sheet)
+
+
+# Download Highlight 1st & 2nd Vendors
+def get_excel_download_highlight_1st_2nd_lowest(df, sheet_name="Sheet1"):
+    num_cols = df.select_dtypes(include=["number"]).columns
+    pct_cols = [c for c in df.columns if "%" in c]
+
+    def write_sheet(workbook, worksheet):
+        fmt_rupiah = workbook.add_format({"num_format": NUM_FORMAT_RUPIAH})
+        fmt_pct = workbook.add_format({"num_format": NUM_FORMAT_PCT})
+        fmt_first = workbook.add_format({**FIRST_FORMAT, "num_format": NUM_FORMAT_RUPIAH})
+        fmt_second = workbook.add_format({**SECOND_FORMAT, "num_format": NUM_FORMAT_RUPIAH})
+
+        # Nama vendor 1st / 2nd per baris (kolom tidak ada -> tanpa highlight)
+        no_vendor = np.full(len(df), None, dtype=object)
+        first_vendor = df["1st Vendor"].to_numpy(dtype=object) if "1st Vendor" in df.columns else no_vendor
+        second_vendor = df["2nd Vendor"].to_numpy(dtype=object) if "2nd Vendor" in df.columns else no_vendor
+
+        number_cols, formats = set(), []
+        for col_idx, col in enumerate(df.columns):
+            if col in pct_cols:
+                fmt = fmt_pct
+            elif col in num_cols:
+                fmt = fmt_rupiah
+            else:
+                formats.append(None)
+                continue
+
+            fmt = pick(second_vendor == col, fmt, fmt_second)
+            fmt = np.where(first_vendor == col, fmt_first, fmt)
+            number_cols.add(col_idx)
+            formats.append(fmt)
+
+        write_frame(worksheet, df, number_cols, formats)
+
+    return _write_workbook(df, sheet_name, write_sheet)
+
+
+def _write_year_scope_totals(df, sheet_name, year_idx, scope_idx):
+    num_cols = df.select_dtypes(include=["number"]).columns.tolist()
+
+    def row_labels(idx):
+        if idx is None:
+            return np.full(len(df), "", dtype=object)
+        return df.iloc[:, idx].astype(str).str.strip().str.upper().to_numpy()
+
+    def write_sheet(workbook, worksheet):
+        fmt_rupiah = workbook.add_format({"num_format": NUM_FORMAT_RUPIAH})
+        fmt_total_year = workbook.add_format({**YEAR_TOTAL_FORMAT, "num_format": NUM_FORMAT_RUPIAH})
+        fmt_vendor_total = workbook.add_format({**VENDOR_TOTAL_FORMAT, "num_format": NUM_FORMAT_RUPIAH})
+
+        # Tentukan format baris
+        year_total = row_labels(year_idx) == "TOTAL"
+        scope_total = (row_labels(scope_idx) == "TOTAL") & ~year_total
+        row_fmt = np.where(year_total, fmt_vendor_total, pick(scope_total, None, fmt_total_year))
+        num_fmt = np.where(year_total | scope_total, row_fmt, fmt_rupiah)
+
+        number_cols, formats = set(), []
+        for col_idx, col_name in enumerate(df.columns):
+            if col_name in num_cols:
+                number_cols.add(col_idx)
+                formats.append(num_fmt)
+            else:
+                formats.append(row_fmt)
+
+        write_frame(worksheet, df, number_cols, formats)
+
+    return _write_workbook(df, sheet_name, write_sheet)
+
+
+# Download highlight total per year (kuning) & total vendor (hijau)
+def get_excel_download_with_highlight(df, sheet_name="Sheet1"):
+    # Layout tetap: VENDOR, YEAR, SCOPE, ...
+    return _write_year_scope_totals(df, sheet_name, year_idx=1, scope_idx=2)
+
+
+def get_excel_download_with_highlight_v2(df, sheet_name="Sheet1"):
+    # Deteksi kolom YEAR / SCOPE secara dinamis
+    year_col = next((c for c in df.columns if "YEAR" in c.upper()), None)
+    scope_col = next((c for c in df.columns if "SCOPE" in c.upper()), None)
+
+    year_idx = df.columns.get_loc(year_col) if year_col else None
+    scope_idx = df.columns.get_loc(scope_col) if scope_col else None
+
+    return _write_year_scope_totals(df, sheet_name, year_idx, scope_idx)
+
+
+# Download highlight total + kolom price movement
+def get_excel_download_highlight_price_trend(df_raw, sheet_name="Sheet1"):
+    df, numeric_cols = coerce_numeric(df_raw)
+
+    value_cols = [
+        c for c in df.columns
+        if "PRICE REDUCTION (VALUE)" in c or "STANDARD DEVIATION" in c
+    ]
+    pct_cols = [
+        c for c in df.columns
+        if "PRICE REDUCTION (%)" in c or "PRICE STABILITY INDEX (%)" in c
+    ]
+
+    def write_sheet(workbook, worksheet):
+        fmt_rp = workbook.add_format({"num_format": NUM_FORMAT_RUPIAH})
+        fmt_pct = workbook.add_format({"num_format": NUM_FORMAT_PCT})
+        fmt_total_rp = workbook.add_format({**TOTAL_FORMAT, "num_format": NUM_FORMAT_RUPIAH})
+        fmt_total_pct = workbook.add_format({**TOTAL_FORMAT, "num_format": NUM_FORMAT_PCT})
+        fmt_total_text = workbook.add_format(TOTAL_FORMAT)
+
+        for col_idx, col in enumerate(df.columns):
+            if col in pct_cols:
+                worksheet.set_column(col_idx, col_idx, 15, fmt_pct)
+            elif col in value_cols or col in numeric_cols:
+                worksheet.set_column(col_idx, col_idx, 15, fmt_rp)
+
+        is_total = total_row_mask(df)
+        number_cols, formats = set(), []
+        for col_idx, col in enumerate(df.columns):
+            if col in pct_cols:
+                formats.append(pick(is_total, fmt_pct, fmt_total_pct))
+            elif col in value_cols or col in numeric_cols:
+                formats.append(pick(is_total, fmt_rp, fmt_total_rp))
+            else:
+                formats.append(pick(is_total, None, fmt_total_text))
+
+            if col in pct_cols or col in numeric_cols:
+                number_cols.add(col_idx)
+
+        # Sel kosong tetap memakai format kolom / baris TOTAL
+        write_frame(worksheet, df, number_cols, formats, blank_formats=formats)
+
+    return _write_workbook(df, sheet_name, write_sheet)
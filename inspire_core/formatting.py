@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+
+# ================= STYLE CONSTANTS =================
+STYLE_TOTAL = "font-weight: bold; background-color: #D9EAD3; color: #1A5E20;"
+STYLE_FIRST = "background-color: #C6EFCE; color: #006100;"
+STYLE_SECOND = "background-color: #FFEB9C; color: #9C6500;"
+
+
+def round_half_up(series):
+    # Pembulatan 2 desimal (half-up, bukan banker's rounding)
+    return np.floor(series * 100 + 0.5) / 100
+
+
+def format_rupiah(x):
+    if pd.isna(x):
+        return ""
+    # pastikan bisa diubah ke float
+    try:
+        x = float(x)
+    except Exception:
+        return x  # biarin apa adanya kalau bukan angka
+
+    # kalau tidak punya desimal (misal 7000.0), tampilkan tanpa ,00
+    if x.is_integer():
+        formatted = f"{int(x):,}".replace(",", ".")
+    else:
+        formatted = f"{x:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+        # hapus ,00 kalau desimalnya 0 semua (misal 7000,00 → 7000)
+        if formatted.endswith(",00"):
+            formatted = formatted[:-3]
+    return formatted
+
+
+def is_total_value(x):
+    return str(x).strip().upper() == "TOTAL"
+
+
+def highlight_total_row(row):
+    # Cek apakah ada kolom yang berisi "TOTAL" (case-insensitive)
+    if any(is_total_value(x) for x in row):
+        return ["font-weight: bold;"] * len(row)
+    return [""] * len(row)
+
+
+def highlight_total_row_v2(row):
+    if any(is_total_value(x) for x in row):
+        return [STYLE_TOTAL] * len(row)
+    return [""] * len(row)
+
+
+def highlight_1st_2nd_vendor(row, columns):
+    styles = [""] * len(columns)
+    first_vendor = row.get("1st Vendor")
+    second_vendor = row.get("2nd Vendor")
+
+    for i, col in enumerate(columns):
+        if col == first_vendor:
+            styles[i] = STYLE_FIRST
+        elif col == second_vendor:
+            styles[i] = STYLE_SECOND
+    return styles
+
+
+def highlight_rank_summary(row, num_cols):
+    styles = [""] * len(row)
+
+    # EXCLUDE nilai 0 (vendor tidak ikut tender)
+    numeric_vals = row[num_cols]
+    numeric_vals = numeric_vals[numeric_vals != 0]
+
+    # Skip jika kosong / NaN semua
+    if numeric_vals.dropna().empty:
+        return styles
+
+    sorted_vals = numeric_vals.sort_values()
+    first_vendor = sorted_vals.index[0]
+    second_vendor = sorted_vals.index[1] if len(sorted_vals) > 1 else None
+
+    for i, col in enumerate(row.index):
+        if col == first_vendor:
+            styles[i] = STYLE_FIRST
+        elif second_vendor and col == second_vendor:
+            styles[i] = STYLE_SECOND
+
+    return styles
@@ -0,0 +1,238 @@
+"""
+Excel ingestion with a selectable reader backend.
+
+- "calamine": python-calamine (Rust), used automatically when installed.
+- "openpyxl": openpyxl in read-only streaming mode (pandas default for xlsx).
+
+The backend can be forced with the INSPIRE_EXCEL_ENGINE environment variable
+or the ``engine`` argument. Every sheet is parsed separately so the time spent
+per sheet can be reported back to the caller, and several workbooks can be
+parsed in a process pool (INSPIRE_PARSE_WORKERS, default: number of CPUs).
+The pool is started through a "forkserver" for one call at a time, so the
+multi-threaded Streamlit server itself is never forked. Small uploads (below
+INSPIRE_PARSE_POOL_MB in total, default 4) are parsed serially: starting
+the workers costs more than the parse itself.
+"""
+
+import importlib.util
+import logging
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+import types
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from io import BytesIO
+
+import pandas as pd
+
+
+logger = logging.getLogger(__name__)
+
+ENGINES = ("calamine", "openpyxl")
+
+DEFAULT_POOL_MB = 4
+
+# Di-import sekali di forkserver, bukan di tiap worker baru (modul yang tidak
+# terpasang dilewati forkserver)
+POOL_PRELOAD = (
+    "python_calamine",
+    "pandas.io.excel._calamine",
+    "openpyxl",
+    "pandas.io.excel._openpyxl",
+)
+
+
+def calamine_available():
+    return importlib.util.find_spec("python_calamine") is not None
+
+
+def resolve_engine(engine=None):
+    engine = engine or os.environ.get("INSPIRE_EXCEL_ENGINE") or "auto"
+
+    if engine == "auto":
+        return "calamine" if calamine_available() else "openpyxl"
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown Excel engine '{engine}', expected one of {ENGINES} or 'auto'")
+    if engine == "calamine" and not calamine_available():
+        raise ImportError("python-calamine is not installed (pip install python-calamine)")
+    return engine
+
+
+def _open_excel(source, engine):
+    if engine == "openpyxl":
+        # Default pandas: openpyxl read-only untuk .xlsx, xlrd untuk .xls lama
+        return pd.ExcelFile(source)
+    return pd.ExcelFile(source, engine=engine)
+
+
+def read_excel_sheets(source, sheet_name=None, engine=None, on_sheet=None):
+    """
+    Parse a workbook sheet by sheet.
+
+    Returns ``(sheets, timings)``: ``sheets`` is a dict of sheet -> DataFrame
+    when ``sheet_name`` is None, otherwise the single DataFrame (same as
+    ``pd.read_excel``); ``timings`` maps every parsed sheet to seconds.
+    ``on_sheet(name, seconds, done, total)`` is called after each sheet.
+    """
+    engine = resolve_engine(engine)
+    timings = {}
+    sheets = {}
+
+    with _open_excel(source, engine) as xls:
+        if sheet_name is None:
+            names = xls.sheet_names
+        elif isinstance(sheet_name, int):
+            names = [xls.sheet_names[sheet_name]]
+        else:
+            names = [sheet_name]
+
+        for done, name in enumerate(names, start=1):
+            start = time.perf_counter()
+            sheets[name] = xls.parse(name)
+            timings[name] = time.perf_counter() - start
+
+            logger.info("Parsed sheet '%s' in %.3fs (%s)", name, timings[name], engine)
+            if on_sheet is not None:
+                on_sheet(name, timings[name], done, len(names))
+
+    if sheet_name is not None:
+        return sheets[names[0]], timings
+    return sheets, timings
+
+
+# ================= PARALLEL PARSE =================
+def default_workers():
+    workers = os.environ.get("INSPIRE_PARSE_WORKERS")
+    return int(workers) if workers else (os.cpu_count() or 1)
+
+
+def pool_min_bytes():
+    # Total ukuran upload minimal sebelum parse dipindah ke process pool
+    mb = os.environ.get("INSPIRE_PARSE_POOL_MB")
+    return int(float(mb) * 1024 * 1024) if mb else DEFAULT_POOL_MB * 1024 * 1024
+
+
+def can_use_pool():
+    # Worker dibuat lewat "forkserver": proses server yang bersih (satu thread),
+    # bukan fork dari server Streamlit yang multi-thread (lock yang sedang
+    # dipegang thread lain ikut tersalin -> deadlock). Tanpa forkserver -> serial.
+    return "forkserver" in multiprocessing.get_all_start_methods()
+
+
+def _pool_context():
+    # Preload modul ini (pandas ikut) + reader Excel, bukan __main__
+    context = multiprocessing.get_context("forkserver")
+    context.set_forkserver_preload([__name__, *POOL_PRELOAD])
+    return context
+
+
+@contextmanager
+def _without_main_script():
+    # Worker baru menjalankan ulang __main__ dari path-nya; di Streamlit itu
+    # script halaman -> sembunyikan selama worker dibuat
+    main = sys.modules.get("__main__")
+    stub = types.ModuleType("__main__")
+    sys.modules["__main__"] = stub
+    try:
+        yield
+    finally:
+        if sys.modules.get("__main__") is stub:
+            sys.modules["__main__"] = main
+
+
+def sheet_names(data, engine=None):
+    with _open_excel(BytesIO(data), resolve_engine(engine)) as xls:
+        return xls.sheet_names
+
+
+def _parse_sheet(source, sheet_name, engine):
+    # Dijalankan di worker process -> harus top-level supaya bisa di-pickle.
+    # ``source``: bytes (serial) atau path file sementara (worker)
+    start = time.perf_counter()
+    with _open_excel(BytesIO(source) if isinstance(source, bytes) else source, engine) as xls:
+        df = xls.parse(sheet_name)
+    return df, time.perf_counter() - start
+
+
+def _parse_in_pool(datas, tasks, engine, workers, report):
+    # Tiap workbook ditulis sekali ke file sementara; task hanya membawa path,
+    # jadi bytes workbook tidak di-pickle ulang untuk setiap sheet
+    frames = [None] * len(tasks)
+    with tempfile.TemporaryDirectory(prefix="inspire-parse-") as tmp:
+        paths = []
+        for i, data in enumerate(datas):
+            paths.append(os.path.join(tmp, str(i)))
+            with open(paths[-1], "wb") as f:
+                f.write(data)
+
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context())
+        try:
+            # Worker dibuat saat submit
+            with _without_main_script():
+                futures = {
+                    pool.submit(_parse_sheet, paths[i], name, engine): task_idx
+                    for task_idx, (i, name) in enumerate(tasks)
+                }
+            for done, future in enumerate(as_completed(futures), start=1):
+                task_idx = futures[future]
+                frames[task_idx], seconds = future.result()
+                report(task_idx, seconds, done)
+        finally:
+            # Selalu ditutup, juga kalau pool rusak / ada exception
+            pool.shutdown(wait=True, cancel_futures=True)
+    return frames
+
+
+def parse_workbooks(datas, sheet_name=None, engine=None, max_workers=None, on_sheet=None):
+    """
+    Parse several workbooks (raw bytes) with one task per (workbook, sheet).
+
+    Tasks run in a process pool when there is more than one task, more than
+    one worker and at least ``pool_min_bytes()`` of input; the pool lives for
+    one call and is always shut down.
+    Results are reassembled in input order (and sheet order within each
+    workbook), so the output never depends on scheduling.
+    ``on_sheet(name, seconds, done, total)`` is called as tasks finish.
+    """
+    engine = resolve_engine(engine)
+
+    tasks = []
+    for i, data in enumerate(datas):
+        names = sheet_names(data, engine) if sheet_name is None else [sheet_name]
+        tasks.extend((i, name) for name in names)
+
+    def report(task_idx, seconds, done):
+        name = tasks[task_idx][1]
+        logger.info("Parsed sheet '%s' in %.3fs (%s)", name, seconds, engine)
+        if on_sheet is not None:
+            on_sheet(name, seconds, done, len(tasks))
+
+    workers = min(max_workers or default_workers(), len(tasks))
+    frames = None
+    if workers > 1 and sum(len(d) for d in datas) >= pool_min_bytes() and can_use_pool():
+        try:
+            frames = _parse_in_pool(datas, tasks, engine, workers, report)
+        except BrokenProcessPool:
+            # Worker mati (mis. kehabisan memori) -> lanjut serial
+            logger.warning("Parse pool broke, parsing serially")
+            frames = None
+
+    if frames is None:
+        frames = []
+        for task_idx, (i, name) in enumerate(tasks):
+            df, seconds = _parse_sheet(datas[i], name, engine)
+            frames.append(df)
+            report(task_idx, seconds, task_idx + 1)
+
+    # Susun ulang sesuai urutan file & sheet
+    results = [{} for _ in datas]
+    for (i, name), df in zip(tasks, frames):
+        results[i][name] = df
+
+    if sheet_name is not None:
+        return [r[sheet_name] for r in results]
+    return results
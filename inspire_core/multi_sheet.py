@@ -0,0 +1,375 @@
+"""
+Super Download: many analysis sheets in one Excel workbook.
+
+The work is split in two steps:
+- planning (per sheet, in a thread pool): numeric coercion, TOTAL / ranking /
+  vendor masks, per-cell format codes and column widths. A plan holds plain
+  arrays and format specs only, no xlsxwriter objects, so sheets can be
+  planned in parallel.
+- assembly (one thread): the plans are written in the selected order into one
+  ``constant_memory`` workbook with ``write_frame``, as soon as each plan is
+  ready. Formats are created once per workbook and shared between sheets.
+
+``on_sheet(sheet, done, total)`` is called after each sheet is written.
+
+Configuration:
+- INSPIRE_EXPORT_WORKERS : planning threads (default 4)
+"""
+
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from inspire_core.export import (
+    EXPORT_SPOOL_BYTES,
+    NUM_FORMAT_RUPIAH,
+    NUM_FORMAT_PCT,
+    TOTAL_FORMAT,
+    FIRST_FORMAT,
+    SECOND_FORMAT,
+    YEAR_TOTAL_FORMAT,
+    VENDOR_TOTAL_FORMAT,
+    coerce_numeric,
+    column_widths,
+    write_frame,
+)
+from inspire_core.totals import total_row_mask
+
+
+DEFAULT_WORKERS = 4
+
+RUPIAH = {"num_format": NUM_FORMAT_RUPIAH}
+PCT = {"num_format": NUM_FORMAT_PCT}
+BOLD = {"bold": True, "num_format": NUM_FORMAT_RUPIAH}
+
+
+class SheetPlan:
+    """
+    Everything needed to write one sheet. Formats are integer codes into
+    ``specs`` (code 0 = no format); ``formats[c]`` / ``blank_formats[c]`` is
+    one code for the whole column or an int array with one code per row.
+    """
+
+    def __init__(self, df):
+        self.df = df
+        self.specs = [None]
+        self._codes = {}
+        self.number_cols = set()
+        self.formats = [0] * df.shape[1]
+        self.blank_formats = None
+        self.column_formats = [0] * df.shape[1]
+        self.widths = column_widths(df)
+
+    def code(self, spec):
+        key = tuple(sorted(spec.items()))
+        if key not in self._codes:
+            self._codes[key] = len(self.specs)
+            self.specs.append(spec)
+        return self._codes[key]
+
+
+def _zero_mask(series):
+    # Nilai 0 (int/float) -> tidak diberi highlight ranking
+    values = series.to_numpy()
+    if values.dtype.kind in "biuf":
+        return values == 0
+    if values.dtype == object:
+        return np.array([isinstance(v, (int, float)) and v == 0 for v in values], dtype=bool)
+    return np.zeros(len(values), dtype=bool)
+
+
+def _row_rank(df, num_cols):
+    # Posisi (dalam num_cols) vendor termurah & kedua per baris, 0/NaN diabaikan; -1 = tidak ada
+    values = df[num_cols].to_numpy(dtype=float, na_value=np.nan)
+    values[values == 0] = np.nan
+    n_valid = (~np.isnan(values)).sum(axis=1)
+
+    ranked = np.argsort(values, axis=1, kind="stable")
+    first = np.where(n_valid >= 1, ranked[:, 0] if len(num_cols) else -1, -1)
+    second = np.where(n_valid >= 2, ranked[:, 1] if len(num_cols) > 1 else -1, -1)
+    return first, second
+
+
+def _vendor_column(df, col):
+    # Nama vendor per baris dari kolom "1st Vendor" / "2nd Vendor" (tidak ada -> None)
+    if col in df.columns:
+        return df[col].to_numpy(dtype=object)
+    return np.full(len(df), None, dtype=object)
+
+
+def _label_mask(df, idx):
+    if idx is None:
+        return np.zeros(len(df), dtype=bool)
+    return df.iloc[:, idx].astype(str).str.strip().str.upper().eq("TOTAL").to_numpy()
+
+
+# ================= PLAN: TCO by Year / TCO by Region / UPL Comparison =================
+def plan_ranking_sheet(sheet, df, ranking_sheets=(), bid_sheet=None, merge_sheet=None):
+    """
+    - ``ranking_sheets``: 1st / 2nd lowest non-zero vendor per row highlighted
+      (bold on TOTAL rows).
+    - ``bid_sheet``: highlight the vendors named in "1st Vendor" / "2nd Vendor".
+    - ``merge_sheet``: TOTAL rows use the green total format and zeros keep
+      it; on other sheets TOTAL rows are bold and zeros are never highlighted.
+    """
+    plan = SheetPlan(df)
+    num_cols = df.select_dtypes(include=["number"]).columns.tolist()
+    pct_cols = [c for c in df.columns if "%" in c]
+
+    is_total = total_row_mask(df)
+    fmt_total = plan.code({**TOTAL_FORMAT, **RUPIAH}) if sheet == merge_sheet else plan.code(BOLD)
+    fmt_1, fmt_2 = plan.code({**FIRST_FORMAT, **RUPIAH}), plan.code({**SECOND_FORMAT, **RUPIAH})
+    fmt_1b = plan.code({**FIRST_FORMAT, "bold": True, **RUPIAH})
+    fmt_2b = plan.code({**SECOND_FORMAT, "bold": True, **RUPIAH})
+
+    first_rank = second_rank = None
+    if sheet in ranking_sheets:
+        first_rank, second_rank = _row_rank(df, num_cols)
+    elif sheet == bid_sheet:
+        first_vendor = _vendor_column(df, "1st Vendor")
+        second_vendor = _vendor_column(df, "2nd Vendor")
+
+    for col_idx, col in enumerate(df.columns):
+        if col in pct_cols:
+            base = plan.code(PCT)
+        elif col in num_cols:
+            base = plan.code(RUPIAH)
+        else:
+            base = 0
+
+        if first_rank is not None:
+            k = num_cols.index(col) if col in num_cols else -2
+            is_first, is_second = first_rank == k, second_rank == k
+        elif sheet == bid_sheet:
+            is_first, is_second = first_vendor == col, second_vendor == col
+        else:
+            is_first = is_second = np.zeros(len(df), dtype=bool)
+
+        fmt = np.where(is_total, fmt_total, 0)
+        fmt = np.where(is_second, np.where(is_total, fmt_2b, fmt_2), fmt)
+        fmt = np.where(is_first, np.where(is_total, fmt_1b, fmt_1), fmt)
+        if sheet != merge_sheet:
+            fmt = np.where(_zero_mask(df[col]), 0, fmt)
+
+        plan.formats[col_idx] = np.where(fmt == 0, base, fmt)
+        if col in pct_cols or col in num_cols:
+            plan.number_cols.add(col_idx)
+
+    return plan
+
+
+# ================= PLAN: TCO by Year & Region =================
+def plan_year_region_sheet(sheet, df, ranking_sheets=(), bid_sheet=None,
+                           merge_sheet=None, cost_sheet=None):
+    """
+    Like ``plan_ranking_sheet`` plus the year / vendor total rows of the
+    merge sheet (YEAR / SCOPE in the 2nd / 3rd column) and the cost sheet
+    (YEAR / SCOPE columns found by name): yellow for a year total, green for
+    a vendor total.
+    """
+    plan = SheetPlan(df)
+    num_cols = df.select_dtypes(include=["number"]).columns.tolist()
+    pct_cols = [c for c in df.columns if "%" in c]
+
+    year_idx = scope_idx = None
+    if sheet == merge_sheet:
+        year_idx, scope_idx = 1, 2
+    elif sheet == cost_sheet:
+        year_col = next((c for c in df.columns if "YEAR" in c.upper()), None)
+        scope_col = next((c for c in df.columns if "SCOPE" in c.upper()), None)
+        year_idx = df.columns.get_loc(year_col) if year_col else None
+        scope_idx = df.columns.get_loc(scope_col) if scope_col else None
+
+    year_total = _label_mask(df, year_idx)
+    scope_total = _label_mask(df, scope_idx) & ~year_total
+    row_fmt = np.where(year_total, plan.code({**VENDOR_TOTAL_FORMAT, **RUPIAH}), 0)
+    row_fmt = np.where(scope_total, plan.code({**YEAR_TOTAL_FORMAT, **RUPIAH}), row_fmt)
+
+    is_total = total_row_mask(df)
+    fmt_bold, fmt_rp, fmt_pct = plan.code(BOLD), plan.code(RUPIAH), plan.code(PCT)
+    fmt_1, fmt_2 = plan.code({**FIRST_FORMAT, **RUPIAH}), plan.code({**SECOND_FORMAT, **RUPIAH})
+    fmt_1b = plan.code({**FIRST_FORMAT, "bold": True, **RUPIAH})
+    fmt_2b = plan.code({**SECOND_FORMAT, "bold": True, **RUPIAH})
+
+    if sheet in ranking_sheets:
+        first_rank, second_rank = _row_rank(df, num_cols)
+    elif sheet == bid_sheet:
+        first_vendor = _vendor_column(df, "1st Vendor")
+        second_vendor = _vendor_column(df, "2nd Vendor")
+
+    for col_idx, col in enumerate(df.columns):
+        fmt = np.zeros(len(df), dtype=np.intp)
+        if sheet in ranking_sheets:
+            k = num_cols.index(col) if col in num_cols else -2
+            not_zero = ~_zero_mask(df[col])
+            fmt = np.where((second_rank == k) & not_zero, np.where(is_total, fmt_2b, fmt_2), fmt)
+            fmt = np.where((first_rank == k) & not_zero, np.where(is_total, fmt_1b, fmt_1), fmt)
+        elif sheet == bid_sheet:
+            fmt = np.where(second_vendor == col, fmt_2, fmt)
+            fmt = np.where(first_vendor == col, fmt_1, fmt)
+
+        # Baris TOTAL tanpa highlight & tanpa format baris -> bold
+        fmt = np.where(is_total & (fmt == 0) & (row_fmt == 0), fmt_bold, fmt)
+
+        if col in pct_cols:
+            fmt = np.where(fmt == 0, fmt_pct, fmt)
+        elif col in num_cols:
+            fmt = np.where(fmt == 0, np.where(row_fmt == 0, fmt_rp, row_fmt), fmt)
+        else:
+            fmt = np.where(row_fmt == 0, fmt, row_fmt)
+
+        plan.formats[col_idx] = fmt
+        if col in pct_cols or col in num_cols:
+            plan.number_cols.add(col_idx)
+
+    return plan
+
+
+# ================= PLAN: TCO by Round / UPL Comparison Round =================
+def plan_round_sheet(sheet, df, bid_sheet=None):
+    """
+    Columns with any numeric value are written as numbers. TOTAL rows use the
+    green total format (blank cells included), except on ``bid_sheet`` where
+    only the 1st / 2nd vendor columns are highlighted.
+    """
+    df, numeric_cols = coerce_numeric(df)
+    plan = SheetPlan(df)
+    pct_cols = [c for c in df.columns if "%" in c]
+
+    fmt_total = plan.code({**TOTAL_FORMAT, **RUPIAH})
+    fmt_first = plan.code({**FIRST_FORMAT, **RUPIAH})
+    fmt_second = plan.code({**SECOND_FORMAT, **RUPIAH})
+
+    # Sel kosong hanya diberi format highlight / TOTAL (bukan format kolom)
+    plan.blank_formats = [0] * df.shape[1]
+
+    is_total = total_row_mask(df)
+    if sheet == bid_sheet:
+        first_vendor = df["1st Vendor"].to_numpy(dtype=object)
+        second_vendor = df["2nd Vendor"].to_numpy(dtype=object)
+
+    for col_idx, col in enumerate(df.columns):
+        if sheet == bid_sheet:
+            fmt = np.zeros(len(df), dtype=np.intp)
+            if col in numeric_cols:
+                fmt = np.where(first_vendor == col, fmt_first, np.where(second_vendor == col, fmt_second, 0))
+        else:
+            fmt = np.where(is_total, fmt_total, 0)
+
+        if col in pct_cols:
+            base = plan.code(PCT)
+        elif col in numeric_cols:
+            base = plan.code(RUPIAH)
+        else:
+            base = 0
+
+        plan.formats[col_idx] = np.where(fmt == 0, base, fmt)
+        if col in pct_cols or col in numeric_cols:
+            plan.number_cols.add(col_idx)
+        plan.blank_formats[col_idx] = fmt
+
+    return plan
+
+
+# ================= PLAN: Standard Deviation =================
+def plan_deviation_sheet(sheet, df, min_sheet=None):
+    """
+    Numbers get the Rupiah / percent format (also as column format). On
+    ``min_sheet`` every numeric column is a percentage and the lowest value
+    of each row is highlighted.
+    """
+    plan = SheetPlan(df)
+
+    if sheet == min_sheet:
+        numeric_cols = [c for c in df.columns if pd.api.types.is_numeric_dtype(df[c])]
+        numeric_idx = [df.columns.get_loc(c) for c in numeric_cols]
+        fmt_pct = plan.code(PCT)
+        fmt_min = plan.code({"bg_color": "#D9EAD3", **PCT})
+
+        values = df.iloc[:, numeric_idx].to_numpy(dtype=float, na_value=np.nan)
+        row_min = np.fmin.reduce(values, axis=1, initial=np.inf)
+        is_min = values == row_min[:, None]
+
+        for k, col_idx in enumerate(numeric_idx):
+            plan.formats[col_idx] = np.where(is_min[:, k], fmt_min, fmt_pct)
+            plan.column_formats[col_idx] = fmt_pct
+            plan.number_cols.add(col_idx)
+        return plan
+
+    numeric_cols = df.select_dtypes(include=["number"]).columns.tolist()
+    pct_cols = [c for c in df.columns if "%" in c]
+
+    for col_idx, col in enumerate(df.columns):
+        if col in pct_cols:
+            fmt = plan.code(PCT)
+        elif col in numeric_cols:
+            fmt = plan.code(RUPIAH)
+        else:
+            continue
+        plan.formats[col_idx] = fmt
+        plan.column_formats[col_idx] = fmt
+        plan.number_cols.add(col_idx)
+
+    return plan
+
+
+# ================= ASSEMBLY =================
+def _write_plan(writer, sheet, plan, format_cache):
+    workbook = writer.book
+    plan.df.iloc[:0].to_excel(writer, index=False, sheet_name=sheet)
+    worksheet = writer.sheets[sheet]
+
+    objects = [None]
+    for spec in plan.specs[1:]:
+        key = tuple(sorted(spec.items()))
+        if key not in format_cache:
+            format_cache[key] = workbook.add_format(spec)
+        objects.append(format_cache[key])
+    formats = np.array(objects, dtype=object)
+
+    write_frame(
+        worksheet, plan.df, plan.number_cols,
+        # Kode format -> objek Format (skalar atau array per baris)
+        [formats[codes] for codes in plan.formats],
+        None if plan.blank_formats is None else [formats[codes] for codes in plan.blank_formats],
+    )
+
+    for i, (width, code) in enumerate(zip(plan.widths, plan.column_formats)):
+        worksheet.set_column(i, i, width, formats[code])
+
+
+def _default_workers():
+    workers = os.environ.get("INSPIRE_EXPORT_WORKERS")
+    return max(1, int(workers)) if workers else DEFAULT_WORKERS
+
+
+def build_multi_sheet_excel(selected_sheets, df_dict, plan_sheet, on_sheet=None,
+                            max_workers=None, **plan_options):
+    """
+    Workbook bytes with one sheet per name in ``selected_sheets``.
+    ``plan_sheet(sheet, df, **plan_options)`` returns the ``SheetPlan`` of a
+    sheet, e.g. ``plan_ranking_sheet`` with the page's sheet names.
+    """
+    selected_sheets = list(selected_sheets)
+    workers = min(max_workers or _default_workers(), max(len(selected_sheets), 1))
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="inspire-export") as pool:
+        futures = [pool.submit(plan_sheet, sheet, df_dict[sheet], **plan_options) for sheet in selected_sheets]
+
+        with tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_BYTES) as output:
+            with pd.ExcelWriter(
+                output, engine="xlsxwriter",
+                engine_kwargs={"options": {"constant_memory": True}},
+            ) as writer:
+                format_cache = {}
+                # Ditulis sesuai urutan pilihan; sheet berikutnya masih di-plan di thread lain
+                for done, (sheet, future) in enumerate(zip(selected_sheets, futures), start=1):
+                    _write_plan(writer, sheet, future.result(), format_cache)
+                    if on_sheet is not None:
+                        on_sheet(sheet, done, len(selected_sheets))
+
+            output.seek(0)
+            return output.read()
@@ -0,0 +1,84 @@
+"""
+Server-side windowing for large result tables.
+
+``st.dataframe`` with a Styler styles and serializes every row of the frame on
+each rerun. The helpers here filter and sort a frame and cut it down to one
+page, so only that page is styled and sent to the browser; the downloads keep
+using the full frame.
+
+Configuration:
+- INSPIRE_TABLE_PAGE_ROWS : rows per page (default 500). Frames up to this
+  size are shown whole.
+"""
+
+import math
+import os
+from collections import namedtuple
+
+import numpy as np
+
+
+DEFAULT_PAGE_ROWS = 500
+
+TableWindow = namedtuple(
+    "TableWindow",
+    ["frame", "page", "pages", "start", "stop", "rows"],
+)
+
+
+def page_rows():
+    value = os.environ.get("INSPIRE_TABLE_PAGE_ROWS")
+    return max(1, int(value)) if value else DEFAULT_PAGE_ROWS
+
+
+def filter_rows(df, query):
+    # Baris yang salah satu selnya memuat ``query`` (huruf besar/kecil sama)
+    query = str(query or "").strip().lower()
+    if not query or df.empty:
+        return df
+
+    mask = np.zeros(len(df), dtype=bool)
+    for i in range(df.shape[1]):
+        col = df.iloc[:, i]
+        text = col.astype(str).where(col.notna(), "")
+        mask |= text.str.lower().str.contains(query, regex=False).to_numpy()
+    return df[mask]
+
+
+def sort_rows(df, column, descending=False):
+    """
+    ``df`` sorted by ``column`` (stable, empty cells last). Columns that mix
+    numbers and text are sorted by their text.
+    """
+    if column is None or column not in df.columns:
+        return df
+
+    values = df[column]
+    if values.ndim > 1:
+        # Nama kolom dobel -> pakai kolom pertama
+        values = values.iloc[:, 0]
+    values = values.reset_index(drop=True)
+    try:
+        order = values.sort_values(ascending=not descending, kind="stable", na_position="last").index
+    except TypeError:
+        text = values.astype(str).where(values.notna(), None)
+        order = text.sort_values(ascending=not descending, kind="stable", na_position="last").index
+    return df.iloc[order.to_numpy()]
+
+
+def page_count(rows, per_page):
+    return max(1, math.ceil(rows / per_page))
+
+
+def table_window(df, page=1, per_page=None):
+    """
+    Page ``page`` (1-based, clamped to the valid range) of ``df`` with
+    ``per_page`` rows per page.
+    """
+    per_page = per_page or page_rows()
+    pages = page_count(len(df), per_page)
+    page = min(max(1, int(page)), pages)
+
+    start = (page - 1) * per_page
+    stop = min(start + per_page, len(df))
+    return TableWindow(df.iloc[start:stop], page, pages, start, stop, len(df))
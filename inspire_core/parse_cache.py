@@ -0,0 +1,267 @@
+"""
+Parse cache for uploaded workbooks, keyed by the SHA-256 of the file bytes.
+
+One cache is shared by every page (and every session in the same process), so
+the same workbook uploaded to two modules is only parsed once. Entries are
+evicted least-recently-used once the in-memory size exceeds ``max_bytes``.
+When ``cache_dir`` is set, parsed workbooks are also pickled to disk and
+survive a session reset or an app restart.
+
+Configuration for the shared instance:
+- INSPIRE_PARSE_CACHE_MB  : in-memory budget in MB (default 512)
+- INSPIRE_PARSE_CACHE_DIR : directory for the on-disk copy (default: off)
+"""
+
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+from io import BytesIO
+
+import pandas as pd
+
+from inspire_core.ingest import read_excel_sheets, parse_workbooks
+
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+def read_source_bytes(source):
+    # UploadedFile / BytesIO / path -> bytes, tanpa menggeser posisi file
+    if isinstance(source, (bytes, bytearray)):
+        return bytes(source)
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            return f.read()
+    if hasattr(source, "getvalue"):
+        return source.getvalue()
+
+    pos = source.tell()
+    source.seek(0)
+    data = source.read()
+    source.seek(pos)
+    return data
+
+
+def file_digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def cache_key(digest, sheet_name=None):
+    # Satu workbook bisa di-cache per pilihan sheet (semua sheet / sheet tertentu)
+    if sheet_name is None:
+        return digest
+    return f"{digest}-{hashlib.sha256(repr(sheet_name).encode()).hexdigest()[:12]}"
+
+
+def frame_nbytes(sheets):
+    # Perkiraan ukuran memori satu workbook (dict sheet -> DataFrame)
+    if isinstance(sheets, pd.DataFrame):
+        sheets = {None: sheets}
+    return int(sum(df.memory_usage(index=True, deep=True).sum() for df in sheets.values()))
+
+
+def _copy_sheets(sheets):
+    # Selalu kembalikan salinan supaya page tidak mengubah isi cache
+    if isinstance(sheets, pd.DataFrame):
+        return sheets.copy()
+    return {name: df.copy() for name, df in sheets.items()}
+
+
+class ParseCache:
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, cache_dir=None):
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self._entries = OrderedDict()   # key -> (sheets, nbytes)
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    # ================= MEMORY =================
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+
+        sheets = self._load_disk(key)
+        if sheets is not None:
+            self._put_memory(key, sheets)
+            with self._lock:
+                self.hits += 1
+            return sheets
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, sheets):
+        self._put_memory(key, sheets)
+        self._store_disk(key, sheets)
+
+    def _put_memory(self, key, sheets):
+        nbytes = frame_nbytes(sheets)
+        if nbytes > self.max_bytes:
+            return
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._total_bytes -= old[1]
+
+            self._entries[key] = (sheets, nbytes)
+            self._total_bytes += nbytes
+
+            # LRU eviction sampai muat di budget
+            while self._total_bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._total_bytes -= evicted
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    @property
+    def total_bytes(self):
+        return self._total_bytes
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    # ================= DISK =================
+    def _disk_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+
+    def _load_disk(self, key):
+        if not self.cache_dir:
+            return None
+
+        path = self._disk_path(key)
+        try:
+            with open(path, "rb") as f:
+                sheets = pickle.load(f)
+        except Exception:
+            # File rusak / versi pandas beda -> anggap miss, parse ulang
+            return None
+
+        # Tandai sebagai baru dipakai
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return sheets
+
+    def _store_disk(self, key, sheets):
+        if not self.cache_dir:
+            return
+
+        # Tulis ke file sementara lalu rename (atomic)
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(sheets, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self._disk_path(key))
+        except OSError:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            return
+
+        self._prune_disk()
+
+    def _prune_disk(self):
+        # Disk memakai budget yang sama, file paling lama dipakai dibuang duluan
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".pkl"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+
+def _default_cache():
+    max_mb = os.environ.get("INSPIRE_PARSE_CACHE_MB")
+    max_bytes = int(float(max_mb) * 1024 * 1024) if max_mb else DEFAULT_MAX_BYTES
+    return ParseCache(max_bytes=max_bytes, cache_dir=os.environ.get("INSPIRE_PARSE_CACHE_DIR") or None)
+
+
+parse_cache = _default_cache()
+
+
+def read_workbook(source, sheet_name=None, cache=None, engine=None, on_sheet=None):
+    """
+    Cached ``pd.read_excel``: returns a dict of sheet -> DataFrame
+    (``sheet_name=None``) or a single DataFrame, like pandas does.
+    Identical file bytes are parsed only once; ``engine`` and ``on_sheet``
+    are passed to ``read_excel_sheets`` on a cache miss.
+    """
+    cache = parse_cache if cache is None else cache
+
+    data = read_source_bytes(source)
+    key = cache_key(file_digest(data), sheet_name)
+
+    sheets = cache.get(key)
+    if sheets is None:
+        sheets, _ = read_excel_sheets(BytesIO(data), sheet_name=sheet_name, engine=engine, on_sheet=on_sheet)
+        cache.put(key, sheets)
+
+    return _copy_sheets(sheets)
+
+
+def read_workbooks(sources, sheet_name=None, cache=None, engine=None, max_workers=None, on_sheet=None):
+    """
+    ``read_workbook`` for a list of files: cache misses are parsed together
+    in a process pool. Results come back in the same order as ``sources``.
+    """
+    cache = parse_cache if cache is None else cache
+
+    keys = []
+    found = {}      # key -> sheets
+    missing = {}    # key -> bytes (file yang sama cukup di-parse sekali)
+    for source in sources:
+        data = read_source_bytes(source)
+        key = cache_key(file_digest(data), sheet_name)
+        keys.append(key)
+        if key in found or key in missing:
+            continue
+
+        sheets = cache.get(key)
+        if sheets is None:
+            missing[key] = data
+        else:
+            found[key] = sheets
+
+    parsed = parse_workbooks(
+        list(missing.values()), sheet_name=sheet_name, engine=engine,
+        max_workers=max_workers, on_sheet=on_sheet,
+    )
+    for key, sheets in zip(missing, parsed):
+        cache.put(key, sheets)
+        found[key] = sheets
+
+    return [_copy_sheets(found[key]) for key in keys]
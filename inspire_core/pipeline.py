@@ -0,0 +1,208 @@
+"""
+Named, memoized stages for the analysis modules.
+
+A module declares its data work as stages with named inputs; an input is
+either a source passed to ``Pipeline.run`` (raw sheets, converter rate, ...)
+or the result of an earlier stage::
+
+    pipeline = Pipeline("tco_by_year")
+
+    @pipeline.stage("clean", inputs=["raw"])
+    def clean(raw): ...
+
+    @pipeline.stage("merge", inputs=["clean"])
+    def merge(clean): ...
+
+    run = pipeline.run(raw=all_df)
+    run["merge"], run.ran, run.cached
+
+Every stage result is memoized by a fingerprint of its inputs: sources are
+hashed by value (DataFrames by content), stage inputs by the fingerprint of
+the stage that produced them. Changing one source therefore only recomputes
+the stages downstream of it. The memo is shared by all sessions, so stage
+functions must not modify their inputs; ``run[name]`` hands out copies.
+
+Configuration:
+- INSPIRE_PIPELINE_ENTRIES : memoized stage results kept per pipeline
+  (default 64)
+"""
+
+import copy
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+import pandas as pd
+
+from inspire_core.deferred import arg_digest
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ENTRIES = 64
+
+Stage = namedtuple("Stage", ["name", "func", "inputs"])
+
+
+def _max_entries():
+    value = os.environ.get("INSPIRE_PIPELINE_ENTRIES")
+    return max(1, int(value)) if value else DEFAULT_ENTRIES
+
+
+def _fresh(value):
+    # Salinan untuk page: hasil di memo tidak boleh ikut berubah
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return value.copy()
+    if isinstance(value, dict):
+        return {k: _fresh(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(_fresh(v) for v in value)
+    return copy.copy(value)
+
+
+class PipelineRun:
+    """
+    Results of one ``Pipeline.run``. ``ran`` / ``cached`` list the stages
+    that were computed / taken from the memo, in pipeline order; ``seconds``
+    maps every computed stage to its run time.
+    """
+
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+        self.sources = {}
+        self.results = {}
+        self.fingerprints = {}
+        self.source_fingerprints = {}
+        self.ran = []
+        self.cached = []
+        self.seconds = {}
+
+    def __getitem__(self, name):
+        return _fresh(self.results[name])
+
+    def __contains__(self, name):
+        return name in self.results
+
+    def report(self):
+        # Satu baris per stage: status + waktu (untuk ditampilkan/log)
+        rows = []
+        for stage in self.pipeline.stages:
+            if stage.name in self.seconds:
+                rows.append({"Stage": stage.name, "Status": "ran", "Seconds": round(self.seconds[stage.name], 3)})
+            elif stage.name in self.cached:
+                rows.append({"Stage": stage.name, "Status": "cached", "Seconds": 0.0})
+        return pd.DataFrame(rows, columns=["Stage", "Status", "Seconds"])
+
+    def summary(self):
+        return f"ran: {', '.join(self.ran) or '-'} | cached: {', '.join(self.cached) or '-'}"
+
+
+class Pipeline:
+    def __init__(self, name, max_entries=None):
+        self.name = name
+        self.max_entries = max_entries or _max_entries()
+        self.stages = []
+        self._memo = OrderedDict()   # fingerprint -> hasil stage
+        self._lock = threading.Lock()
+
+    def stage(self, name, inputs=()):
+        """
+        Decorator registering ``func(*inputs)`` as stage ``name``. Stages run
+        in registration order, so inputs must be sources or earlier stages.
+        """
+        def register(func):
+            if any(s.name == name for s in self.stages):
+                raise ValueError(f"Stage '{name}' is already defined in pipeline '{self.name}'")
+            self.stages.append(Stage(name, func, tuple(inputs)))
+            return func
+
+        return register
+
+    def _lookup(self, key):
+        with self._lock:
+            if key in self._memo:
+                self._memo.move_to_end(key)
+                return True, self._memo[key]
+        return False, None
+
+    def _store(self, key, value):
+        with self._lock:
+            self._memo[key] = value
+            while len(self._memo) > self.max_entries:
+                self._memo.popitem(last=False)
+
+    def run(self, targets=None, run=None, **sources):
+        """
+        Runs the stages needed for ``targets`` (default: every stage) and
+        returns a ``PipelineRun``. Passing an earlier ``run`` continues it:
+        its sources and stage results are reused, so a branch whose source is
+        only known later in the page (e.g. the converter rate) can be added
+        to the same run and report.
+        """
+        wanted = self._required(targets)
+        if run is None:
+            run = PipelineRun(self)
+        run.sources.update(sources)
+        sources = run.sources
+        source_fps = run.source_fingerprints
+
+        for stage in self.stages:
+            if stage.name not in wanted or stage.name in run.results:
+                continue
+
+            parts = [self.name, stage.name, f"{stage.func.__module__}.{stage.func.__qualname__}"]
+            for name in stage.inputs:
+                if name in run.fingerprints:
+                    parts.append(run.fingerprints[name])
+                elif name in sources:
+                    if name not in source_fps:
+                        source_fps[name] = arg_digest(sources[name])
+                    parts.append(source_fps[name])
+                else:
+                    raise KeyError(f"Stage '{stage.name}' needs '{name}', which is neither a source nor an earlier stage")
+            key = hashlib.sha256(repr(parts).encode()).hexdigest()
+
+            hit, value = self._lookup(key)
+            if hit:
+                run.cached.append(stage.name)
+            else:
+                args = [run.results[n] if n in run.results else sources[n] for n in stage.inputs]
+                started = time.perf_counter()
+                value = stage.func(*args)
+                run.seconds[stage.name] = time.perf_counter() - started
+                run.ran.append(stage.name)
+                self._store(key, value)
+
+            run.results[stage.name] = value
+            run.fingerprints[stage.name] = key
+
+        logger.info("Pipeline %s: %s", self.name, run.summary())
+        return run
+
+    def _required(self, targets):
+        if targets is None:
+            return {s.name for s in self.stages}
+
+        by_name = {s.name: s for s in self.stages}
+        wanted = set()
+        todo = list(targets)
+        while todo:
+            name = todo.pop()
+            if name in wanted or name not in by_name:
+                continue
+            wanted.add(name)
+            todo.extend(by_name[name].inputs)
+        unknown = set(targets) - set(by_name)
+        if unknown:
+            raise KeyError(f"Unknown stages for pipeline '{self.name}': {sorted(unknown)}")
+        return wanted
+
+    def clear(self):
+        with self._lock:
+            self._memo.clear()
+
+    def __len__(self):
+        return len(self._memo)
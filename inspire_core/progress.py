@@ -0,0 +1,37 @@
+"""
+Upload progress messages built from the real parse / clean work.
+
+``notify`` is any callable taking one message (e.g. the ``.toast`` of a toast
+returned by ``st.toast``), so this module stays free of Streamlit imports.
+"""
+
+import pandas as pd
+
+
+def _label(name):
+    # Sheet yang dipilih via index (mis. 0) tidak punya nama untuk ditampilkan
+    return f": {name}" if isinstance(name, str) else ""
+
+
+def sheet_progress(notify):
+    # Callback ``on_sheet`` untuk read_workbook / read_workbooks
+    def on_sheet(name, seconds, done, total):
+        notify(f"🔍 Reading sheet {done} of {total}{_label(name)} ({seconds:.1f}s)")
+
+    return on_sheet
+
+
+def clean_progress(notify, name, rows, done, total):
+    notify(f"🧹 Cleaning {name} ({done} of {total}) — {rows:,} rows")
+
+
+def upload_summary(sheets, files=1):
+    # ``sheets``: DataFrame tunggal atau list/iterable DataFrame yang sudah dibaca
+    if isinstance(sheets, pd.DataFrame):
+        sheets = [sheets]
+    sheets = list(sheets)
+
+    rows = sum(len(df) for df in sheets)
+    prefix = "File" if files == 1 else f"{files} files"
+    label = "sheet" if len(sheets) == 1 else "sheets"
+    return f"✅ {prefix} uploaded successfully! {len(sheets)} {label}, {rows:,} rows"
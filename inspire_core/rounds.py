@@ -0,0 +1,59 @@
+"""
+Per-file store of processed rounds for the Round-by-Round pages.
+
+Every uploaded round file is processed once (parse, clean and the page's own
+shaping) and kept under its file name and the SHA-256 of its bytes, so adding
+one round file to a session only processes that file. A file re-uploaded
+under the same name with new content counts as a new round. The digest is
+computed once per upload (``UploadedFile.file_id``), not on every rerun.
+"""
+
+from inspire_core.parse_cache import read_source_bytes, file_digest
+
+
+def round_key(file):
+    return (file.name, file_digest(read_source_bytes(file)))
+
+
+class RoundStore:
+    def __init__(self):
+        self._rounds = {}   # (nama file, sha256) -> DataFrame hasil proses
+        self._keys = {}     # file_id upload -> (nama file, sha256)
+
+    def _key(self, file):
+        # Upload yang sama tidak di-hash ulang tiap rerun; tanpa file_id
+        # (path, BytesIO) selalu di-hash
+        upload_id = getattr(file, "file_id", None)
+        if upload_id is None:
+            return round_key(file)
+        if upload_id not in self._keys:
+            self._keys[upload_id] = round_key(file)
+        return self._keys[upload_id]
+
+    def sync(self, files, process):
+        """
+        Returns the processed frame of every file in ``files``, in order.
+        ``process(new_files)`` is called once with only the files that are
+        not in the store yet and must return one frame per file. Rounds that
+        are no longer in ``files`` are dropped from the store.
+        """
+        keys = [self._key(f) for f in files]
+
+        new = [(key, f) for key, f in zip(keys, files) if key not in self._rounds]
+        if new:
+            frames = process([f for _, f in new])
+            self._rounds.update(zip([key for key, _ in new], frames))
+
+        self._rounds = {key: self._rounds[key] for key in keys}
+        self._keys = {
+            f.file_id: key for f, key in zip(files, keys)
+            if getattr(f, "file_id", None) is not None
+        }
+        # Selalu kembalikan salinan supaya page tidak mengubah isi store
+        return [self._rounds[key].copy() for key in keys]
+
+    def __len__(self):
+        return len(self._rounds)
+
+    def __contains__(self, file):
+        return self._key(file) in self._rounds
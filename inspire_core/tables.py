@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+
+
+HEADER_SCAN_ROWS = 5
+HEADER_THRESHOLD = 0.8
+
+
+def _is_text(x):
+    return isinstance(x, str)
+
+
+def _is_number(x):
+    # bool adalah subclass int, tapi bukan angka harga
+    return isinstance(x, (int, float, np.number)) and not isinstance(x, (bool, np.bool_))
+
+
+_text_mask = np.frompyfunc(_is_text, 1, 1)
+_number_mask = np.frompyfunc(_is_number, 1, 1)
+
+
+def _runs(mask):
+    # (start, end) untuk tiap run True yang berurutan, end eksklusif
+    padded = np.concatenate(([False], mask, [False]))
+    edges = np.flatnonzero(padded[1:] != padded[:-1])
+    return list(zip(edges[::2].tolist(), edges[1::2].tolist()))
+
+
+def split_tables(df):
+    """
+    Splits a raw sheet into the tables embedded in it:
+    1) vertical split on fully blank rows,
+    2) horizontal split on columns that are blank within that row band,
+    3) rows that are blank inside a block are dropped.
+
+    The blank masks are computed once on ``df.isna()``; blocks are sliced
+    out positionally and keep the original row labels.
+    """
+    na = df.isna().to_numpy()
+    blocks = []
+
+    for row_start, row_end in _runs(~na.all(axis=1)):
+        band = na[row_start:row_end]
+        df_band = df.iloc[row_start:row_end]   # slice baris dulu -> view kecil
+
+        for col_start, col_end in _runs(~band.all(axis=0)):
+            # Tipe kolom ditentukan ulang per potongan baris (bukan per sheet)
+            block = df_band.iloc[:, col_start:col_end].infer_objects()
+
+            # Baris yang kosong di dalam block ini dibuang
+            keep = ~band[:, col_start:col_end].all(axis=1)
+            if not keep.all():
+                block = block.iloc[keep]
+
+            blocks.append(block)
+
+    return blocks
+
+
+def header_scores(df, k=HEADER_SCAN_ROWS):
+    """
+    Scores the first ``k`` rows of a block as header candidates in one pass.
+    Returns ``(str_ratio, non_numeric)``: per row, the share of text cells and
+    the share of cells that are not a number (blank cells count as both
+    non-text and non-numeric).
+    """
+    values = df.iloc[:k].to_numpy(dtype=object)
+    if values.size == 0:
+        return np.zeros(len(values)), np.zeros(len(values))
+
+    is_text = _text_mask(values).astype(bool)
+    is_number = _number_mask(values).astype(bool) & ~pd.isna(values)
+
+    return is_text.mean(axis=1), (~is_number).mean(axis=1)
+
+
+def title_rows(df, k=HEADER_SCAN_ROWS):
+    """
+    Per row of the first ``k``: True when the row is blank or title-like
+    (at most one filled cell, or less than half of the cells filled).
+    """
+    filled = df.iloc[:k].notna().to_numpy()
+    if filled.size == 0:
+        return np.zeros(len(filled), dtype=bool)
+
+    count = filled.sum(axis=1)
+    return (count <= 1) | (count < filled.shape[1] / 2)
+
+
+def find_header_row(df, k=HEADER_SCAN_ROWS, threshold=HEADER_THRESHOLD):
+    """
+    Position of the header row within the first ``k``: a row with more than
+    ``threshold`` text cells and non-numeric cells. Only rows up to the first
+    row that is not blank / title-like are candidates, so everything above
+    the header can be dropped without losing data; among them the highest
+    scoring one wins. Returns None when no candidate qualifies.
+    """
+    str_ratio, non_numeric = header_scores(df, k)
+    titles = title_rows(df, k)
+
+    # Baris data pertama membatasi kandidat (baris di atas header dibuang)
+    limit = int(np.argmin(titles)) if not titles.all() else len(titles) - 1
+    score = (str_ratio + non_numeric)[:limit + 1]
+    ok = ((str_ratio > threshold) & (non_numeric > threshold))[:limit + 1]
+    if not ok.any():
+        return None
+    return int(np.argmax(np.where(ok, score, -1)))
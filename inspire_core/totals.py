@@ -0,0 +1,132 @@
+import numpy as np
+import pandas as pd
+
+
+TOTAL_LABEL = "TOTAL"
+
+# df.attrs key: kolom tempat baris TOTAL diberi label "TOTAL" saat dibuat
+TOTAL_COLUMNS_ATTR = "total_label_columns"
+
+
+def mark_totals(df, *label_cols):
+    """
+    Flags ``df`` as holding its TOTAL rows as the exact label "TOTAL" in
+    ``label_cols``. The flag lives in ``df.attrs``, which pandas carries
+    through copies, filters, sorts and slices, so ``total_row_mask`` finds
+    those rows by comparing the flagged columns instead of scanning every
+    cell as text. Returns ``df``.
+    """
+    cols = list(df.attrs.get(TOTAL_COLUMNS_ATTR, ()))
+    cols += [c for c in label_cols if c is not None and c not in cols]
+    df.attrs[TOTAL_COLUMNS_ATTR] = tuple(cols)
+    return df
+
+
+def _is_total_label(series):
+    return series.astype(str).str.strip().str.upper().eq(TOTAL_LABEL).to_numpy()
+
+
+def total_row_mask(df):
+    """
+    Boolean mask of the TOTAL rows of ``df`` ("TOTAL" in any case). Frames
+    flagged by ``mark_totals`` are checked on their label columns only; any
+    other frame falls back to checking every text column.
+    """
+    mask = np.zeros(len(df), dtype=bool)
+
+    flagged = np.flatnonzero(df.columns.isin(df.attrs.get(TOTAL_COLUMNS_ATTR, ())))
+    if len(flagged):
+        for col_idx in flagged:
+            mask |= _is_total_label(df.iloc[:, col_idx])
+        return mask
+
+    # Tanpa flag: semua kolom teks (kolom angka tidak mungkin berisi "TOTAL")
+    for col_idx in range(df.shape[1]):
+        series = df.iloc[:, col_idx]
+        if series.dtype == object or isinstance(series.dtype, (pd.CategoricalDtype, pd.StringDtype)):
+            mask |= _is_total_label(series)
+    return mask
+
+
+def drop_total_rows(df):
+    # Salinan df tanpa baris TOTAL (untuk analisis per komponen)
+    return df[~total_row_mask(df)].copy()
+
+
+def _group_ids(df, cols, sort):
+    # Nomor grup per baris (0..n-1) sesuai urutan grup yang diinginkan
+    if not cols:
+        return np.zeros(len(df), dtype=np.int64)
+    return df.groupby(cols, sort=sort, dropna=False).ngroup().to_numpy()
+
+
+def add_group_totals(df, by, label_col, sum_cols=None, label="TOTAL", fill="",
+                     sort=False, grand_label_col=None):
+    """
+    Appends a TOTAL row after every ``by`` group.
+
+    - ``label_col`` of the total row gets ``label``, the ``by`` columns keep
+      the group keys, ``sum_cols`` (default: every numeric column outside
+      ``by``) hold the group sums and every other column gets ``fill``.
+    - ``grand_label_col``: also add a grand total after each ``by[:-1]`` group
+      (the whole frame when ``by`` has one column), labelled in that column.
+    - Groups follow first appearance, or sorted keys with ``sort=True``; rows
+      keep their order within a group.
+
+    All sums come from one ``groupby().sum()`` and the totals are interleaved
+    with the data by a single stable sort. The result is flagged with
+    ``mark_totals`` on the label columns.
+    """
+    by = [by] if isinstance(by, str) else list(by)
+    if sum_cols is None:
+        sum_cols = [
+            c for c in df.select_dtypes(include=["number"]).columns
+            if c not in by and c != label_col
+        ]
+    sum_cols = list(sum_cols)
+
+    if df.empty:
+        return mark_totals(df.reset_index(drop=True).rename_axis(columns=None), label_col, grand_label_col)
+
+    outer = by[:-1]
+    group_id = _group_ids(df, by, sort)
+    outer_id = _group_ids(df, outer, sort)
+    n_groups = group_id.max() + 1
+
+    # Kunci grup diambil dari baris pertama tiap grup (aman untuk key NaN)
+    _, first = np.unique(group_id, return_index=True)
+    sums = df[sum_cols].groupby(group_id).sum().reset_index(drop=True)
+
+    totals = pd.concat([df[by].iloc[first].reset_index(drop=True), sums], axis=1)
+    totals[label_col] = label
+    totals = totals.reindex(columns=df.columns, fill_value=fill)
+
+    parts = [df.reset_index(drop=True), totals]
+    order_outer = [outer_id, outer_id[first]]
+    order_group = [group_id, np.arange(n_groups)]
+    order_level = [np.zeros(len(df), dtype=np.int8), np.ones(n_groups, dtype=np.int8)]
+
+    if grand_label_col is not None:
+        # Grand total = jumlah subtotal dalam grup luar yang sama
+        sub_outer = outer_id[first]
+        _, grand_first = np.unique(sub_outer, return_index=True)
+        grand = sums.groupby(sub_outer).sum().reset_index(drop=True)
+
+        grand = pd.concat([totals[outer].iloc[grand_first].reset_index(drop=True), grand], axis=1)
+        grand = grand.reindex(columns=df.columns, fill_value=fill)
+        grand[grand_label_col] = label
+
+        parts.append(grand)
+        order_outer.append(sub_outer[grand_first])
+        order_group.append(np.full(len(grand), n_groups))
+        order_level.append(np.full(len(grand), 2, dtype=np.int8))
+
+    merged = pd.concat(parts, ignore_index=True)
+    order = np.lexsort((
+        np.concatenate(order_level),
+        np.concatenate(order_group),
+        np.concatenate(order_outer),
+    ))
+    # Hasil = tabel datar (nama axis kolom dari pivot/transpose tidak dibawa)
+    result = merged.iloc[order].reset_index(drop=True).rename_axis(columns=None)
+    return mark_totals(result, label_col, grand_label_col)
@@ -0,0 +1,17 @@
+"""
+Shared Streamlit widgets for the inspire analysis pages.
+
+The data work stays in ``inspire_core``; this package only holds the UI
+pieces that several pages render the same way.
+"""
+
+from inspire_ui.tables import (
+    paged_dataframe,
+)
+from inspire_ui.sections import (
+    publish_frame,
+    export_frames,
+)
+from inspire_ui.stages import (
+    stage_report,
+)
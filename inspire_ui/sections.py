@@ -0,0 +1,38 @@
+"""
+Frames shared between fragment sections and the Super Download.
+
+Each analysis section (slicers + table + download) runs as an
+``st.fragment``: changing a slicer reruns only that section, over the
+analysis frame handed to it in the last full run, instead of re-cleaning and
+re-merging the whole page.
+
+The filtered frame a section shows is also a sheet of the page's Super
+Download, which is built in the full run and does not rerun with the
+fragment. Sections publish their frame into a dict kept in session state,
+and the Super Download hands that same dict to ``deferred``: the workbook is
+hashed and built from the dict on click, so it always exports what the
+sections currently show.
+"""
+
+import streamlit as st
+
+
+def _frames(page):
+    return st.session_state.setdefault(f"section_frames_{page}", {})
+
+
+def publish_frame(page, name, df):
+    # Dipanggil dari dalam fragment: sheet ``name`` Super Download ikut berubah
+    _frames(page)[name] = df
+    return df
+
+
+def export_frames(page, frames):
+    """
+    The page's shared dict, reset to ``frames`` (sheet name -> DataFrame, in
+    sheet order). Pass it to ``deferred`` as is; do not copy it.
+    """
+    shared = _frames(page)
+    shared.clear()
+    shared.update(frames)
+    return shared
@@ -0,0 +1,19 @@
+"""
+Stage report for the pipeline behind a page.
+"""
+
+import os
+
+import streamlit as st
+
+
+def stage_report(run, page):
+    """
+    Keeps the page's last ``PipelineRun`` in session state and, with
+    INSPIRE_SHOW_STAGES=1, shows which stages ran and which came from cache.
+    """
+    st.session_state[f"pipeline_run_{page}"] = run
+    if os.environ.get("INSPIRE_SHOW_STAGES") == "1":
+        with st.expander("⚙️ Pipeline stages"):
+            st.caption(run.summary())
+            st.dataframe(run.report(), hide_index=True)
@@ -0,0 +1,90 @@
+"""
+Paged ``st.dataframe`` for large result tables.
+"""
+
+import streamlit as st
+
+from inspire_core import (
+    page_rows,
+    filter_rows,
+    sort_rows,
+    page_count,
+    table_window,
+)
+
+
+def paged_dataframe(df, style=None, key="table", container=None, per_page=None, **kwargs):
+    """
+    ``container.dataframe`` that only styles and ships one page of ``df``.
+
+    ``style(frame)`` returns the Styler for any slice of ``df`` (for example
+    ``lambda d: d.style.format(fmt)``); formats should be built from the full
+    frame so every page renders the same way. Frames that fit in one page are
+    shown whole, without paging controls. ``key`` must be unique per table.
+    """
+    container = st if container is None else container
+    per_page = per_page or page_rows()
+
+    if len(df) <= per_page:
+        return container.dataframe(style(df) if style else df, **kwargs)
+
+    # Kontrol tabel di fragment: cari/urut/ganti halaman tidak rerun seluruh page
+    with container.container():
+        return _paged_table(df, style, key, per_page, kwargs)
+
+
+@st.fragment
+def _paged_table(df, style, key, per_page, kwargs):
+    col_search, col_sort, col_order, col_page = st.columns([3, 2, 1.2, 1])
+    with col_search:
+        query = st.text_input(
+            "Search",
+            placeholder="Filter rows",
+            key=f"{key}_query",
+        )
+    with col_sort:
+        sort_by = st.selectbox(
+            "Sort by",
+            options=[None] + list(df.columns),
+            format_func=lambda c: "Original order" if c is None else str(c),
+            key=f"{key}_sort",
+        )
+    with col_order:
+        order = st.selectbox(
+            "Order",
+            options=["Ascending", "Descending"],
+            key=f"{key}_order",
+        )
+
+    view = sort_rows(filter_rows(df, query), sort_by, descending=order == "Descending")
+
+    # Filter bisa mengurangi jumlah halaman -> halaman aktif ikut dijepit
+    pages = page_count(len(view), per_page)
+    page_key = f"{key}_page"
+    if st.session_state.get(page_key, 1) > pages:
+        st.session_state[page_key] = pages
+
+    with col_page:
+        page = st.number_input(
+            "Page",
+            min_value=1,
+            max_value=pages,
+            step=1,
+            key=page_key,
+        )
+
+    window = table_window(view, page, per_page)
+    element = st.dataframe(style(window.frame) if style else window.frame, **kwargs)
+
+    if window.rows:
+        shown = (
+            f"Showing rows **{window.start + 1:,}–{window.stop:,}** of **{window.rows:,}**"
+            f" · page {window.page:,} of {window.pages:,}"
+        )
+    else:
+        shown = "No rows match the search"
+    if window.rows != len(df):
+        shown += f" (filtered from {len(df):,})"
+    st.caption(shown)
+
+    return element
@@ -2,186 +2,132 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import altair as alt
-import time
 import math
 import re
-from io import BytesIO
-
-def round_half_up(series):
-    return np.floor(series * 100 + 0.5) / 100
-
-def format_rupiah(x):
-    if pd.isna(x):
-        return ""
-    # pastikan bisa diubah ke float
-    try:
-        x = float(x)
-    except:
-        return x  # biarin apa adanya kalau bukan angka
-
-    # kalau tidak punya desimal (misal 7000.0), tampilkan tanpa ,00
-    if x.is_integer():
-        formatted = f"{int(x):,}".replace(",", ".")
-    else:
-        formatted = f"{x:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-        # hapus ,00 kalau desimalnya 0 semua (misal 7000,00 → 7000)
-        if formatted.endswith(",00"):
-            formatted = formatted[:-3]
-    return formatted
-
-def format_rupiah_percent(x):
-    if pd.isna(x):
-        return ""                   # hilangkan None / NaN
-    return f"{format_rupiah(x)}%"   # pakai format_rupiah + %
-
-def highlight_min_cell(row):
-    styles = []
-    
-    # Cari nilai minimum, abaikan NaN
-    numeric_vals = row[row.apply(lambda x: isinstance(x, (int, float)))]
-    if not numeric_vals.empty:
-        min_val = numeric_vals.min()
-    else:
-        min_val = None
-
-    # Buat style per cell
-    for val in row:
-        if val == min_val:
-            styles.append("background-color: #C6EFCE; color: #006100;")
-        else:
-            styles.append("")
+
+from inspire_core import (
+    read_workbook,
+    sheet_progress,
+    upload_summary,
+    round_half_up,
+    rupiah_formats,
+    clean_dataframe,
+    summary_deviation,
+    deferred,
+    lazy_export,
+    plan_deviation_sheet,
+    Pipeline,
+    Batch,
+    SuperDownload,
+    build_super_download,
+)
+from inspire_core import export
+from inspire_ui import paged_dataframe, stage_report
+
+# Excel dibuat saat tombol Download diklik, hasilnya di-cache per isi dataframe
+get_excel_download = lazy_export(export.get_excel_download)
+get_excel_download_highlight = lazy_export(export.get_excel_download_highlight)
+
+
+def highlight_min_cell(df):
+    styles = pd.DataFrame("", index=df.index, columns=df.columns)
+
+    # Cari nilai minimum per baris, abaikan NaN
+    num_cols = df.select_dtypes(include=["number"]).columns
+    values = df[num_cols].to_numpy(dtype=float, na_value=np.nan)
+    min_val = np.fmin.reduce(values, axis=1, initial=np.inf)
+
+    # Style per cell (Styler.apply axis=None)
+    styles[num_cols] = np.where(values == min_val[:, None], "background-color: #C6EFCE; color: #006100;", "")
     return styles
+
+
+# ================= PIPELINE =================
+# Tiap tahap di-memo per fingerprint input: rerun dengan data yang sama tidak
+# menghitung ulang cleaning, rank maupun deviasi
+pipeline = Pipeline("standard_deviation")
+
+
+@pipeline.stage("clean", inputs=["raw"])
+def clean_sheet(raw):
+    # Data cleaning (blank rows/cols, header, dtypes) + pembulatan
+    df_clean = clean_dataframe(raw)
+
+    num_cols = df_clean.select_dtypes(include=["number"]).columns
+    df_clean[num_cols] = df_clean[num_cols].apply(round_half_up)
+    return df_clean
+
+
+@pipeline.stage("rank", inputs=["clean"])
+def bidder_rank(df_clean):
+    non_num_cols = df_clean.select_dtypes(exclude=["number"]).columns.tolist()
+    vendor_cols = df_clean.select_dtypes(include=["number"]).columns.tolist()
+
+    # Copy non-numeric col
+    df_rank = df_clean[non_num_cols].copy()
+
+    # Hitung rank
+    df_rank[vendor_cols] = (
+        df_clean[vendor_cols]
+        .rank(axis=1, method="min", ascending=True)
+        .astype("Int64")
+    )
+    return df_rank
+
+
+@pipeline.stage("deviation", inputs=["clean"])
+def rank1_deviation(df_clean):
+    non_num_cols = df_clean.select_dtypes(exclude=["number"]).columns.tolist()
+    vendor_cols = df_clean.select_dtypes(include=["number"]).columns.tolist()
+
+    min_value = df_clean[vendor_cols].min(axis=1, skipna=True)
     
-# Download button to Excel
-@st.cache_data
-def get_excel_download(df, sheet_name="Sheet1"):
-    output = BytesIO()
-
-    with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
-        df.to_excel(writer, index=False, sheet_name=sheet_name)
-
-        workbook  = writer.book
-        worksheet = writer.sheets[sheet_name]
-
-        # ================= FORMAT =================
-        fmt_rupiah = workbook.add_format({"num_format": "#,##0"})
-        fmt_pct = workbook.add_format({"num_format": '#,##0.0"%"'})
-
-        # ================= COLUMN GROUP =================
-        num_cols = df.select_dtypes(include=["number"]).columns.tolist()
-        pct_cols = [c for c in df.columns if "%" in c]
-
-        # ================= REWRITE CELLS =================
-        for row_idx, row in enumerate(df.itertuples(index=False), start=1):
-            for col_idx, col_name in enumerate(df.columns):
-                val = row[col_idx]
-
-                # Safety NaN / inf
-                if pd.isna(val) or (isinstance(val, (int, float)) and np.isinf(val)):
-                    worksheet.write(row_idx, col_idx, "")
-                    continue
-
-                # ===== PERCENT COLUMN =====
-                if col_name in pct_cols:
-                    worksheet.write_number(
-                        row_idx,
-                        col_idx,
-                        val,
-                        fmt_pct
-                    )
-
-                # ===== NUMERIC COLUMN =====
-                elif col_name in num_cols:
-                    worksheet.write_number(
-                        row_idx,
-                        col_idx,
-                        val,
-                        fmt_rupiah
-                    )
-
-                # ===== TEXT COLUMN =====
-                else:
-                    worksheet.write(row_idx, col_idx, val)
-
-        # ================= AUTOFIT =================
-        for i, col in enumerate(df.columns):
-            max_len = max(
-                df[col].astype(str).map(len).max(),
-                len(str(col))
-            ) + 2
-            worksheet.set_column(i, i, max_len)
-
-    output.seek(0)
-    return output.getvalue()
-
-# Download highlight total
-@st.cache_data
-def get_excel_download_highlight(df, sheet_name="Sheet1"):
-    output = BytesIO()
-
-    # ===== COPY & COERCE NUMERIC =====
-    df_to_write = df.copy()
-    numeric_cols = []
-
-    for col in df_to_write.columns:
-        coerced = pd.to_numeric(df_to_write[col], errors="coerce")
-        if coerced.notna().any():
-            df_to_write[col] = coerced
-            numeric_cols.append(col)
-
-    with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
-        df_to_write.to_excel(writer, index=False, sheet_name=sheet_name)
-        workbook  = writer.book
-        worksheet = writer.sheets[sheet_name]
-
-        # ===== FORMAT =====
-        fmt_pct = workbook.add_format({'num_format': '#,##0.0"%"'})
-
-        fmt_min = workbook.add_format({
-            "bg_color": "#D9EAD3",
-            'num_format': '#,##0.0"%"'
-        })
-
-        # ===== COLUMN WIDTH =====
-        for col_idx in range(len(df_to_write.columns)):
-            worksheet.set_column(col_idx, col_idx, 15)
-
-        # ===== LOOP ALL CELLS =====
-        for row_idx, row in enumerate(df_to_write.itertuples(index=False), start=1):
-
-            numeric_vals = {
-                idx: val for idx, val in enumerate(row)
-                if idx < len(df_to_write.columns)
-                and df_to_write.columns[idx] in numeric_cols
-                and pd.notna(val)
-            }
-
-            min_val = min(numeric_vals.values()) if numeric_vals else None
-
-            for col_idx, col_name in enumerate(df_to_write.columns):
-                value = row[col_idx]
-
-                # ===== SAFETY =====
-                if pd.isna(value):
-                    worksheet.write_blank(row_idx, col_idx, None)
-                    continue
-
-                # ===== PICK FORMAT =====
-                if col_name in numeric_cols:
-                    fmt = fmt_min if value == min_val else fmt_pct
-                    worksheet.write_number(row_idx, col_idx, value, fmt)
-                else:
-                    worksheet.write(row_idx, col_idx, value)
-
-        # ===== AUTOFIT =====
-        for i, col in enumerate(df_to_write.columns):
-            worksheet.set_column(
-                i, i,
-                max(len(str(col)), df_to_write[col].astype(str).map(len).max()) + 2
-            )
+    # Buat dataframe deviasi dalam persentase
+    df_dev = df_clean[non_num_cols].copy()
+    for col in vendor_cols:
+        df_dev[col] = ((df_clean[col] - min_value) / min_value) * 100
+
+    # Abaikan vendor yang tidak ikut (No-Bid)
+    df_dev[vendor_cols] = df_dev[vendor_cols].where(~df_clean[vendor_cols].isna(), np.nan)
+    return df_dev
+
+
+@pipeline.stage("summary", inputs=["clean"])
+def deviation_summary(df_clean):
+    non_num_cols = df_clean.select_dtypes(exclude=["number"]).columns.tolist()
+
+    # Ubah ke long format
+    df_long = df_clean.melt(
+        id_vars=non_num_cols, 
+        var_name="Vendor", 
+        value_name="[PRICE]"
+    ).dropna(subset=["[PRICE]"])
+
+    # Rank
+    df_long["Rank"] = df_long.groupby(non_num_cols)["[PRICE]"].rank(method="min")
+
+    # Ranking vendor & deviasi ke 1st per item (sort + cumcount + pivot, tanpa loop per item)
+    return summary_deviation(df_long, non_num_cols)
+
+
+# ================= BATCH =================
+# Super Download (semua sheet, tanpa filter): dipakai tombol Download di page
+# dan oleh ``inspire.py run`` untuk banyak tender sekaligus
+SUPER_DOWNLOAD = SuperDownload(
+    "Standard Deviation.xlsx",
+    {"Bidder's Rank": "rank", "Rank-1 Deviation (%)": "deviation", "Summary Deviation (%)": "summary"},
+    plan_deviation_sheet,
+    {"min_sheet": "Rank-1 Deviation (%)"},
+)
+
+
+def read_tender(path):
+    # Satu workbook, sheet pertama
+    return {"raw": read_workbook(path, sheet_name=0)}
+
+
+batch = Batch(pipeline, read_tender, [SUPER_DOWNLOAD])
 
-    output.seek(0)
-    return output.getvalue()
 
 def page():
     # Header Title
@@ -214,18 +160,12 @@ def page():
     if upload_file is not None:
         st.session_state["uploaded_file_standard_deviation"] = upload_file
 
-        # --- Animasi proses upload ---
+        # --- Progress upload (dilaporkan langsung dari proses parse) ---
         msg = st.toast("📂 Uploading file...")
-        time.sleep(1.2)
-
-        msg.toast("🔍 Reading sheets...")
-        time.sleep(1.2)
-
-        msg.toast("✅ File uploaded successfully!")
-        time.sleep(0.5)
 
         # Baca sheet
-        df = pd.read_excel(upload_file)
+        df = read_workbook(upload_file, sheet_name=0, on_sheet=sheet_progress(msg.toast))
+        msg.toast(upload_summary(df))
 
         # Simpan versi mentah (setelah konversi)
         st.session_state["df_standard_deviation_raw"] = df
@@ -241,52 +181,22 @@ def page():
     st.markdown("##### 🔍 Overview")
     rows_before, cols_before = df.shape
     
-    # Data cleaning
-    df_clean = df.replace(r'^\s*$', np.nan, regex=True)
-    df_clean = df_clean.dropna(how="all", axis=0).dropna(how="all", axis=1)
-
-    # Header handling logic
-    cols = df_clean.columns.astype(str)
-
-    # Case 1: Semua kolom 'Unnamed'
-    if len(cols) > 0 and all(col.startswith("Unnamed") for col in cols):
-        # Gunakan baris pertama sebagai header
-        df_clean.columns = df_clean.iloc[0]
-        df_clean = df_clean[1:].reset_index(drop=True)
-
-    # Case 2: Hanya beberapa kolom yang 'Unnamed'
-    else:
-        df_clean = df_clean.loc[:, ~cols.str.startswith("Unnamed")]
-
+    # Clean -> rank / deviasi / summary, tiap tahap di-memo
+    run = pipeline.run(raw=df)
+    df_clean = run["clean"]
     rows_after, cols_after = df_clean.shape
 
-    # Konversi tipe otomatis
-    df_clean = df_clean.convert_dtypes()
-
-    # Hapus dtype numpy
-    def safe_convert(x):
-        if isinstance(x, (np.generic, np.number)):
-            return x.item()
-        return x 
-    
-    df_clean = df_clean.map(safe_convert)
-    df_clean.columns = [safe_convert(c) for c in df_clean.columns]
-    df_clean.index = [safe_convert(i) for i in df_clean.index]
-
-    # Paksa header & index ke string agar JSON safe
-    df_clean.columns = df_clean.columns.map(str)
-    df_clean.index = df_clean.index.map(str)
-
     # Format
     num_cols = df_clean.select_dtypes(include=["number"]).columns
-    df_clean[num_cols] = df_clean[num_cols].apply(round_half_up)
-    df_clean_styled = (
-        df_clean.style
-        .format({col: format_rupiah for col in num_cols})
-    )
+    format_dict = rupiah_formats(df_clean, num_cols)
+    def style_clean(frame):
+        return (
+            frame.style
+            .format(format_dict)
+        )
 
     st.caption(f"The are **{len(df_clean.columns)-1} participating bidders** in this session.")
-    st.dataframe(df_clean_styled, hide_index=True)
+    paged_dataframe(df_clean, style_clean, key="clean_standard_deviation", hide_index=True)
 
     # --- NOTIFIKASI KHUSUS ---
     if (rows_after < rows_before) or (cols_after < cols_before):
@@ -308,15 +218,7 @@ def page():
     st.markdown("##### 🥇 Bidder's Rank")
     st.caption("The bidder ranking process has been successfully completed.")
 
-    # Copy non-numeric col
-    df_rank = df_clean[non_num_cols].copy()
-
-    # Hitung rank
-    df_rank[vendor_cols] = (
-        df_clean[vendor_cols]
-        .rank(axis=1, method="min", ascending=True)
-        .astype("Int64")
-    )
+    df_rank = run["rank"]
 
     st.dataframe(df_rank, hide_index=True)
 
@@ -338,27 +240,21 @@ def page():
     st.markdown("##### 🛸 Rank-1 Deviation (%)")
     st.caption("This table shows each vendor’s price deviation (%) from the lowest-priced (Rank-1) vendor per item.")
 
-    min_value = df_clean[vendor_cols].min(axis=1, skipna=True)
-    
-    # Buat dataframe deviasi dalam persentase
-    df_dev = df_clean[non_num_cols].copy()
-    for col in vendor_cols:
-        df_dev[col] = ((df_clean[col] - min_value) / min_value) * 100
-
-    # Abaikan vendor yang tidak ikut (No-Bid)
-    df_dev[vendor_cols] = df_dev[vendor_cols].where(~df_clean[vendor_cols].isna(), np.nan)
+    # Deviasi (%) ke harga terendah per item (tahap deviation)
+    df_dev = run["deviation"]
 
     # Format
     num_cols = df_dev.select_dtypes(include=["number"]).columns
-    format_dict = {col: format_rupiah_percent for col in num_cols}
+    format_dict = rupiah_formats(df_dev, num_cols, suffix="%")
 
-    df_dev_styled = (
-        df_dev.style
-        .format(format_dict)
-        .apply(highlight_min_cell, axis=1)
-    )
+    def style_dev(frame):
+        return (
+            frame.style
+            .format(format_dict)
+            .apply(highlight_min_cell, axis=None)
+        )
 
-    st.dataframe(df_dev_styled, hide_index=True)
+    paged_dataframe(df_dev, style_dev, key="deviation_standard_deviation", hide_index=True)
 
     # Download
     excel_data = get_excel_download_highlight(df_dev)
@@ -378,77 +274,24 @@ def page():
     st.markdown("##### 🌍 Summary Deviation (%)")
     st.caption("This table summarizes vendor rankings and their deviation (%) from the Rank-1 vendor for each item.")
 
-    # Ambil kolom utama -> non_num[0]
-    main_col = non_num_cols[0
-                            ]
-    # Ubah ke long format
-    df_long = df_clean.melt(
-        id_vars=non_num_cols, 
-        var_name="Vendor", 
-        value_name="[PRICE]"
-    ).dropna(subset=["[PRICE]"])
-
-    # Rank
-    df_long["Rank"] = df_long.groupby(non_num_cols)["[PRICE]"].rank(method="min")
-
-    # Fungsi ordinal
-    def ordinal(n):
-        if 10 <= n % 100 <= 20:
-            suf = "th"
-        else:
-            suf = {1:"st",2:"nd",3:"rd"}.get(n % 10, "th")
-        return f"{n}{suf}"
-
-    summary_rows = []
-
-    # Grouping
-    for keys, group in df_long.groupby(non_num_cols):
-        group = group.sort_values("Rank").reset_index(drop=True)
-        base_price = group.loc[0, "[PRICE]"]
-
-        row_data = {}
-
-        # isi semua kolom non-num
-        for i, col in enumerate(non_num_cols):
-            row_data[col] = keys[i]
-
-        row_data["1st Rank"] = group.loc[0, "Vendor"]
-        row_data["Best Price"] = base_price
-
-        # 2nd, 3rd dst
-        for i in range(1, len(group)):
-            r = i + 1
-            vendor = group.loc[i, "Vendor"]
-            price = group.loc[i, "[PRICE]"]
-
-            deviation = (
-                ((price - base_price) / base_price) * 100
-                if base_price not in (0, np.nan)
-                else np.nan
-            )
-
-            row_data[f"{ordinal(r)} Rank"] = vendor
-            row_data[f"Dev. {ordinal(r)} to 1st (%)"] = deviation
-
-        summary_rows.append(row_data)
-
-    df_summary = pd.DataFrame(summary_rows)
+    # Ranking vendor & deviasi ke 1st per item (tahap summary)
+    df_summary = run["summary"]
 
     # Format
     format_dict = {}
 
     # Kolom "Best Price"
     if "Best Price" in df_summary.columns:
-        format_dict["Best Price"] = format_rupiah
+        format_dict.update(rupiah_formats(df_summary, ["Best Price"]))
     
     # Kolom deviasi (%)
-    for col in df_summary.columns:
-        if col.startswith("Dev. ") and col.endswith("(%)"):
-            format_dict[col] = format_rupiah_percent
+    dev_cols = [col for col in df_summary.columns if col.startswith("Dev. ") and col.endswith("(%)")]
+    format_dict.update(rupiah_formats(df_summary, dev_cols, suffix="%"))
     
-    df_summary_styled = df_summary.style.format(format_dict)
+    def style_summary(frame):
+        return frame.style.format(format_dict)
 
-    st.dataframe(df_summary_styled, hide_index=True)
+    paged_dataframe(df_summary, style_summary, key="summary_standard_deviation", hide_index=True)
 
     # Download
     excel_data = get_excel_download(df_summary)
@@ -583,105 +426,8 @@ def page():
 
     # Fungsi "Super Button" & Formatting
     def generate_multi_sheet_excel(selected_sheets, df_dict):
-        output = BytesIO()
-
-        with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
-            for sheet in selected_sheets:
-                df = df_dict[sheet].copy()
-
-                # ========= SPECIAL SHEET =========
-                if sheet == "Rank-1 Deviation (%)":
-                    df_to_write = df.copy()
-                    numeric_cols = [
-                        c for c in df_to_write.columns
-                        if pd.api.types.is_numeric_dtype(df_to_write[c])
-                    ]
-
-                    df_to_write.to_excel(writer, index=False, sheet_name=sheet)
-                    workbook  = writer.book
-                    worksheet = writer.sheets[sheet]
-
-                    fmt_pct = workbook.add_format({'num_format': '#,##0.0"%"'})
-                    fmt_min = workbook.add_format({
-                        "bg_color": "#D9EAD3",
-                        'num_format': '#,##0.0"%"'
-                    })
-
-                    # ===== WRITE + FORMAT CELL =====
-                    for r, row in enumerate(df_to_write.itertuples(index=False), start=1):
-                        numeric_vals = {
-                            i: val for i, val in enumerate(row)
-                            if df_to_write.columns[i] in numeric_cols and pd.notna(val)
-                        }
-                        min_val = min(numeric_vals.values()) if numeric_vals else None
-
-                        for c, col in enumerate(df_to_write.columns):
-                            val = row[c]
-
-                            if pd.isna(val):
-                                worksheet.write_blank(r, c, None)
-                            elif col in numeric_cols:
-                                fmt = fmt_min if val == min_val else fmt_pct
-                                worksheet.write_number(r, c, val, fmt)
-                            else:
-                                worksheet.write(r, c, val)
-
-                    # ===== AUTOFIT (KEEP FORMAT!) =====
-                    for i, col in enumerate(df_to_write.columns):
-                        width = max(
-                            len(str(col)),
-                            df_to_write[col].astype(str).map(len).max()
-                        ) + 2
-
-                        worksheet.set_column(
-                            i, i,
-                            width,
-                            fmt_pct if col in numeric_cols else None
-                        )
-
-                    continue
-
-                # ========= DEFAULT SHEETS =========
-                df.to_excel(writer, index=False, sheet_name=sheet)
-                workbook  = writer.book
-                worksheet = writer.sheets[sheet]
-
-                fmt_rp  = workbook.add_format({'num_format': '#,##0'})
-                fmt_pct = workbook.add_format({'num_format': '#,##0.0"%"'})
-
-                numeric_cols = df.select_dtypes(include=["number"]).columns.tolist()
-                pct_cols = [c for c in df.columns if "%" in c]
-
-                # ===== REWRITE CELLS (SAFE) =====
-                for r, row in enumerate(df.itertuples(index=False), start=1):
-                    for c, col in enumerate(df.columns):
-                        val = row[c]
-
-                        if pd.isna(val) or (isinstance(val, float) and np.isinf(val)):
-                            worksheet.write_blank(r, c, None)
-                        elif col in pct_cols:
-                            worksheet.write_number(r, c, val, fmt_pct)
-                        elif col in numeric_cols:
-                            worksheet.write_number(r, c, val, fmt_rp)
-                        else:
-                            worksheet.write(r, c, val)
-
-                # ===== AUTOFIT (KEEP FORMAT!) =====
-                for i, col in enumerate(df.columns):
-                    width = max(
-                        len(str(col)),
-                        df[col].astype(str).map(len).max()
-                    ) + 2
-
-                    if col in pct_cols:
-                        worksheet.set_column(i, i, width, fmt_pct)
-                    elif col in numeric_cols:
-                        worksheet.set_column(i, i, width, fmt_rp)
-                    else:
-                        worksheet.set_column(i, i, width)
-
-        output.seek(0)
-        return output.getvalue()
+        # Tiap sheet di-plan paralel di thread pool, lalu ditulis ke satu workbook
+        return build_super_download(SUPER_DOWNLOAD, df_dict, selected_sheets)
 
     # --- FRAGMENT UNTUK BALLOONS ---
     @st.fragment
@@ -690,15 +436,17 @@ def page():
 
     # ---- DOWNLOAD BUTTON ----
     if selected_sheets:
-        excel_bytes = generate_multi_sheet_excel(selected_sheets, dataframes)
+        excel_bytes = deferred(generate_multi_sheet_excel, selected_sheets, dataframes)
 
         st.download_button(
             label="Download",
             data=excel_bytes,
-            file_name="Standard Deviation.xlsx",
+            file_name=SUPER_DOWNLOAD.file_name,
             mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
             on_click=release_the_balloons,
             type="primary",
             use_container_width=True,
         )
 
+    # Tahap yang dihitung ulang vs diambil dari cache (INSPIRE_SHOW_STAGES=1)
+    stage_report(run, "standard_deviation")
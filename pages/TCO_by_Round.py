@@ -2,397 +2,274 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import altair as alt
-import time
-import re
 import os
-from io import BytesIO
-
-def round_half_up(series):
-    return np.floor(series * 100 + 0.5) / 100
-
-def format_rupiah(x):
-    if pd.isna(x):
-        return ""
-    # pastikan bisa diubah ke float
-    try:
-        x = float(x)
-    except:
-        return x  # biarin apa adanya kalau bukan angka
-
-    # kalau tidak punya desimal (misal 7000.0), tampilkan tanpa ,00
-    if x.is_integer():
-        formatted = f"{int(x):,}".replace(",", ".")
-    else:
-        formatted = f"{x:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-        # hapus ,00 kalau desimalnya 0 semua (misal 7000,00 → 7000)
-        if formatted.endswith(",00"):
-            formatted = formatted[:-3]
-    return formatted
-
-def highlight_total_row(row):
-    # Cek apakah ada kolom yang berisi "TOTAL" (case-insensitive)
-    if any(str(x).strip().upper() == "TOTAL" for x in row):
-        return ["font-weight: bold;"] * len(row)
-    else:
-        return [""] * len(row)
-    
-def highlight_total_row_v2(row):
-    if any(str(x).strip().upper() == "TOTAL" for x in row):
-        return ["font-weight: bold; background-color: #D9EAD3; color: #1A5E20;"] * len(row)
-    else:
-        return [""] * len(row)
-    
-def highlight_1st_2nd_vendor(row, columns):
-    styles = [""] * len(columns)
-    first_vendor = row.get("1st Vendor")
-    second_vendor = row.get("2nd Vendor")
-
-    for i, col in enumerate(columns):
-        if col == first_vendor:
-            styles[i] = "background-color: #C6EFCE; color: #006100;"
-        elif col == second_vendor:
-            styles[i] = "background-color: #FFEB9C; color: #9C6500;"
-    return styles
-    
-# Download button to Excel
-@st.cache_data
-def get_excel_download(df, sheet_name="Sheet1"):
-    output = BytesIO()
-
-    with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
-        df.to_excel(writer, index=False, sheet_name=sheet_name)
-
-        workbook  = writer.book
-        worksheet = writer.sheets[sheet_name]
-
-        # ================= FORMAT =================
-        fmt_rupiah = workbook.add_format({"num_format": "#,##0"})
-        fmt_pct = workbook.add_format({"num_format": '#,##0.0"%"'})
-
-        # ================= COLUMN GROUP =================
-        num_cols = df.select_dtypes(include=["number"]).columns.tolist()
-        pct_cols = [c for c in df.columns if "%" in c]
-
-        # ================= REWRITE CELLS =================
-        for row_idx, row in enumerate(df.itertuples(index=False), start=1):
-            for col_idx, col_name in enumerate(df.columns):
-                val = row[col_idx]
-
-                # Safety NaN / inf
-                if pd.isna(val) or (isinstance(val, (int, float)) and np.isinf(val)):
-                    worksheet.write(row_idx, col_idx, "")
-                    continue
-
-                # ===== PERCENT COLUMN =====
-                if col_name in pct_cols:
-                    worksheet.write_number(
-                        row_idx,
-                        col_idx,
-                        val,
-                        fmt_pct
-                    )
 
-                # ===== NUMERIC COLUMN =====
-                elif col_name in num_cols:
-                    worksheet.write_number(
-                        row_idx,
-                        col_idx,
-                        val,
-                        fmt_rupiah
-                    )
+from inspire_core import (
+    read_workbooks,
+    RoundStore,
+    sheet_progress,
+    clean_progress,
+    upload_summary,
+    round_half_up,
+    rupiah_formats,
+    total_row_styles_v2,
+    vendor_rank_styles,
+    clean_dataframe,
+    extract_round_number,
+    add_bid_analysis,
+    add_group_totals,
+    mark_totals,
+    drop_total_rows,
+    add_price_movement,
+    deferred,
+    lazy_export,
+    plan_round_sheet,
+    Pipeline,
+    Batch,
+    SuperDownload,
+    build_super_download,
+)
+from inspire_core import export
+from inspire_ui import (
+    paged_dataframe,
+    publish_frame,
+    export_frames,
+    stage_report,
+)
+
+# Excel dibuat saat tombol Download diklik, hasilnya di-cache per isi dataframe
+get_excel_download = lazy_export(export.get_excel_download)
+get_excel_download_highlight_total = lazy_export(export.get_excel_download_highlight_total)
+get_excel_download_highlight_price_trend = lazy_export(export.get_excel_download_highlight_price_trend)
+get_excel_download_highlight_1st_2nd_lowest = lazy_export(export.get_excel_download_highlight_1st_2nd_lowest)
+
+
+# ================= PIPELINE =================
+# Parse & cleaning per file sudah di-cache oleh RoundStore; tahap di bawah
+# di-memo per fingerprint round yang ter-upload, jadi rerun tanpa perubahan
+# file tidak menghitung ulang merge, summary, pivot maupun analisis
+pipeline = Pipeline("tco_by_round")
+
+
+@pipeline.stage("merge", inputs=["rounds"])
+def merge_rounds(rounds):
+    df_merge = pd.concat(rounds, ignore_index=True)
 
-                # ===== TEXT COLUMN =====
-                else:
-                    worksheet.write(row_idx, col_idx, val)
-
-        # ================= AUTOFIT =================
-        for i, col in enumerate(df.columns):
-            max_len = max(
-                df[col].astype(str).map(len).max(),
-                len(str(col))
-            ) + 2
-            worksheet.set_column(i, i, max_len)
-
-    output.seek(0)
-    return output.getvalue()
-
-# Download highlight total
-@st.cache_data
-def get_excel_download_highlight_total(df, sheet_name="Sheet1"):
-    output = BytesIO()
-
-    with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
-        df.to_excel(writer, index=False, sheet_name=sheet_name)
-        workbook  = writer.book
-        worksheet = writer.sheets[sheet_name]
-
-        # ================= FORMAT =================
-        format_rupiah = workbook.add_format({"num_format": "#,##0"})
-
-        highlight_format = workbook.add_format({
-            "bold": True,
-            "bg_color": "#D9EAD3",
-            "font_color": "#1A5E20",
-            "num_format": "#,##0"
-        })
+    # --- Buat kolom urutan ROUND ---
+    df_merge["ROUND_ORDER"] = df_merge["ROUND"].apply(extract_round_number)
 
-        # ================= NUMERIC COLUMNS =================
-        num_cols = df.select_dtypes(include=["number"]).columns
+    # --- Tandai baris TOTAL ---
+    df_merge["IS_TOTAL"] = df_merge.iloc[:, 1].astype(str).str.strip().str.upper().eq("TOTAL").astype(int)
 
-        # ================= LOOP DATA =================
-        for row_idx, row in enumerate(df.itertuples(index=False), start=1):
+    # --- Sort ROUND dulu, lalu pastikan TOTAL paling bawah tiap ROUND ---
+    df_merge = (
+        df_merge
+        .sort_values(["ROUND_ORDER", "IS_TOTAL"])
+        .drop(columns=["ROUND_ORDER", "IS_TOTAL"])
+        .reset_index(drop=True)
+    )
 
-            is_total = any(
-                str(x).strip().upper() == "TOTAL"
-                for x in row if pd.notna(x)
-            )
+    # Pembulatan
+    num_cols = df_merge.select_dtypes(include=["number"]).columns
+    df_merge[num_cols] = df_merge[num_cols].apply(round_half_up)
+    return df_merge
 
-            for col_idx, col_name in enumerate(df.columns):
-                value = row[col_idx]
-
-                # NaN / inf safety
-                if pd.isna(value) or (isinstance(value, (int, float)) and np.isinf(value)):
-                    value = ""
-
-                # ===== TOTAL ROW =====
-                if is_total:
-                    if col_name in num_cols and value != "":
-                        worksheet.write_number(
-                            row_idx, col_idx, value, highlight_format
-                        )
-                    else:
-                        worksheet.write(
-                            row_idx, col_idx, value, highlight_format
-                        )
-
-                # ===== NORMAL ROW =====
-                else:
-                    if col_name in num_cols and value != "":
-                        worksheet.write_number(
-                            row_idx, col_idx, value, format_rupiah
-                        )
-                    else:
-                        worksheet.write(
-                            row_idx, col_idx, value
-                        )
-
-        # ================= AUTOFIT =================
-        for i, col in enumerate(df.columns):
-            max_len = max(
-                df[col].astype(str).map(len).max(),
-                len(str(col))
-            ) + 2
-            worksheet.set_column(i, i, max_len)
-
-    output.seek(0)
-    return output.getvalue()
-
-# Download highlight total
-@st.cache_data
-def get_excel_download_highlight_price_trend(df_raw, sheet_name="Sheet1"):
-    output = BytesIO()
-
-    # ===== COERCE NUMERIC (INI KUNCI UTAMA) =====
-    df = df_raw.copy()
-    numeric_cols = []
-
-    for col in df.columns:
-        coerced = pd.to_numeric(df[col], errors="coerce")
-        if coerced.notna().any():
-            df[col] = coerced
-            numeric_cols.append(col)
-
-    value_cols = [
-        c for c in df.columns
-        if "PRICE REDUCTION (VALUE)" in c or "STANDARD DEVIATION" in c
-    ]
 
-    pct_cols = [
-        c for c in df.columns
-        if "PRICE REDUCTION (%)" in c or "PRICE STABILITY INDEX (%)" in c
+@pipeline.stage("summary", inputs=["merge"])
+def cost_summary(df_merge):
+    # Ambil semua kolom kecuali "ROUND"
+    non_round_cols = [c for c in df_merge.columns if c != "ROUND"]
+
+    # Identifikasi kolom
+    scope_cols = df_merge[non_round_cols].select_dtypes(exclude=["number"]).columns.tolist()
+    vendor_cols = df_merge[non_round_cols].select_dtypes(include=['number']).columns.tolist()
+
+    # Melt (Unpivot)
+    df_summary = df_merge.melt(
+        id_vars=["ROUND"] + scope_cols,
+        value_vars=vendor_cols,
+        var_name="VENDOR",
+        value_name="[PRICE]"
+    )
+
+    # Reorder
+    final_cols = ["ROUND", "VENDOR"] + scope_cols + ["[PRICE]"]
+    df_summary = df_summary[final_cols]
+
+    # Sort
+    return df_summary.sort_values(["ROUND", "VENDOR"] + scope_cols).reset_index(drop=True)
+
+
+@pipeline.stage("pivot", inputs=["merge"])
+def pivot_rounds(df_merge):
+    total = df_merge.columns[1]
+    df_ptable = df_merge[df_merge[total] != "TOTAL"].copy()
+
+    non_round_cols = [c for c in df_ptable.columns if c != "ROUND"]
+    scope_cols = df_ptable[non_round_cols].select_dtypes(exclude=["number"]).columns.tolist()
+    vendor_cols = df_ptable[non_round_cols].select_dtypes(include=["number"]).columns.tolist()
+
+    # Ubah ke long format
+    df_plong = df_ptable.melt(
+        id_vars=["ROUND"] + scope_cols,
+        value_vars=vendor_cols,
+        var_name="VENDOR",
+        value_name="[PRICE]"
+    )
+
+    # Pivot
+    df_ppivot = df_plong.pivot_table(
+        index=scope_cols,
+        columns=["VENDOR", "ROUND"],
+        values="[PRICE]",
+        aggfunc="first"
+    )
+
+    # Rapikan nama kolom (flatten)
+    df_ppivot.columns = [
+        f"{vendor} {round_}"
+        for vendor, round_ in df_ppivot.columns
     ]
 
-    with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
-        df.to_excel(writer, index=False, sheet_name=sheet_name)
-        workbook  = writer.book
-        worksheet = writer.sheets[sheet_name]
+    df_ppivot = df_ppivot.reset_index() # reset index
 
-        # ===== FORMAT =====
-        fmt_rp = workbook.add_format({'num_format': '#,##0'})
-        fmt_pct = workbook.add_format({'num_format': '#,##0.0"%"'})
+    # Tambahkan row TOTAL
+    total_row = {col: "" for col in df_ppivot.columns}
 
-        fmt_total_rp = workbook.add_format({
-            "bold": True,
-            "bg_color": "#D9EAD3",
-            "font_color": "#1A5E20",
-            "num_format": "#,##0"
-        })
+    first_scope_col = scope_cols[0]
+    total_row[first_scope_col] = "TOTAL"
 
-        fmt_total_pct = workbook.add_format({
-            "bold": True,
-            "bg_color": "#D9EAD3",
-            "font_color": "#1A5E20",
-            'num_format': '#,##0.0"%"'
-        })
+    for col in df_ppivot.columns:
+        if col not in scope_cols:
+            total_row[col] = df_ppivot[col].sum(numeric_only=True)
 
-        fmt_total_text = workbook.add_format({
-            "bold": True,
-            "bg_color": "#D9EAD3",
-            "font_color": "#1A5E20"
-        })
+    # Append row TOTAL
+    df_ppivot = pd.concat([df_ppivot, pd.DataFrame([total_row])], ignore_index=True)
+    return mark_totals(df_ppivot, first_scope_col)
 
-        # ===== COLUMN FORMAT (AMANN) =====
-        for col_idx, col in enumerate(df.columns):
-            if col in pct_cols:
-                worksheet.set_column(col_idx, col_idx, 15, fmt_pct)
-            elif col in value_cols or col in numeric_cols:
-                worksheet.set_column(col_idx, col_idx, 15, fmt_rp)
-
-        # ===== LOOP DATA =====
-        for row_idx, (_, row) in enumerate(df.iterrows(), start=1):
-            is_total = any(
-                isinstance(x, str) and x.strip().upper() == "TOTAL"
-                for x in row if pd.notna(x)
-            )
 
-            for col_idx, col in enumerate(df.columns):
-                val = row[col]
-
-                # ===== PICK FORMAT =====
-                if is_total:
-                    if col in pct_cols:
-                        fmt = fmt_total_pct
-                    elif col in value_cols or col in numeric_cols:
-                        fmt = fmt_total_rp
-                    else:
-                        fmt = fmt_total_text
-                else:
-                    if col in pct_cols:
-                        fmt = fmt_pct
-                    elif col in value_cols or col in numeric_cols:
-                        fmt = fmt_rp
-                    else:
-                        fmt = None
-
-                # ===== WRITE (TYPE SAFE) =====
-                if pd.isna(val) or (isinstance(val, float) and np.isinf(val)):
-                    worksheet.write_blank(row_idx, col_idx, None, fmt)
-                elif col in pct_cols or col in numeric_cols:
-                    worksheet.write_number(row_idx, col_idx, val, fmt)
-                else:
-                    worksheet.write(row_idx, col_idx, val, fmt)
-
-        # ===== AUTOFIT =====
-        for i, col in enumerate(df.columns):
-            worksheet.set_column(
-                i, i,
-                max(len(str(col)), df[col].astype(str).map(len).max()) + 2
-            )
+@pipeline.stage("analysis", inputs=["merge"])
+def bid_analysis(df_merge):
+    df_analysis = drop_total_rows(df_merge)
 
-    output.seek(0)
-    return output.getvalue()
+    # Kolom vendor dinamis
+    vendor_cols = df_analysis.select_dtypes(include=["number"]).columns.tolist()
 
-# Download Highlight 1st & 2nd Vendors
-def get_excel_download_highlight_1st_2nd_lowest(df, sheet_name="Sheet1"):
-    output = BytesIO()
+    # 1st/2nd Lowest, Gap, Median & deviasi ke median (0 = tidak ikut tender)
+    return add_bid_analysis(df_analysis, vendor_cols)
 
-    with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
-        df.to_excel(writer, index=False, sheet_name=sheet_name)
-        workbook  = writer.book
-        worksheet = writer.sheets[sheet_name]
 
-        # ========== FORMAT ==========
-        format_rupiah_xls = workbook.add_format({'num_format': '#,##0'})
-        fmt_pct_rupiah = workbook.add_format({'num_format': '#,##0.0"%"'})
+@pipeline.stage("price_movement", inputs=["merge"])
+def price_movement(df_merge):
+    df_no_total = drop_total_rows(df_merge)
 
-        format_first = workbook.add_format({
-            'bg_color': '#C6EFCE',
-            'num_format': '#,##0'
-        })
+    # Identifikasi kolom
+    non_round_cols = [c for c in df_no_total.columns if c != "ROUND"]
+    scope_cols = df_no_total[non_round_cols].select_dtypes(exclude=["number"]).columns.tolist()
+    vendor_cols = df_no_total[non_round_cols].select_dtypes(include=['number']).columns.tolist()
 
-        format_second = workbook.add_format({
-            'bg_color': '#FFEB9C',
-            'num_format': '#,##0'
-        })
+    # Melt (Unpivot)
+    df_long = df_no_total.melt(
+        id_vars=["ROUND"] + scope_cols,
+        value_vars=vendor_cols,
+        var_name="VENDOR",
+        value_name="[PRICE]"
+    )
 
-        # ========== COLUMN GROUP ==========
-        num_cols = df.select_dtypes(include=["number"]).columns
-        pct_cols = [c for c in df.columns if "%" in c]
-
-        # ========== LOOP DATA ==========
-        for row_idx, (_, row) in enumerate(df.iterrows(), start=1):
-            first_vendor  = row.get("1st Vendor")
-            second_vendor = row.get("2nd Vendor")
-
-            for col_idx, col in enumerate(df.columns):
-                value = row[col]
-
-                # NaN / inf safety
-                if pd.isna(value) or (isinstance(value, (int, float)) and np.isinf(value)):
-                    worksheet.write(row_idx, col_idx, "")
-                    continue
-
-                # ===== PICK FORMAT =====
-                fmt = None
-                if col == first_vendor:
-                    fmt = format_first
-                elif col == second_vendor:
-                    fmt = format_second
-
-                # ===== WRITE CELL =====
-                if col in pct_cols:
-                    worksheet.write_number(
-                        row_idx,
-                        col_idx,
-                        value,
-                        fmt or fmt_pct_rupiah
-                    )
+    # PIVOT
+    df_pivot = df_long.pivot_table(
+        index=["VENDOR"] + scope_cols,
+        columns="ROUND",
+        values="[PRICE]",
+        aggfunc="first"
+    ).reset_index()
 
-                elif col in num_cols:
-                    worksheet.write_number(
-                        row_idx,
-                        col_idx,
-                        value,
-                        fmt or format_rupiah_xls
-                    )
+    # Urutkan kolom ROUND
+    round_order = sorted([c for c in df_pivot.columns if c not in ["VENDOR"] + scope_cols])
+    df_pivot = df_pivot[["VENDOR"] + scope_cols + round_order]
+
+    # PRICE REDUCTION, PRICE TREND, STANDARD DEVIATION & PRICE STABILITY INDEX (PSI)
+    # dihitung sekaligus dari matrix harga per ROUND (round kosong dilewati)
+    df_pivot = add_price_movement(df_pivot, round_order, reduction="first_minus_last")
+
+    # Adding "TOTAL" rows: sum per ROUND untuk tiap vendor, ditaruh di akhir
+    # blok vendor (pivot sudah terurut VENDOR + scope)
+    return add_group_totals(
+        df_pivot, ["VENDOR"],
+        label_col=scope_cols[0],
+        sum_cols=round_order,
+        fill=np.nan,
+    )
+
+
+# ================= BATCH =================
+# Super Download (semua sheet, tanpa filter): dipakai tombol Download di page
+# dan oleh ``inspire.py run`` untuk banyak tender sekaligus
+def add_round_total(df_clean, filename):
+    # Kolom ROUND di depan + baris TOTAL kalau file round belum punya
+    df_clean.insert(0, "ROUND", filename)
+
+    # Tambahkan "TOTAL" jika belum ada
+    scope_col = df_clean.columns[1]
+    # Cek apakah sudah ada baris TOTAL
+    text_cols = df_clean.select_dtypes(exclude=["number"])
+    has_total = any(
+        text_cols.iloc[:, i].astype(str).str.upper().str.contains("TOTAL", regex=False).any()
+        for i in range(text_cols.shape[1])
+    )
+
+    if not has_total:
+        # Buat baris TOTAL baru
+        total_row = {col: "" for col in df_clean.columns}
+
+        # Isi nilai row TOTAL
+        total_row["ROUND"] = filename
+        total_row[scope_col] = "TOTAL"
+
+        # Hitung jumlah vendor per kolom (skip NaN)
+        vendor_cols = df_clean.select_dtypes(include=["int", "float"]).columns
+        for v in vendor_cols:
+            total_row[v] = df_clean[v].sum()
+
+        # Tambahkan ke df
+        df_clean = pd.concat([df_clean, pd.DataFrame([total_row])], ignore_index=True)
+
+        # TOTAL buatan sendiri -> label pasti di scope_col
+        mark_totals(df_clean, scope_col)
+
+    return df_clean
+
+
+def price_movement_export(df_pivot):
+    # NaN / Inf -> string kosong supaya xlsxwriter tidak error
+    return df_pivot.replace([np.nan, np.inf, -np.inf], "")
+
+
+SUPER_DOWNLOAD = SuperDownload(
+    "TCO Comparison Round by Round.xlsx",
+    {
+        "Merge Data": "merge",
+        "Cost Summary": "summary",
+        "Pivot Table": "pivot",
+        "Bid & Price Analysis": "analysis",
+        "Price Movement Analysis": ("price_movement", price_movement_export),
+    },
+    plan_round_sheet,
+    {"bid_sheet": "Bid & Price Analysis"},
+)
+
+
+def read_tender(paths):
+    # Satu folder = satu tender, satu workbook per round (sheet pertama)
+    rounds = []
+    for path, df_raw in zip(paths, read_workbooks(paths, sheet_name=0)):
+        filename = os.path.splitext(os.path.basename(path))[0]
+        rounds.append(add_round_total(clean_dataframe(df_raw), filename))
+    return {"rounds": rounds}
+
+
+batch = Batch(pipeline, read_tender, [SUPER_DOWNLOAD], rounds=True)
 
-                else:
-                    worksheet.write(row_idx, col_idx, value)
-
-        # ================= AUTOFIT =================
-        for i, col in enumerate(df.columns):
-            max_len = max(
-                df[col].astype(str).map(len).max(),
-                len(str(col))
-            ) + 2
-            worksheet.set_column(i, i, max_len)
-
-    output.seek(0)
-    return output.getvalue()
-
-# Fungsi untuk mengekstrak nomor round dari string, misal "L2R4" → 4
-def extract_round_number(name):
-    """
-    Extracts the round number from various round naming formats:
-    - 'L2R4' -> 4
-    - 'Round 3' -> 3
-    - '4' -> 4
-    If no number is found, returns a large number to push it to the end.
-    """
-    name = str(name)
-    
-    # Coba cari pola R<number> dulu (untuk L2R4)
-    m = re.search(r'R(\d+)', name)
-    if m:
-        return int(m.group(1))
-    
-    # Kalau tidak ada, ambil angka pertama yang muncul di string
-    m2 = re.search(r'\d+', name)
-    if m2:
-        return int(m2.group())
-    
-    # Jika tidak ketemu angka sama sekali
-    return 9999
 
 def page():
     # Header Title
@@ -434,8 +311,11 @@ def page():
         new_files = st.session_state.get(key, None)
 
         if new_files:
-            # Overwrite file lama
-            st.session_state.uploaded_files = new_files
+            # Tambahkan ke file lama (round baru saja yang diproses);
+            # file dengan nama sama diganti versi barunya
+            merged_files = {f.name: f for f in st.session_state.uploaded_files}
+            merged_files.update((f.name, f) for f in new_files)
+            st.session_state.uploaded_files = list(merged_files.values())
 
         # Reset processing flag
         st.session_state.pop("already_processed_tco_by_round", None)
@@ -491,47 +371,17 @@ def page():
                         unsafe_allow_html=True
                     )
 
-    # Pre-processing
-    def clean_dataframe(df):
-        rows_before, cols_before = df.shape
-        
-        # Data cleaning
-        df_clean = df.replace(r'^\s*$', np.nan, regex=True)
-        df_clean = df_clean.dropna(how="all", axis=0).dropna(how="all", axis=1)
-
-        # Header handling logic
-        cols = df_clean.columns.astype(str)
+        # Hapus semua round yang sudah di-upload
+        def clear_files():
+            st.session_state.uploaded_files = []
+            st.session_state.pop("already_processed_tco_by_round", None)
 
-        # Case 1: Semua kolom 'Unnamed'
-        if len(cols) > 0 and all(col.startswith("Unnamed") for col in cols):
-            # Gunakan baris pertama sebagai header
-            df_clean.columns = df_clean.iloc[0]
-            df_clean = df_clean[1:].reset_index(drop=True)
-
-        # Case 2: Hanya beberapa kolom yang 'Unnamed'
-        else:
-            df_clean = df_clean.loc[:, ~cols.str.startswith("Unnamed")]
-
-        rows_after, cols_after = df_clean.shape
-
-        # Konversi tipe data
-        df_clean = df_clean.convert_dtypes()
-
-        # Safe conversion from numpy types
-        def safe_convert(x):
-            if isinstance(x, (np.generic, np.number)):
-                return x.item()
-            return x
-        
-        df_clean = df_clean.map(safe_convert)
-        df_clean.columns = [safe_convert(c) for c in df_clean.columns]
-        df_clean.index = [safe_convert(i) for i in df_clean.index]
-
-        # Paksa nama kolom dan index menjadi string
-        df_clean.columns = df_clean.columns.map(str)
-        df_clean.index = df_clean.index.map(str)
-
-        return df_clean
+        st.button(
+            "Clear files",
+            icon=":material/delete:",
+            on_click=clear_files,
+            key="clear_files_tco_by_round"
+        )
 
     # # Kalau ada upload baru → overwrite & reset flag
     # if upload_files:
@@ -550,77 +400,46 @@ def page():
     if not files_to_process:
         st.stop()
     
-    # Proses upload hanya sekali per set file
+    # Progress upload hanya sekali per set file (dilaporkan dari proses parse & cleaning)
+    msg = None
     if "already_processed_tco_by_round" not in st.session_state:
-        # --- Animasi proses upload ---
         msg = st.toast("📂 Uploading file...")
-        time.sleep(1.2)
 
-        msg.toast("🔍 Reading sheets...")
-        time.sleep(1.2)
-
-        msg.toast("✅ File uploaded successfully!")
-        time.sleep(0.5)
-
-    all_rounds = []
-    for file in files_to_process:
-        # STEP 1: ambil nama file sebagai ROUND
-        filename = os.path.splitext(file.name)[0]
-
-        # STEP 2: baca sheet dalam file
-        xls = pd.ExcelFile(file)
-        df_raw = pd.read_excel(xls)
-        df_clean = clean_dataframe(df_raw)  # cleaning
+    # Hanya file round yang baru (atau isinya berubah) yang di-parse & di-cleaning
+    def process_new_rounds(new_files):
+        # Baca sheet pertama tiap file secara paralel (urutan tetap sesuai upload)
+        raw_rounds = read_workbooks(
+            new_files, sheet_name=0,
+            on_sheet=sheet_progress(msg.toast) if msg else None
+        )
 
-        # STEP 3: merge semua sheet dalam 1 file
-        df_clean.insert(0, "ROUND", filename)
+        processed = []
+        for idx, (file, df_raw) in enumerate(zip(new_files, raw_rounds), start=1):
+            # STEP 1: ambil nama file sebagai ROUND
+            filename = os.path.splitext(file.name)[0]
 
-        # Tambahkan "TOTAL" jika belum ada
-        scope_col = df_clean.columns[1]
-        # Cek apakah sudah ada baris TOTAL
-        has_total = df_clean.apply(
-            lambda row: row.astype(str).str.upper().str.contains("TOTAL").any(),
-            axis=1
-        ).any()
+            # STEP 2: cleaning sheet dalam file
+            df_clean = clean_dataframe(df_raw)  # cleaning
+            if msg:
+                clean_progress(msg.toast, filename, len(df_clean), idx, len(new_files))
 
-        if not has_total:
-            # Buat baris TOTAL baru
-            total_row = {col: "" for col in df_clean.columns}
+            # STEP 3: kolom ROUND + baris TOTAL
+            df_clean = add_round_total(df_clean, filename)
 
-            # Isi nilai row TOTAL
-            total_row["ROUND"] = filename
-            total_row[scope_col] = "TOTAL"
+            # Masukkan ke list
+            processed.append(df_clean)
 
-            # Hitung jumlah vendor per kolom (skip NaN)
-            vendor_cols = df_clean.select_dtypes(include=["int", "float"]).columns
-            for v in vendor_cols:
-                total_row[v] = df_clean[v].sum()
+        if msg:
+            msg.toast(upload_summary(raw_rounds, files=len(new_files)))
+        return processed
 
-            # Tambahkan ke df
-            df_clean = pd.concat([df_clean, pd.DataFrame([total_row])], ignore_index=True)
-        
-        # Masukkan ke list
-        all_rounds.append(df_clean)
+    # Store hasil proses per file (key: nama file + hash isi file)
+    store = st.session_state.setdefault("round_store_tco_by_round", RoundStore())
+    all_rounds = store.sync(files_to_process, process_new_rounds)
 
-    # STEP 4: MERGE SEMUA FILEE
-    df_merge = pd.concat(all_rounds, ignore_index=True)
-
-    # --- Buat kolom urutan ROUND ---
-    df_merge["ROUND_ORDER"] = df_merge["ROUND"].apply(extract_round_number)
-
-    # --- Tandai baris TOTAL ---
-    df_merge["IS_TOTAL"] = df_merge.apply(
-        lambda r: 1 if str(r.iloc[1]).strip().upper() == "TOTAL" else 0,
-        axis=1
-    )
-
-    # --- Sort ROUND dulu, lalu pastikan TOTAL paling bawah tiap ROUND ---
-    df_merge = (
-        df_merge
-        .sort_values(["ROUND_ORDER", "IS_TOTAL"])
-        .drop(columns=["ROUND_ORDER", "IS_TOTAL"])
-        .reset_index(drop=True)
-    )
+    # STEP 4: MERGE SEMUA FILEE -> summary / pivot / analisis, tiap tahap di-memo
+    run = pipeline.run(rounds=all_rounds)
+    df_merge = run["merge"]
 
     # Simpan ke session
     st.session_state["merge_tco_by_round"] = df_merge
@@ -632,17 +451,17 @@ def page():
     st.markdown("##### 🗃️ Merge Data")
     st.caption(f"Successfully consolidated data from **{len(files_to_process)} files**.")
 
-    # Pembulatan
     num_cols = df_merge.select_dtypes(include=["number"]).columns
-    df_merge[num_cols] = df_merge[num_cols].apply(round_half_up)
 
     # Format rupiah
-    df_merge_styled = (
-        df_merge.style
-        .format({col: format_rupiah for col in num_cols})
-        .apply(highlight_total_row_v2, axis=1)
-    )
-    st.dataframe(df_merge_styled, hide_index=True)
+    format_dict = rupiah_formats(df_merge, num_cols)
+    def style_merge(frame):
+        return (
+            frame.style
+            .format(format_dict)
+            .apply(total_row_styles_v2, axis=None)
+        )
+    paged_dataframe(df_merge, style_merge, key="merge_tco_by_round", hide_index=True)
 
     # Download
     excel_data = get_excel_download_highlight_total(df_merge)
@@ -661,84 +480,75 @@ def page():
     # COSTT SUMMARY
     st.markdown("##### 📑 Cost Summary")
 
-    # Ambil semua kolom kecuali "ROUND"
-    non_round_cols = [c for c in df_merge.columns if c != "ROUND"]
-
-    # Identifikasi kolom
-    scope_cols = df_merge[non_round_cols].select_dtypes(exclude=["number"]).columns.tolist()
-    vendor_cols = df_merge[non_round_cols].select_dtypes(include=['number']).columns.tolist()
-
-    # Melt (Unpivot)
-    df_summary = df_merge.melt(
-        id_vars=["ROUND"] + scope_cols,
-        value_vars=vendor_cols,
-        var_name="VENDOR",
-        value_name="[PRICE]"
-    )
+    # Long format Round, Vendor, Scope, Price (tahap summary)
+    df_summary = run["summary"]
 
-    # Reorder
-    final_cols = ["ROUND", "VENDOR"] + scope_cols + ["[PRICE]"]
-    df_summary = df_summary[final_cols]
-
-    # Sort
-    df_summary = df_summary.sort_values(["ROUND", "VENDOR"] + scope_cols).reset_index(drop=True)
-
-    # Slicer
-    all_round  = sorted(df_summary["ROUND"].dropna().unique())
-    all_vendor = sorted(df_summary["VENDOR"].dropna().unique())
-
-    col_sel_1, col_sel_2 = st.columns(2)
-    with col_sel_1:
-        selected_round = st.multiselect(
-            "Filter: Round",
-            options=all_round,
-            default=None,
-            placeholder="Choose one or more rounds"
-        )
-    with col_sel_2:
-        selected_vendor = st.multiselect(
-            "Filter: Vendor",
-            options=all_vendor,
-            default=None,
-            placeholder="Choose one or more vendors"
-        )
-
-    if selected_round and selected_vendor:
-        df_filtered = df_summary[
-            df_summary["ROUND"].isin(selected_round) &
-            df_summary['VENDOR'].isin(selected_vendor)
-        ]
-    elif selected_round:
-        df_filtered = df_summary[df_summary["ROUND"].isin(selected_round)]
-    elif selected_vendor:
-        df_filtered = df_summary[df_summary["VENDOR"].isin(selected_vendor)]
-    else:
-        df_filtered = df_summary.copy()
+    # Slicer + tabel + download sebagai fragment: ganti filter hanya menjalankan
+    # ulang bagian ini di atas df_summary dari run penuh terakhir
+    @st.fragment
+    def cost_summary_section(df_summary):
+        # Slicer
+        all_round  = sorted(df_summary["ROUND"].dropna().unique())
+        all_vendor = sorted(df_summary["VENDOR"].dropna().unique())
+
+        col_sel_1, col_sel_2 = st.columns(2)
+        with col_sel_1:
+            selected_round = st.multiselect(
+                "Filter: Round",
+                options=all_round,
+                default=None,
+                placeholder="Choose one or more rounds"
+            )
+        with col_sel_2:
+            selected_vendor = st.multiselect(
+                "Filter: Vendor",
+                options=all_vendor,
+                default=None,
+                placeholder="Choose one or more vendors"
+            )
 
-    # Format
-    num_cols = df_filtered.select_dtypes(include=["number"]).columns
-    df_filtered[num_cols] = df_filtered[num_cols].apply(round_half_up)
+        if selected_round and selected_vendor:
+            df_filtered = df_summary[
+                df_summary["ROUND"].isin(selected_round) &
+                df_summary['VENDOR'].isin(selected_vendor)
+            ]
+        elif selected_round:
+            df_filtered = df_summary[df_summary["ROUND"].isin(selected_round)]
+        elif selected_vendor:
+            df_filtered = df_summary[df_summary["VENDOR"].isin(selected_vendor)]
+        else:
+            df_filtered = df_summary.copy()
+
+        # Format
+        num_cols = df_filtered.select_dtypes(include=["number"]).columns
+        df_filtered[num_cols] = df_filtered[num_cols].apply(round_half_up)
+
+        format_dict = rupiah_formats(df_filtered, num_cols)
+        def style_summary(frame):
+            return (
+                frame.style
+                .format(format_dict)
+                .apply(total_row_styles_v2, axis=None)
+            )
 
-    df_summary_styled = (
-        df_filtered.style
-        .format({col: format_rupiah for col in num_cols})
-        .apply(highlight_total_row_v2, axis=1)
-    )
+        st.caption(f"✨ Total number of data entries: **{len(df_filtered)}**")
+        paged_dataframe(df_filtered, style_summary, key="summary_tco_by_round", hide_index=True)
+
+        # Download
+        excel_data = get_excel_download_highlight_total(df_filtered)
+        col1, col2, col3 = st.columns([2.3,2,1])
+        with col3:
+            st.download_button(
+                label="Download",
+                data=excel_data,
+                file_name="Cost Summary - TCO by Round.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                icon=":material/download:",
+            )
 
-    st.caption(f"✨ Total number of data entries: **{len(df_filtered)}**")
-    st.dataframe(df_summary_styled, hide_index=True)
+        return publish_frame("tco_by_round", "Cost Summary", df_filtered)
 
-    # Download
-    excel_data = get_excel_download_highlight_total(df_filtered)
-    col1, col2, col3 = st.columns([2.3,2,1])
-    with col3:
-        st.download_button(
-            label="Download",
-            data=excel_data,
-            file_name="Cost Summary - TCO by Round.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            icon=":material/download:",
-        )
+    df_filtered = cost_summary_section(df_summary)
 
     st.divider()
 
@@ -746,62 +556,23 @@ def page():
     st.markdown("##### 🛸 Pivot Table")
     st.caption("Pivoted price comparison table showing vendor offers per round for each item.")
 
-    total = df_merge.columns[1]
-    df_ptable = df_merge[df_merge[total] != "TOTAL"].copy()
-
-    non_round_cols = [c for c in df_ptable.columns if c != "ROUND"]
-    scope_cols = df_ptable[non_round_cols].select_dtypes(exclude=["number"]).columns.tolist()
-    vendor_cols = df_ptable[non_round_cols].select_dtypes(include=["number"]).columns.tolist()
-
-    # Ubah ke long format
-    df_plong = df_ptable.melt(
-        id_vars=["ROUND"] + scope_cols,
-        value_vars=vendor_cols,
-        var_name="VENDOR",
-        value_name="[PRICE]"
-    )
-
-    # Pivot
-    df_ppivot = df_plong.pivot_table(
-        index=scope_cols,
-        columns=["VENDOR", "ROUND"],
-        values="[PRICE]",
-        aggfunc="first"
-    )
-
-    # Rapikan nama kolom (flatten)
-    df_ppivot.columns = [
-        f"{vendor} {round_}"
-        for vendor, round_ in df_ppivot.columns
-    ]
-
-    df_ppivot = df_ppivot.reset_index() # reset index
-
-    # Tambahkan row TOTAL
-    total_row = {col: "" for col in df_ppivot.columns}
-
-    first_scope_col = scope_cols[0]
-    total_row[first_scope_col] = "TOTAL"
-
-    for col in df_ppivot.columns:
-        if col not in scope_cols:
-            total_row[col] = df_ppivot[col].sum(numeric_only=True)
-
-    # Append row TOTAL
-    df_ppivot = pd.concat([df_ppivot, pd.DataFrame([total_row])], ignore_index=True)
+    # Harga per vendor x round + baris TOTAL (tahap pivot)
+    df_ppivot = run["pivot"]
 
     # Format
     num_cols = df_ppivot.select_dtypes(include=["number"]).columns
 
-    df_ppivot_styled = (
-        df_ppivot.style
-        .format({col: format_rupiah for col in num_cols})
-        .apply(highlight_total_row_v2, axis=1)
-    )
+    format_dict = rupiah_formats(df_ppivot, num_cols)
+    def style_ppivot(frame):
+        return (
+            frame.style
+            .format(format_dict)
+            .apply(total_row_styles_v2, axis=None)
+        )
 
     # Tampilkan
     st.session_state["pivot2_tco_by_round"] = df_ppivot
-    st.dataframe(df_ppivot_styled, hide_index=True)
+    paged_dataframe(df_ppivot, style_ppivot, key="pivot_tco_by_round", hide_index=True)
 
     # Download
     excel_data = get_excel_download_highlight_total(df_ppivot)
@@ -820,330 +591,196 @@ def page():
     # BIDD & PRICEE ANALYSIS
     st.markdown("##### 🧠 Bid & Price Analysis")
 
-    # Hapus row total
-    df_analysis = df_merge[
-        ~df_merge.apply(
-            lambda row: row.astype(str).str.upper().eq("TOTAL").any(),
-            axis=1
-        )
-    ].copy()
+    # 1st/2nd Lowest, Gap, Median tanpa baris TOTAL (tahap analysis)
+    df_analysis = run["analysis"]
 
-    df_no_total = df_analysis.copy()
+    # Kolom vendor = kolom yang punya deviasi ke median
+    vendor_cols = [c for c in df_analysis.columns if f"{c} to Median (%)" in df_analysis.columns]
 
-    # Kolom vendor dinamis
-    vendor_cols = df_analysis.select_dtypes(include=["number"]).columns.tolist()
-
-    # Penanganan untuk 0 value
-    vendor_values = df_analysis[vendor_cols].copy()
-    vendor_values = vendor_values.replace(0, pd.NA)
-    vendor_values = vendor_values.apply(pd.to_numeric, errors="coerce")
-
-    # Hitung 1st dan 2nd lowest
-    df_analysis["1st Lowest"] = vendor_values.min(axis=1)
-    # df_analysis["1st Vendor"] = vendor_values.idxmin(axis=1)
-
-    # Penanganan khusus 1st Vendor
-    mask_all_nan1 = vendor_values.isna().all(axis=1)
-    df_analysis["1st Vendor"] = None
-    valid_idx1 = (~mask_all_nan1)
-    df_analysis.loc[valid_idx1, "1st Vendor"] = vendor_values.loc[valid_idx1].idxmin(axis=1) 
+    # Simpan ke session state
+    st.session_state["bid_and_price_analysis_tco_by_round"] = df_analysis
 
-    # Hitung 2nd Lowest
-    # Hilangkan dulu nilai 1st Lowest dari kandidat (agar kita dapat 2nd Lowest yang benar)
-    temp = vendor_values.mask(vendor_values.eq(df_analysis["1st Lowest"], axis=0))
+    # Slicer + tabel + download sebagai fragment: ganti filter hanya menjalankan
+    # ulang bagian ini di atas df_analysis dari run penuh terakhir
+    @st.fragment
+    def bid_analysis_section(df_analysis):
+        # --- 🎯 Tambahkan slicer
+        all_round = sorted(df_analysis["ROUND"].dropna().unique())
+        all_1st = sorted(df_analysis["1st Vendor"].dropna().unique())
+        all_2nd = sorted(df_analysis["2nd Vendor"].dropna().unique())
+
+        col_sel_1, col_sel_2, col_sel_3 = st.columns(3)
+        with col_sel_1:
+            selected_round = st.multiselect(
+                "Filter: Round",
+                options=all_round,
+                default=[],
+                placeholder="Choose rounds",
+            )
+        with col_sel_2:
+            selected_1st = st.multiselect(
+                "Filter: 1st vendor",
+                options=all_1st,
+                default=[],
+                placeholder="Choose vendors",
+            )
+        with col_sel_3:
+            selected_2nd = st.multiselect(
+                "Filter: 2nd vendor",
+                options=all_2nd,
+                default=[],
+                placeholder="Choose vendors",
+            )
 
-    df_analysis["2nd Lowest"] = temp.min(axis=1)
-    # df_analysis["2nd Vendor"] = temp.idxmin(axis=1)
+        # --- Terapkan filter AND secara dinamis
+        df_filtered_analysis = df_analysis.copy()
 
-    # Penanganan khusus 2nd Vendor
-    mask_all_nan2 = temp.isna().all(axis=1)
-    df_analysis["2nd Vendor"] = None
-    valid_idx2 = (~mask_all_nan2)
-    df_analysis.loc[valid_idx2, "2nd Vendor"] = temp.loc[valid_idx2].idxmin(axis=1)
+        if selected_round:
+            df_filtered_analysis = df_filtered_analysis[df_filtered_analysis["ROUND"].isin(selected_round)]
 
-    # Hitung gap antara 1st dan 2nd lowest (%)
-    df_analysis["Gap 1 to 2 (%)"] = ((df_analysis["2nd Lowest"] - df_analysis["1st Lowest"]) / df_analysis["1st Lowest"] * 100).round(2)
+        if selected_1st:
+            df_filtered_analysis = df_filtered_analysis[df_filtered_analysis["1st Vendor"].isin(selected_1st)]
 
-    # Hitung median price
-    df_analysis["Median Price"] = vendor_values.median(axis=1)
-    df_analysis["Median Price"] = pd.to_numeric(df_analysis["Median Price"], errors="coerce")
+        if selected_2nd:
+            df_filtered_analysis = df_filtered_analysis[df_filtered_analysis["2nd Vendor"].isin(selected_2nd)]
 
-    # Hitung selisih tiap vendor dengan median (%)
-    for v in vendor_cols:
-        df_analysis[f"{v} to Median (%)"] = ((df_analysis[v] - df_analysis["Median Price"]) / df_analysis["Median Price"] * 100).round(2)
+        # Format
+        num_cols = df_filtered_analysis.select_dtypes(include=["number"]).columns
+        format_dict = rupiah_formats(df_filtered_analysis, num_cols)
+        format_dict.update({"Gap 1 to 2 (%)": "{:.1f}%"})
+        for vendor in vendor_cols:
+            format_dict[f"{vendor} to Median (%)"] = "{:+.1f}%"
 
-    # Simpan ke session state
-    st.session_state["bid_and_price_analysis_tco_by_round"] = df_analysis
+        def style_analysis(frame):
+            return (
+                frame.style
+                .format(format_dict)
+                .apply(vendor_rank_styles, axis=None, columns=df_filtered_analysis.columns)
+            )
 
-    # --- 🎯 Tambahkan slicer
-    all_round = sorted(df_analysis["ROUND"].dropna().unique())
-    all_1st = sorted(df_analysis["1st Vendor"].dropna().unique())
-    all_2nd = sorted(df_analysis["2nd Vendor"].dropna().unique())
-
-    col_sel_1, col_sel_2, col_sel_3 = st.columns(3)
-    with col_sel_1:
-        selected_round = st.multiselect(
-            "Filter: Round",
-            options=all_round,
-            default=[],
-            placeholder="Choose rounds",
-        )
-    with col_sel_2:
-        selected_1st = st.multiselect(
-            "Filter: 1st vendor",
-            options=all_1st,
-            default=[],
-            placeholder="Choose vendors",
-        )
-    with col_sel_3:
-        selected_2nd = st.multiselect(
-            "Filter: 2nd vendor",
-            options=all_2nd,
-            default=[],
-            placeholder="Choose vendors",
+        st.markdown(
+            f"""
+            <div style="display:flex; justify-content:space-between; align-items:center; margin-bottom:15px;">
+                <div style="font-size:0.88rem; color:gray;">
+                    ✨ Total number of data entries: <b>{len(df_filtered_analysis)}</b>
+                </div>
+                <div style="text-align:right;">
+                    <span style="background:#C6EFCE; padding:2px 8px; border-radius:6px; font-weight:600; font-size: 0.75rem; color: black">1st Lowest</span>
+                    &nbsp;
+                    <span style="background:#FFEB9C; padding:2px 8px; border-radius:6px; font-weight:600; font-size: 0.75rem; color: black">2nd Lowest</span>
+                </div>
+            </div>
+            """,
+            unsafe_allow_html=True
         )
 
-    # --- Terapkan filter AND secara dinamis
-    df_filtered_analysis = df_analysis.copy()
-
-    if selected_round:
-        df_filtered_analysis = df_filtered_analysis[df_filtered_analysis["ROUND"].isin(selected_round)]
+        paged_dataframe(df_filtered_analysis, style_analysis, key="analysis_tco_by_round", hide_index=True)
 
-    if selected_1st:
-        df_filtered_analysis = df_filtered_analysis[df_filtered_analysis["1st Vendor"].isin(selected_1st)]
+        # Download button to Excel
+        excel_data = get_excel_download_highlight_1st_2nd_lowest(df_filtered_analysis)
 
-    if selected_2nd:
-        df_filtered_analysis = df_filtered_analysis[df_filtered_analysis["2nd Vendor"].isin(selected_2nd)]
-
-    # Format
-    num_cols = df_filtered_analysis.select_dtypes(include=["number"]).columns
-    format_dict = {col: format_rupiah for col in num_cols}
-    format_dict.update({"Gap 1 to 2 (%)": "{:.1f}%"})
-    for vendor in vendor_cols:
-        format_dict[f"{vendor} to Median (%)"] = "{:+.1f}%"
-
-    df_analysis_styled = (
-        df_filtered_analysis.style
-        .format(format_dict)
-        .apply(lambda row: highlight_1st_2nd_vendor(row, df_filtered_analysis.columns), axis=1)
-    )
-
-    st.markdown(
-        f"""
-        <div style="display:flex; justify-content:space-between; align-items:center; margin-bottom:15px;">
-            <div style="font-size:0.88rem; color:gray;">
-                ✨ Total number of data entries: <b>{len(df_filtered_analysis)}</b>
-            </div>
-            <div style="text-align:right;">
-                <span style="background:#C6EFCE; padding:2px 8px; border-radius:6px; font-weight:600; font-size: 0.75rem; color: black">1st Lowest</span>
-                &nbsp;
-                <span style="background:#FFEB9C; padding:2px 8px; border-radius:6px; font-weight:600; font-size: 0.75rem; color: black">2nd Lowest</span>
-            </div>
-        </div>
-        """,
-        unsafe_allow_html=True
-    )
-
-    st.dataframe(df_analysis_styled, hide_index=True)
+        # Layout tombol (rata kanan)
+        col1, col2, col3 = st.columns([2.3,2,1])
+        with col3:
+            st.download_button(
+                label="Download",
+                data=excel_data,
+                file_name="Bid & Price Analysis - TCO by Round.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                icon=":material/download:"
+            )
 
-    # Download button to Excel
-    excel_data = get_excel_download_highlight_1st_2nd_lowest(df_filtered_analysis)
+        return publish_frame("tco_by_round", "Bid & Price Analysis", df_filtered_analysis)
 
-    # Layout tombol (rata kanan)
-    col1, col2, col3 = st.columns([2.3,2,1])
-    with col3:
-        st.download_button(
-            label="Download",
-            data=excel_data,
-            file_name="Bid & Price Analysis - TCO by Round.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            icon=":material/download:"
-        )
+    df_filtered_analysis = bid_analysis_section(df_analysis)
     
     st.divider()
 
     # PRICE MOVEMENTT ANALYSIS
     st.markdown("##### 💸 Price Movement Analysis")
 
-    # Identifikasi kolom
-    non_round_cols = [c for c in df_no_total.columns if c != "ROUND"]
-    scope_cols = df_no_total[non_round_cols].select_dtypes(exclude=["number"]).columns.tolist()
-    vendor_cols = df_no_total[non_round_cols].select_dtypes(include=['number']).columns.tolist()
-
-    # Melt (Unpivot)
-    df_long = df_no_total.melt(
-        id_vars=["ROUND"] + scope_cols,
-        value_vars=vendor_cols,
-        var_name="VENDOR",
-        value_name="[PRICE]"
-    )
-
-    # PIVOT
-    df_pivot = df_long.pivot_table(
-        index=["VENDOR"] + scope_cols,
-        columns="ROUND",
-        values="[PRICE]",
-        aggfunc="first"
-    ).reset_index()
-
-    # Urutkan kolom ROUND
-    round_order = sorted([c for c in df_pivot.columns if c not in ["VENDOR"] + scope_cols])
-    df_pivot = df_pivot[["VENDOR"] + scope_cols + round_order]
-
-    # PRICE REDUCTION
-    def compute_price_reduction(row):
-        prices = row[round_order]
-        valid_prices = prices.dropna()
-
-        if len(valid_prices) < 2:
-            return pd.Series({
-                "PRICE REDUCTION (VALUE)": np.nan, 
-                "PRICE REDUCTION (%)": np.nan
-            })
-
-        first_val = valid_prices.iloc[0]
-        last_val  = valid_prices.iloc[-1]
-
-        reduction_value = first_val - last_val
-        reduction_pct   = (reduction_value / first_val) * 100
-
-        return pd.Series({
-            "PRICE REDUCTION (VALUE)": reduction_value,
-            "PRICE REDUCTION (%)": round(reduction_pct, 2)
-        }) 
-    
-    df_pivot[["PRICE REDUCTION (VALUE)", "PRICE REDUCTION (%)"]] = (
-        df_pivot.apply(compute_price_reduction, axis=1)
-    )
-
-    # PRICE TREND
-    def detect_trend(row):
-        prices = row[round_order].values.astype(float)
-        prices = prices[~np.isnan(prices)]
-
-        if len(prices) <= 1:
-            return "Insufficient Data"
-        if all(prices[i] > prices[i+1] for i in range(len(prices)-1)):
-            return "Consistently Down"
-        if all(prices[i] < prices[i+1] for i in range(len(prices)-1)):
-            return "Consistently Up"
-        if len(set(prices)) == 1:
-            return "No Change"
-        
-        return "Fluctuating"
-    
-    df_pivot["PRICE TREND"] = df_pivot.apply(detect_trend, axis=1)
-
-    # PRICE STABILITY INDEX (PSI)
-    def compute_psi(row):
-        prices = row[round_order].astype(float)
-        prices = prices[~np.isnan(prices)]
-        if len(prices) == 0:
-            return np.nan
-        return ((prices.max() - prices.min()) / prices.mean()) * 100
-    
-    df_pivot["STANDARD DEVIATION"] = df_pivot[round_order].std(axis=1, ddof=0).round(4)
-    df_pivot["PRICE STABILITY INDEX (%)"] = df_pivot.apply(compute_psi, axis=1).round(2)
-
-    # Adding "TOTAL" columns
-    round_cols = round_order.copy()   # ambil kolom ROUND saja untuk dihitung
-
-    total_rows = []
-    for vendor in df_pivot["VENDOR"].unique():
-        df_vendor = df_pivot[df_pivot["VENDOR"] == vendor]
-
-        # Hitung sum per ROUND
-        total_data = df_vendor[round_cols].sum(numeric_only=True)
-
-        # Buat row kosong
-        # total_row = {col: "" for col in df_pivot.columns}
-        total_row = {col: np.nan for col in df_pivot.columns}
-
-        total_row["VENDOR"] = vendor
-        total_row[scope_cols[0]] = "TOTAL"
-
-        # Masukkan total ROUND
-        for col in round_cols:
-            total_row[col] = total_data[col]
-
-        total_rows.append(total_row)
-
-    df_total_rows = pd.DataFrame(total_rows)
-    df_pivot = pd.concat([df_pivot, df_total_rows], ignore_index=True)
+    # Harga per round, reduction, trend, PSI + TOTAL per vendor (tahap price_movement)
+    df_pivot = run["price_movement"]
 
-    # Urutkan lagi: vendor tetap grouping
-    df_pivot = df_pivot.sort_values(["VENDOR", scope_cols[0]], key=lambda s: s.replace("TOTAL", "ZZZ"))
-
-    # Tambahkan slicer 
-    all_vendor = sorted(df_pivot["VENDOR"].dropna().unique())
-    all_trend  = sorted(df_pivot["PRICE TREND"].dropna().unique())
-
-    col_sel_1, col_sel_2 = st.columns(2)
-    with col_sel_1:
-        selected_vendor = st.multiselect(
-            "Filter: Vendor",
-            options=all_vendor,
-            default=None,
-            placeholder="Choose one or more vendors",
-            key="filter_vendor"
-        )
-    with col_sel_2:
-        selected_trend = st.multiselect(
-            "Filter: Price Trend",
-            options=all_trend,
-            default=None,
-            placeholder="Choose one or more price trends",
-            key="filter_price_trend"
-        )
-
-    # Terapkan filter dengan logika AND
-    if selected_vendor and selected_trend:
-        df_filter_pivot = df_pivot[
-            df_pivot["VENDOR"].isin(selected_vendor) &
-            df_pivot["PRICE TREND"].isin(selected_trend)
-        ]
-    elif selected_vendor:
-        df_filter_pivot = df_pivot[df_pivot["VENDOR"].isin(selected_vendor)]
-    elif selected_trend:
-        df_filter_pivot = df_pivot[df_pivot["PRICE TREND"].isin(selected_trend)]
-    else:
-        df_filter_pivot = df_pivot.copy()
-
-    # Format
-    num_cols = df_filter_pivot.select_dtypes(include=["number"]).columns
-    format_dict = {col: format_rupiah for col in num_cols}
-    format_dict.update({
-        "PRICE REDUCTION (%)": "{:+.1f}%",
-        "PRICE STABILITY INDEX (%)": "{:.1f}%"
-    })
+    # Slicer + tabel + download sebagai fragment: ganti filter hanya menjalankan
+    # ulang bagian ini di atas df_pivot dari run penuh terakhir
+    @st.fragment
+    def price_movement_section(df_pivot):
+        # Tambahkan slicer 
+        all_vendor = sorted(df_pivot["VENDOR"].dropna().unique())
+        all_trend  = sorted(df_pivot["PRICE TREND"].dropna().unique())
+
+        col_sel_1, col_sel_2 = st.columns(2)
+        with col_sel_1:
+            selected_vendor = st.multiselect(
+                "Filter: Vendor",
+                options=all_vendor,
+                default=None,
+                placeholder="Choose one or more vendors",
+                key="filter_vendor"
+            )
+        with col_sel_2:
+            selected_trend = st.multiselect(
+                "Filter: Price Trend",
+                options=all_trend,
+                default=None,
+                placeholder="Choose one or more price trends",
+                key="filter_price_trend"
+            )
 
-    df_pivot_style = (
-        df_filter_pivot.style
-        .format(format_dict)
-        .apply(highlight_total_row_v2, axis=1)
-    )
+        # Terapkan filter dengan logika AND
+        if selected_vendor and selected_trend:
+            df_filter_pivot = df_pivot[
+                df_pivot["VENDOR"].isin(selected_vendor) &
+                df_pivot["PRICE TREND"].isin(selected_trend)
+            ]
+        elif selected_vendor:
+            df_filter_pivot = df_pivot[df_pivot["VENDOR"].isin(selected_vendor)]
+        elif selected_trend:
+            df_filter_pivot = df_pivot[df_pivot["PRICE TREND"].isin(selected_trend)]
+        else:
+            df_filter_pivot = df_pivot.copy()
+
+        # Format
+        num_cols = df_filter_pivot.select_dtypes(include=["number"]).columns
+        format_dict = rupiah_formats(df_filter_pivot, num_cols)
+        format_dict.update({
+            "PRICE REDUCTION (%)": "{:+.1f}%",
+            "PRICE STABILITY INDEX (%)": "{:.1f}%"
+        })
 
-    # Tampilkan
-    st.caption(f"✨ Total number of data entries: **{len(df_filter_pivot)}**")
-    st.dataframe(df_pivot_style, hide_index=True)
+        def style_pivot(frame):
+            return (
+                frame.style
+                .format(format_dict)
+                .apply(total_row_styles_v2, axis=None)
+            )
 
-    # --- Prepare dataframe for Excel export ---
-    df_export = df_filter_pivot.copy()
+        # Tampilkan
+        st.caption(f"✨ Total number of data entries: **{len(df_filter_pivot)}**")
+        paged_dataframe(df_filter_pivot, style_pivot, key="price_movement_tco_by_round", hide_index=True)
+
+        # --- Prepare dataframe for Excel export ---
+        df_export = df_filter_pivot.copy()
+
+        # Replace NaN / Inf with empty string to avoid xlsxwriter error
+        df_export = price_movement_export(df_export)
+
+        # Download
+        excel_data = get_excel_download_highlight_price_trend(df_export)
+        col1, col2, col3 = st.columns([2.3,2,1])
+        with col3:
+            st.download_button(
+                label="Download",
+                data=excel_data,
+                file_name="Price Movement Analysis - TCO by Round.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                icon=":material/download:"
+            )
 
-    # Replace NaN / Inf with empty string to avoid xlsxwriter error
-    df_export = df_export.replace([np.nan, np.inf, -np.inf], "")
+        return publish_frame("tco_by_round", "Price Movement Analysis", df_export)
 
-    # Download
-    excel_data = get_excel_download_highlight_price_trend(df_export)
-    col1, col2, col3 = st.columns([2.3,2,1])
-    with col3:
-        st.download_button(
-            label="Download",
-            data=excel_data,
-            file_name="Price Movement Analysis - TCO by Round.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            icon=":material/download:"
-        )
+    df_export = price_movement_section(df_pivot)
 
     # VISUALIZATIONN
     st.markdown("##### 📊 Visualization")
@@ -1279,7 +916,7 @@ def page():
             ''')
 
             num_cols = win_table.select_dtypes(include=["number"]).columns
-            format_dict = {col: format_rupiah for col in num_cols}
+            format_dict = rupiah_formats(win_table, num_cols)
 
             win_table_styled = win_table.style.format(format_dict)
             st.dataframe(win_table_styled, hide_index=True)
@@ -1456,7 +1093,7 @@ def page():
             ''')
 
             num_cols = trend_table.select_dtypes(include=["number"]).columns
-            format_dict = {col: format_rupiah for col in num_cols}
+            format_dict = rupiah_formats(trend_table, num_cols)
 
             trend_table_styled = trend_table.style.format(format_dict)
             st.dataframe(trend_table_styled, hide_index=True)
@@ -1479,13 +1116,15 @@ def page():
 
     # SUPERRR BUTTONN
     st.markdown("##### 🧑‍💻 Super Download — Export Selected Sheets")
-    dataframes = {
+    # Dict bersama di session_state: fragment filter mengganti sheet-nya, dan
+    # tombol Download membaca dict ini saat diklik
+    dataframes = export_frames("tco_by_round", {
         "Merge Data": df_merge,
         "Cost Summary": df_filtered,
         "Pivot Table": df_ppivot,
         "Bid & Price Analysis": df_filtered_analysis,
         "Price Movement Analysis": df_export
-    }
+    })
 
     # Tampilkan multiselect
     selected_sheets = st.multiselect(
@@ -1496,116 +1135,8 @@ def page():
 
     # Fungsi "Super Button" & Formatting
     def generate_multi_sheet_excel(selected_sheets, df_dict):
-
-        output = BytesIO()
-
-        with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
-            for sheet in selected_sheets:
-                df_raw = df_dict[sheet].copy()
-
-                # ===== COERCE NUMERIC SAFELY =====
-                df = df_raw.copy()
-                numeric_cols = []
-
-                for col in df.columns:
-                    coerced = pd.to_numeric(df[col], errors="coerce")
-                    if coerced.notna().any():
-                        df[col] = coerced
-                        numeric_cols.append(col)
-
-                pct_cols = [c for c in df.columns if "%" in c]
-
-                df.to_excel(writer, index=False, sheet_name=sheet)
-                workbook  = writer.book
-                worksheet = writer.sheets[sheet]
-
-                # ===== FORMAT =====
-                fmt_rupiah = workbook.add_format({"num_format": "#,##0"})
-                fmt_pct    = workbook.add_format({'num_format': '#,##0.0"%"'})
-
-                fmt_total = workbook.add_format({
-                    "bold": True,
-                    "bg_color": "#D9EAD3",
-                    "font_color": "#1A5E20",
-                    "num_format": "#,##0"
-                })
-
-                fmt_first = workbook.add_format({
-                    "bg_color": "#C6EFCE",
-                    "num_format": "#,##0"
-                })
-
-                fmt_second = workbook.add_format({
-                    "bg_color": "#FFEB9C",
-                    "num_format": "#,##0"
-                })
-
-                # ===== COLUMN FORMAT =====
-                for col_idx, col_name in enumerate(df.columns):
-                    if col_name in numeric_cols:
-                        worksheet.set_column(col_idx, col_idx, 15, fmt_rupiah)
-                    if col_name in pct_cols:
-                        worksheet.set_column(col_idx, col_idx, 15, fmt_pct)
-
-                # ===== LOOP DATA =====
-                for row_idx, row in enumerate(df.itertuples(index=False), start=1):
-
-                    is_total_row = any(
-                        isinstance(x, str) and x.strip().upper() == "TOTAL"
-                        for x in row
-                        if pd.notna(x)
-                    )
-
-                    # Bid & Price vendor index
-                    first_idx = second_idx = None
-                    if sheet == "Bid & Price Analysis":
-                        first_vendor  = row[df.columns.get_loc("1st Vendor")]
-                        second_vendor = row[df.columns.get_loc("2nd Vendor")]
-
-                        if first_vendor in numeric_cols:
-                            first_idx = df.columns.get_loc(first_vendor)
-                        if second_vendor in numeric_cols:
-                            second_idx = df.columns.get_loc(second_vendor)
-
-                    for col_idx, col_name in enumerate(df.columns):
-                        value = row[col_idx]
-                        fmt = None
-
-                        # ===== PICK FORMAT =====
-                        if sheet == "Bid & Price Analysis":
-                            if col_idx == first_idx:
-                                fmt = fmt_first
-                            elif col_idx == second_idx:
-                                fmt = fmt_second
-                        elif is_total_row:
-                            fmt = fmt_total
-
-                        # ===== WRITE CELL (TYPE SAFE) =====
-                        if pd.isna(value) or (isinstance(value, float) and np.isinf(value)):
-                            worksheet.write_blank(row_idx, col_idx, None, fmt)
-
-                        elif col_name in pct_cols:
-                            worksheet.write_number(
-                                row_idx, col_idx, value, fmt or fmt_pct
-                            )
-
-                        elif col_name in numeric_cols:
-                            worksheet.write_number(
-                                row_idx, col_idx, value, fmt or fmt_rupiah
-                            )
-
-                        else:
-                            worksheet.write(row_idx, col_idx, value, fmt)
-
-                # ===== AUTOFIT =====
-                for i, col in enumerate(df.columns):
-                    worksheet.set_column(
-                        i, i,
-                        max(len(str(col)), df[col].astype(str).map(len).max()) + 2
-                    )
-
-        output.seek(0)
-        return output.getvalue()
+        # Tiap sheet di-plan paralel di thread pool, lalu ditulis ke satu workbook
+        return build_super_download(SUPER_DOWNLOAD, df_dict, selected_sheets)
 
     # --- FRAGMENT UNTUK BALLOONS ---
     @st.fragment
@@ -1614,14 +1145,17 @@ def page():
 
     # ---- DOWNLOAD BUTTON ----
     if selected_sheets:
-        excel_bytes = generate_multi_sheet_excel(selected_sheets, dataframes)
+        excel_bytes = deferred(generate_multi_sheet_excel, selected_sheets, dataframes)
 
         st.download_button(
             label="Download",
             data=excel_bytes,
-            file_name="TCO Comparison Round by Round.xlsx",
+            file_name=SUPER_DOWNLOAD.file_name,
             mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
             on_click=release_the_balloons,
             type="primary",
             use_container_width=True,
         )
+
+    # Tahap yang dihitung ulang vs diambil dari cache (INSPIRE_SHOW_STAGES=1)
+    stage_report(run, "tco_by_round")
@@ -2,521 +2,289 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import altair as alt
-import time
 import re
-from io import BytesIO
-
-def round_half_up(series):
-    return np.floor(series * 100 + 0.5) / 100
-
-def format_rupiah(x):
-    if pd.isna(x):
-        return ""
-    # pastikan bisa diubah ke float
-    try:
-        x = float(x)
-    except:
-        return x  # biarin apa adanya kalau bukan angka
-
-    # kalau tidak punya desimal (misal 7000.0), tampilkan tanpa ,00
-    if x.is_integer():
-        formatted = f"{int(x):,}".replace(",", ".")
-    else:
-        formatted = f"{x:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-        # hapus ,00 kalau desimalnya 0 semua (misal 7000,00 → 7000)
-        if formatted.endswith(",00"):
-            formatted = formatted[:-3]
-    return formatted
-
-def highlight_total_row(row):
-    if str(row.iloc[0]).strip().upper() == "TOTAL":
-        return ["font-weight: bold;"] * len(row)
-    else:
-        return [""] * len(row)
-    
-def highlight_total_row_v2(row):
-    # Cek apakah ada kolom yang berisi "TOTAL" (case-insensitive)
-    if any(str(x).strip().upper() == "TOTAL" for x in row):
-        return ["font-weight: bold; background-color: #D9EAD3; color: #1A5E20;"] * len(row)
-    else:
-        return [""] * len(row)
 
+from inspire_core import (
+    read_workbook,
+    sheet_progress,
+    upload_summary,
+    round_half_up,
+    rupiah_formats,
+    row_styles,
+    rank_summary_styles,
+    vendor_rank_styles,
+    clean_dataframe,
+    add_bid_analysis,
+    add_group_totals,
+    mark_totals,
+    drop_total_rows,
+    deferred,
+    lazy_export,
+    plan_year_region_sheet,
+    Pipeline,
+    Batch,
+    SuperDownload,
+    build_super_download,
+)
+from inspire_core import export
+from inspire_ui import (
+    paged_dataframe,
+    publish_frame,
+    export_frames,
+    stage_report,
+)
+
+# Excel dibuat saat tombol Download diklik, hasilnya di-cache per isi dataframe
+get_excel_download = lazy_export(export.get_excel_download)
+get_excel_download_with_highlight = lazy_export(export.get_excel_download_with_highlight)
+get_excel_download_with_highlight_v2 = lazy_export(export.get_excel_download_with_highlight_v2)
+get_excel_download_highlight_summary = lazy_export(export.get_excel_download_highlight_summary)
+get_excel_download_highlight_1st_2nd_lowest = lazy_export(export.get_excel_download_highlight_1st_2nd_lowest)
+
+
+def is_total_label(series):
+    return series.astype(str).str.strip().str.upper().eq("TOTAL")
+
+
+# Styler.apply(..., axis=None): satu frame style untuk seluruh tabel
+def highlight_total_row(df):
+    return row_styles(df, is_total_label(df.iloc[:, 0]), "font-weight: bold;")
+    
 # Highlight total per year
-def highlight_total_per_year(row):
-    if str(row["SCOPE"]).strip().upper() == "TOTAL" and pd.notna(row["YEAR"]):
-        return ["font-weight: bold; background-color: #FFEB9C; color: #9C6500;"] * len(row)
-    else:
-        return [""] * len(row)
+def highlight_total_per_year(df):
+    is_total = is_total_label(df["SCOPE"]) & df["YEAR"].notna()
+    return row_styles(df, is_total, "font-weight: bold; background-color: #FFEB9C; color: #9C6500;")
 
 # Highlight vendor total
-def highlight_vendor_total(row):
-    if str(row["YEAR"]).strip().upper() == "TOTAL":
-        return ["font-weight: bold; background-color: #C6EFCE; color: #006100;"] * len(row)
-    else:
-        return [""] * len(row)
-    
-def highlight_1st_2nd_vendor(row, columns):
-    styles = [""] * len(columns)
-    first_vendor = row.get("1st Vendor")
-    second_vendor = row.get("2nd Vendor")
-
-    for i, col in enumerate(columns):
-        if col == first_vendor:
-            styles[i] = "background-color: #C6EFCE; color: #006100;"
-        elif col == second_vendor:
-            styles[i] = "background-color: #FFEB9C; color: #9C6500;"
-    return styles
-
-def highlight_rank_summary(row, num_cols):
-    styles = [""] * len(row)
-
-    # Ambil nilai numeric vendor
-    numeric_vals = row[num_cols]
-
-    # EXCLUDE nilai 0 (vendor tidak ikut tender)
-    numeric_vals = numeric_vals[numeric_vals != 0]
-
-    # Skip jika kosong / NaN semua
-    if numeric_vals.dropna().empty:
-        return styles
-
-    # Sort numeric values
-    sorted_vals = numeric_vals.sort_values()
-
-    # Determine 1st & 2nd rank
-    first_vendor = sorted_vals.index[0]
-    second_vendor = sorted_vals.index[1] if len(sorted_vals) > 1 else None
-
-    # Apply styles
-    for i, col in enumerate(row.index):
-        if col == first_vendor:
-            styles[i] = "background-color: #C6EFCE; color: #006100;"
-        elif second_vendor and col == second_vendor:
-            styles[i] = "background-color: #FFEB9C; color: #9C6500;"
-
-    return styles
-
-# Download button to Excel
-@st.cache_data
-def get_excel_download(df, sheet_name="Sheet1"):
-    output = BytesIO()
-
-    with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
-        df.to_excel(writer, index=False, sheet_name=sheet_name)
-
-        workbook  = writer.book
-        worksheet = writer.sheets[sheet_name]
-
-        # ================= FORMAT =================
-        fmt_rupiah = workbook.add_format({"num_format": "#,##0"})
-        fmt_pct = workbook.add_format({"num_format": '#,##0.0"%"'})
-
-        # ================= COLUMN GROUP =================
-        num_cols = df.select_dtypes(include=["number"]).columns.tolist()
-        pct_cols = [c for c in df.columns if "%" in c]
-
-        # ================= REWRITE CELLS =================
-        for row_idx, row in enumerate(df.itertuples(index=False), start=1):
-            for col_idx, col_name in enumerate(df.columns):
-                val = row[col_idx]
-
-                # Safety NaN / inf
-                if pd.isna(val) or (isinstance(val, (int, float)) and np.isinf(val)):
-                    worksheet.write(row_idx, col_idx, "")
-                    continue
-
-                # ===== PERCENT COLUMN =====
-                if col_name in pct_cols:
-                    worksheet.write_number(
-                        row_idx,
-                        col_idx,
-                        val,
-                        fmt_pct
-                    )
-
-                # ===== NUMERIC COLUMN =====
-                elif col_name in num_cols:
-                    worksheet.write_number(
-                        row_idx,
-                        col_idx,
-                        val,
-                        fmt_rupiah
-                    )
-
-                # ===== TEXT COLUMN =====
-                else:
-                    worksheet.write(row_idx, col_idx, val)
-
-        # ================= AUTOFIT =================
-        for i, col in enumerate(df.columns):
-            max_len = max(
-                df[col].astype(str).map(len).max(),
-                len(str(col))
-            ) + 2
-            worksheet.set_column(i, i, max_len)
-
-    output.seek(0)
-    return output.getvalue()
-
-# Download Highlight Summary
-def get_excel_download_highlight_summary(df, sheet_name="Sheet1"):
-    output = BytesIO()
-
-    with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
-        df.to_excel(writer, index=False, sheet_name=sheet_name)
-
-        workbook  = writer.book
-        worksheet = writer.sheets[sheet_name]
-
-        # ================= FORMAT =================
-        format_rupiah = workbook.add_format({"num_format": "#,##0"})
-        format_bold = workbook.add_format({"bold": True})
-
-        format_bold_rupiah = workbook.add_format({
-            "bold": True,
-            "num_format": "#,##0"
-        })
-
-        format_first = workbook.add_format({
-            "bg_color": "#C6EFCE",
-            "num_format": "#,##0"
-        })
-
-        format_second = workbook.add_format({
-            "bg_color": "#FFEB9C",
-            "num_format": "#,##0"
-        })
-
-        format_first_bold = workbook.add_format({
-            "bg_color": "#C6EFCE",
-            "bold": True,
-            "num_format": "#,##0"
-        })
-
-        format_second_bold = workbook.add_format({
-            "bg_color": "#FFEB9C",
-            "bold": True,
-            "num_format": "#,##0"
-        })
-
-        # ================= NUMERIC COLUMNS =================
-        num_cols = df.select_dtypes(include=["number"]).columns
-
-        # ================= LOOP DATA =================
-        for row_idx, (_, row) in enumerate(df.iterrows(), start=1):
-
-            is_total = any(str(x).strip().upper() == "TOTAL" for x in row)
-
-            # ===== RANKING (EXCLUDE 0) =====
-            numeric_vals = row[num_cols].dropna()
-            numeric_vals = numeric_vals[numeric_vals != 0]
-
-            first_vendor, second_vendor = None, None
-            if not numeric_vals.empty:
-                sorted_vals = numeric_vals.sort_values()
-                first_vendor = sorted_vals.index[0]
-                if len(sorted_vals) > 1:
-                    second_vendor = sorted_vals.index[1]
-
-            # ===== WRITE CELL =====
-            for col_idx, col in enumerate(df.columns):
-                value = row[col]
-
-                if pd.isna(value) or (isinstance(value, (int, float)) and np.isinf(value)):
-                    value = ""
-
-                fmt = None
-
-                # ----- NO HIGHLIGHT FOR ZERO -----
-                if value == 0:
-                    fmt = None
-
-                else:
-                    if col == first_vendor:
-                        fmt = format_first_bold if is_total else format_first
-                    elif col == second_vendor:
-                        fmt = format_second_bold if is_total else format_second
-
-                # ----- WRITE -----
-                if col in num_cols and value != "":
-                    worksheet.write_number(
-                        row_idx,
-                        col_idx,
-                        value,
-                        fmt or (format_bold_rupiah if is_total else format_rupiah)
-                    )
-                else:
-                    worksheet.write(
-                        row_idx,
-                        col_idx,
-                        value,
-                        format_bold if is_total else None
-                    )
-
-        # ================= AUTOFIT =================
-        for i, col in enumerate(df.columns):
-            worksheet.set_column(
-                i, i,
-                max(len(str(col)), df[col].astype(str).map(len).max()) + 2
-            )
+def highlight_vendor_total(df):
+    return row_styles(df, is_total_label(df["YEAR"]), "font-weight: bold; background-color: #C6EFCE; color: #006100;")
 
-    output.seek(0)
-    return output.getvalue()
-
-# Download highlight total (kuning + hijau) -> df_merge
-@st.cache_data
-def get_excel_download_with_highlight(df, sheet_name="Sheet1"):
-    output = BytesIO()
-
-    with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
-        df.to_excel(writer, index=False, sheet_name=sheet_name)
-
-        workbook  = writer.book
-        worksheet = writer.sheets[sheet_name]
-
-        # ================= FORMAT =================
-        fmt_rupiah = workbook.add_format({"num_format": "#,##0"})
-
-        fmt_total_year = workbook.add_format({
-            "bold": True,
-            "bg_color": "#FFEB9C",   # kuning
-            "font_color": "#9C6500",
-            "num_format": "#,##0"
-        })
-
-        fmt_vendor_total = workbook.add_format({
-            "bold": True,
-            "bg_color": "#C6EFCE",   # hijau
-            "font_color": "#006100",
-            "num_format": "#,##0"
-        })
-
-        fmt_text_bold = workbook.add_format({"bold": True})
-
-        # ================= COLUMN GROUP =================
-        num_cols = df.select_dtypes(include=["number"]).columns.tolist()
-
-        # ================= REWRITE CELLS =================
-        for row_idx, row in enumerate(df.itertuples(index=False), start=1):
-
-            scope_val = str(row[2]).strip().upper()  # kolom Scope
-            year_val  = str(row[1]).strip().upper()  # kolom Year
-
-            # Tentukan format baris
-            row_fmt = None
-            if scope_val == "TOTAL" and year_val != "TOTAL":
-                row_fmt = fmt_total_year
-            elif year_val == "TOTAL":
-                row_fmt = fmt_vendor_total
-
-            for col_idx, col_name in enumerate(df.columns):
-                val = row[col_idx]
-
-                # ===== SAFETY =====
-                if pd.isna(val) or (isinstance(val, (int, float)) and np.isinf(val)):
-                    worksheet.write(row_idx, col_idx, "")
-                    continue
-
-                # ===== NUMERIC COLUMN =====
-                if col_name in num_cols:
-                    worksheet.write_number(
-                        row_idx,
-                        col_idx,
-                        val,
-                        row_fmt or fmt_rupiah
-                    )
-
-                # ===== TEXT COLUMN =====
-                else:
-                    worksheet.write(
-                        row_idx,
-                        col_idx,
-                        val,
-                        row_fmt if row_fmt else None
-                    )
-
-        # ================= AUTOFIT =================
-        for i, col in enumerate(df.columns):
-            max_len = max(
-                df[col].astype(str).map(len).max(),
-                len(str(col))
-            ) + 2
-            worksheet.set_column(i, i, max_len)
-
-    output.seek(0)
-    return output.getvalue()
-
-# Download highlight total ver2 (kuning + hijau) -> df_cost_summary
-@st.cache_data
-def get_excel_download_with_highlight_v2(df, sheet_name="Sheet1"):
-    output = BytesIO()
-
-    with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
-        df.to_excel(writer, index=False, sheet_name=sheet_name)
-
-        workbook  = writer.book
-        worksheet = writer.sheets[sheet_name]
-
-        # ================= FORMAT =================
-        fmt_rupiah = workbook.add_format({"num_format": "#,##0"})
-
-        fmt_total_year = workbook.add_format({
-            "bold": True,
-            "bg_color": "#FFEB9C",   # kuning
-            "font_color": "#9C6500",
-            "num_format": "#,##0"
-        })
-
-        fmt_vendor_total = workbook.add_format({
-            "bold": True,
-            "bg_color": "#C6EFCE",   # hijau
-            "font_color": "#006100",
-            "num_format": "#,##0"
-        })
-
-        # ================= COLUMN GROUP =================
-        num_cols = df.select_dtypes(include=["number"]).columns.tolist()
-
-        # Deteksi kolom dinamis
-        year_col = next((c for c in df.columns if "YEAR" in c.upper()), None)
-        scope_col = next((c for c in df.columns if "SCOPE" in c.upper()), None)
-
-        year_idx = df.columns.get_loc(year_col) if year_col else None
-        scope_idx = df.columns.get_loc(scope_col) if scope_col else None
-
-        # ================= REWRITE CELLS =================
-        for row_idx, row in enumerate(df.itertuples(index=False), start=1):
-
-            year_val = (
-                str(row[year_idx]).strip().upper()
-                if year_idx is not None else ""
-            )
-            scope_val = (
-                str(row[scope_idx]).strip().upper()
-                if scope_idx is not None else ""
-            )
 
-            # Tentukan format baris
-            row_fmt = None
-            if scope_val == "TOTAL" and year_val != "TOTAL":
-                row_fmt = fmt_total_year
-            elif year_val == "TOTAL":
-                row_fmt = fmt_vendor_total
-
-            for col_idx, col_name in enumerate(df.columns):
-                val = row[col_idx]
-
-                # ===== SAFETY =====
-                if pd.isna(val) or (isinstance(val, (int, float)) and np.isinf(val)):
-                    worksheet.write(row_idx, col_idx, "")
-                    continue
-
-                # ===== NUMERIC COLUMN =====
-                if col_name in num_cols:
-                    worksheet.write_number(
-                        row_idx,
-                        col_idx,
-                        val,
-                        row_fmt or fmt_rupiah
-                    )
-
-                # ===== TEXT COLUMN =====
-                else:
-                    worksheet.write(
-                        row_idx,
-                        col_idx,
-                        val,
-                        row_fmt
-                    )
-
-        # ================= AUTOFIT =================
-        for i, col in enumerate(df.columns):
-            max_len = max(
-                df[col].astype(str).map(len).max(),
-                len(str(col))
-            ) + 2
-            worksheet.set_column(i, i, max_len)
-
-    output.seek(0)
-    return output.getvalue()
-
-# Download Highlight Excel
-def get_excel_download_highlight_1st_2nd_lowest(df, sheet_name="Sheet1"):
-    output = BytesIO()
-
-    with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
-        df.to_excel(writer, index=False, sheet_name=sheet_name)
-        workbook  = writer.book
-        worksheet = writer.sheets[sheet_name]
-
-        # ========== FORMAT ==========
-        format_rupiah_xls = workbook.add_format({'num_format': '#,##0'})
-        fmt_pct_rupiah = workbook.add_format({'num_format': '#,##0.0"%"'})
-
-        format_first = workbook.add_format({
-            'bg_color': '#C6EFCE',
-            'num_format': '#,##0'
-        })
-
-        format_second = workbook.add_format({
-            'bg_color': '#FFEB9C',
-            'num_format': '#,##0'
-        })
-
-        # ========== COLUMN GROUP ==========
-        num_cols = df.select_dtypes(include=["number"]).columns
-        pct_cols = [c for c in df.columns if "%" in c]
-
-        # ========== LOOP DATA ==========
-        for row_idx, (_, row) in enumerate(df.iterrows(), start=1):
-            first_vendor  = row.get("1st Vendor")
-            second_vendor = row.get("2nd Vendor")
-
-            for col_idx, col in enumerate(df.columns):
-                value = row[col]
-
-                # NaN / inf safety
-                if pd.isna(value) or (isinstance(value, (int, float)) and np.isinf(value)):
-                    worksheet.write(row_idx, col_idx, "")
-                    continue
-
-                # ===== PICK FORMAT =====
-                fmt = None
-                if col == first_vendor:
-                    fmt = format_first
-                elif col == second_vendor:
-                    fmt = format_second
-
-                # ===== WRITE CELL =====
-                if col in pct_cols:
-                    worksheet.write_number(
-                        row_idx,
-                        col_idx,
-                        value,
-                        fmt or fmt_pct_rupiah
-                    )
-
-                elif col in num_cols:
-                    worksheet.write_number(
-                        row_idx,
-                        col_idx,
-                        value,
-                        fmt or format_rupiah_xls
-                    )
-
-                else:
-                    worksheet.write(row_idx, col_idx, value)
-
-        # ================= AUTOFIT =================
-        for i, col in enumerate(df.columns):
-            max_len = max(
-                df[col].astype(str).map(len).max(),
-                len(str(col))
-            ) + 2
-            worksheet.set_column(i, i, max_len)
-
-    output.seek(0)
-    return output.getvalue()
+# ================= PIPELINE =================
+# Tiap tahap di-memo per fingerprint input: rerun dengan data yang sama tidak
+# menghitung ulang cleaning, merge, cost summary, pivot TCO maupun analisis
+pipeline = Pipeline("tco_by_year_region")
+
+
+@pipeline.stage("clean", inputs=["raw"])
+def clean_sheets(raw):
+    # Cleaning per vendor + kolom TOTAL + pembulatan
+    result = {}
+
+    for name, df in raw.items():
+        # Data cleaning (blank rows/cols, header, dtypes)
+        df_clean = clean_dataframe(df, text_first_col=True)
+
+        # --- Tambah kolom total (kecuali Year) ---
+        if "TOTAL" not in df_clean.columns:
+            df_clean["TOTAL"] = df_clean.iloc[:, 1:].sum(axis=1, numeric_only=True)
+
+        # Pembulatan
+        num_cols = df_clean.select_dtypes(include=["number"]).columns
+        df_clean[num_cols] = df_clean[num_cols].apply(round_half_up)
+
+        result[name] = df_clean
+
+    return result
+
+
+@pipeline.stage("merge", inputs=["clean"])
+def merge_vendors(clean):
+    merged_list = []
+
+    for vendor_name, df_vendor in clean.items():
+        df_temp = df_vendor.copy()
+
+        # Identifikasi kolom
+        non_num_cols = df_temp.select_dtypes(exclude=["number"]).columns.tolist()
+        num_cols     = df_temp.select_dtypes(include=["number"]).columns.tolist()
+
+        # Ambil dua pertama untuk grouping utama (year & scope)
+        year_col  = non_num_cols[0]
+        scope_col = non_num_cols[1]
+
+        # Tambahkan kolom VENDOR
+        df_temp.insert(0, "VENDOR", vendor_name)
+
+        # Year diurutkan di dalam vendor (urutan vendor tetap)
+        merged_list.append(df_temp.sort_values(year_col, kind="stable"))
+
+    # --- Gabungkan semua vendor ---
+    df_merge = pd.concat(merged_list, ignore_index=True)
+
+    # --- Row TOTAL per year (di kolom scope) + TOTAL BESAR per vendor (di kolom year)
+    df_merge = add_group_totals(
+        df_merge, ["VENDOR", year_col],
+        label_col=scope_col,
+        sum_cols=num_cols,
+        grand_label_col=year_col,
+    )
+
+    # --- Urutkan kolom supaya rapi: VENDOR + non-num + num-col ---
+    final_cols = ["VENDOR"] + non_num_cols + num_cols
+    return df_merge[final_cols]
+
+
+@pipeline.stage("cost_summary", inputs=["merge"])
+def cost_summary(df_merge):
+    # --- Identifikasi kolom non-numeric dan numeric ---
+    non_num_cols = df_merge.select_dtypes(exclude=["number"]).columns.tolist()
+    numeric_cols = df_merge.select_dtypes(include=["number"]).columns.tolist()
+
+    vendor_col = non_num_cols[0]
+    year_col   = non_num_cols[1]
+    scope_col  = non_num_cols[2]
+
+    # --- Sisa non-number (dinamis) ---
+    other_non_num = [c for c in non_num_cols if c not in [vendor_col, year_col, scope_col]]
+
+    # --- Region columns = semua numeric kecuali kolom 'TOTAL' ---
+    region_cols = [c for c in numeric_cols if c.upper() != "TOTAL"]
+
+    # --- Transform to long format (Vendor, Year, Region, Scope, Price)
+    df_cost_summary = df_merge.melt(
+        id_vars=[vendor_col, year_col, scope_col] + other_non_num,
+        value_vars=region_cols,
+        var_name="REGION",
+        value_name="[PRICE]"
+    )
+
+    # --- Rapikan urutan kolom ---
+    final_cols = (
+        [vendor_col, year_col, "REGION", scope_col] 
+        + other_non_num 
+        + ["[PRICE]"]
+    )
+
+    return df_cost_summary[final_cols]
+
+
+def vendor_totals(df_cost_summary, index_col):
+    # Pivot harga per vendor pada ``index_col`` + baris TOTAL
+    year_col = df_cost_summary.columns[1]
+    scope_col = df_cost_summary.columns[3]
+
+    # --- Hapus baris TOTAL agar tidak double count ---
+    tco_clean = df_cost_summary[
+        (df_cost_summary[year_col].astype(str).str.upper() != "TOTAL") &
+        (df_cost_summary[scope_col].astype(str).str.upper() != "TOTAL")
+    ]
+
+    tco = tco_clean.pivot_table(
+        index=index_col,
+        columns="VENDOR",
+        values="[PRICE]",
+        aggfunc="sum",
+        fill_value=0
+    ).reset_index()
+
+    total_row = pd.DataFrame({
+        index_col: ["TOTAL"],
+        **{col: [tco[col].sum()] for col in tco.columns if col != index_col}
+    })
+    return mark_totals(pd.concat([tco, total_row], ignore_index=True), index_col)
+
+
+@pipeline.stage("tco_year", inputs=["cost_summary"])
+def tco_by_year(df_cost_summary):
+    return vendor_totals(df_cost_summary, df_cost_summary.columns[1])
+
+
+@pipeline.stage("tco_region", inputs=["cost_summary"])
+def tco_by_region(df_cost_summary):
+    return vendor_totals(df_cost_summary, "REGION")
+
+
+@pipeline.stage("tco_scope", inputs=["cost_summary"])
+def tco_by_scope(df_cost_summary):
+    return vendor_totals(df_cost_summary, df_cost_summary.columns[3])
+
+
+@pipeline.stage("analysis", inputs=["merge"])
+def bid_analysis(df_merge):
+    # ---- IDENTIFIKASI KOLUMN ----
+    non_num_cols = df_merge.select_dtypes(exclude=["number"]).columns.tolist()
+    numeric_cols  = df_merge.select_dtypes(include=["number"]).columns.tolist()
+
+    vendor_col = non_num_cols[0]          # contoh: VENDOR
+    year_col   = non_num_cols[1]          # contoh: YEAR
+    scope_col  = non_num_cols[2]          # contoh: SCOPE
+
+    # kolom non-num tambahan seperti DESC, UOM, Category, dsb
+    extra_non_num = non_num_cols[3:]      # boleh kosong
+
+    # --- Ubah dari format wide (Region1, Region2, dst) ke long ---
+    df_melted = df_merge.melt(
+        id_vars=[vendor_col, year_col, scope_col] + extra_non_num,
+        value_vars=[c for c in numeric_cols if c.upper() != "TOTAL"],
+        var_name="REGION",
+        value_name="[PRICE]"
+    )
+
+    df_melted["[PRICE]"] = pd.to_numeric(df_melted["[PRICE]"], errors="coerce").fillna(0)
+
+    # --- Pivot untuk jadi format kolom per vendor ---
+    df_pivot = df_melted.pivot_table(
+        index=[year_col, "REGION", scope_col] + extra_non_num,
+        columns=vendor_col,
+        values="[PRICE]",
+        aggfunc="sum",
+        fill_value=0
+    ).reset_index()
+
+    # Identifikasi kolom
+    vendor_cols = df_pivot.select_dtypes(include=["number"]).columns.tolist()
+
+    # Hapus baris TOTAL untuk analisis per komponen
+    df_no_total = drop_total_rows(df_pivot)
+
+    # 1st/2nd Lowest, Gap, Median & deviasi ke median (0 = tidak ikut tender)
+    df_no_total = add_bid_analysis(df_no_total, vendor_cols)
+
+    # --- Urutkan kolom agar rapi ---
+    summary_cols = (
+        [year_col, "REGION", scope_col] +
+        extra_non_num +
+        vendor_cols +
+        ["1st Lowest", "1st Vendor",
+        "2nd Lowest", "2nd Vendor",
+        "Gap 1 to 2 (%)", "Median Price"] +
+        [f"{v} to Median (%)" for v in vendor_cols]
+    )
+
+    return df_no_total[summary_cols]
+
+
+# ================= BATCH =================
+# Super Download (semua sheet, tanpa filter): dipakai tombol Download di page
+# dan oleh ``inspire.py run`` untuk banyak tender sekaligus
+SUPER_DOWNLOAD = SuperDownload(
+    "TCO Comparison by Year + Region.xlsx",
+    {
+        "Merge Data": "merge",
+        "Cost Summary": "cost_summary",
+        "TCO Summary (Year)": "tco_year",
+        "TCO Summary (Region)": "tco_region",
+        "TCO Summary (Scope)": "tco_scope",
+        "Bid & Price Analysis": "analysis",
+    },
+    plan_year_region_sheet,
+    {
+        "ranking_sheets": ["TCO Summary (Year)", "TCO Summary (Region)", "TCO Summary (Scope)"],
+        "bid_sheet": "Bid & Price Analysis",
+        "merge_sheet": "Merge Data",
+        "cost_sheet": "Cost Summary",
+    },
+)
+
+
+def read_tender(path):
+    # Satu workbook, satu sheet per vendor
+    return {"raw": read_workbook(path)}
+
+
+batch = Batch(pipeline, read_tender, [SUPER_DOWNLOAD])
+
 
 def page():
     # Header Title
@@ -549,18 +317,12 @@ def page():
     if upload_file is not None:
         st.session_state["uploaded_file_tco_by_year_region"] = upload_file
 
-        # --- Animasi proses upload ---
+        # --- Progress upload (dilaporkan langsung dari proses parse) ---
         msg = st.toast("📂 Uploading file...")
-        time.sleep(1.2)
-
-        msg.toast("🔍 Reading sheets...")
-        time.sleep(1.2)
-
-        msg.toast("✅ File uploaded successfully!")
-        time.sleep(0.5)
 
         # Baca semua sheet sekaligus
-        all_df = pd.read_excel(upload_file, sheet_name=None)
+        all_df = read_workbook(upload_file, on_sheet=sheet_progress(msg.toast))
+        msg.toast(upload_summary(all_df.values()))
         st.session_state["all_df_tco_by_year_region_raw"] = all_df  # simpan versi mentah
 
     elif "all_df_tco_by_year_region_raw" in st.session_state:
@@ -576,85 +338,9 @@ def page():
     total_sheets = len(all_df)
     # st.caption(f"You're analyzing offers from **{total_sheets} participating bidders** in this session 🧐")
 
-    result = {}
-
-    for name, df in all_df.items():
-        rows_before, cols_before = df.shape
-
-        # Data cleaning
-        df_clean = df.replace(r'^\s*$', np.nan, regex=True)
-        df_clean = df_clean.dropna(how="all", axis=0).dropna(how="all", axis=1)
-
-        # Header handling logic
-        cols = df_clean.columns.astype(str)
-
-        # Case 1: Semua kolom 'Unnamed'
-        if len(cols) > 0 and all(col.startswith("Unnamed") for col in cols):
-            # Gunakan baris pertama sebagai header
-            df_clean.columns = df_clean.iloc[0]
-            df_clean = df_clean[1:].reset_index(drop=True)
-
-        # Case 2: Hanya beberapa kolom yang 'Unnamed'
-        else:
-            df_clean = df_clean.loc[:, ~cols.str.startswith("Unnamed")]
-
-        rows_after, cols_after = df_clean.shape
-
-        # --- Pastikan kolom pertama (Year) tetap sebagai teks ---
-        first_col = df_clean.columns[0]  # Kolom Year
-        df_clean[first_col] = df_clean[first_col].astype(str)
-
-        # --- Konversi tipe data otomatis untuk kolom lainnya ---
-        df_clean.iloc[:, 1:] = df_clean.iloc[:, 1:].convert_dtypes()
-
-        # Bersihkan tipe numpy di kolom, index, dan isi
-        def safe_convert(x):
-            if isinstance(x, (np.generic, np.number)):
-                return x.item()
-            return x
-
-        df_clean = df_clean.map(safe_convert)
-        df_clean.columns = [safe_convert(c) for c in df_clean.columns]
-        df_clean.index = [safe_convert(i) for i in df_clean.index]
-
-        # Paksa semua header & index ke string agar JSON safe
-        df_clean.columns = df_clean.columns.map(str)
-        df_clean.index = df_clean.index.map(str)
-
-        # --- Tambah kolom total (kecuali Year) ---
-        if "TOTAL" not in df_clean.columns:
-            df_clean["TOTAL"] = df_clean.iloc[:, 1:].sum(axis=1, numeric_only=True)
-
-        # Pembulatan
-        num_cols = df_clean.select_dtypes(include=["number"]).columns
-        df_clean[num_cols] = df_clean[num_cols].apply(round_half_up)
-
-        # Format Rupiah
-        df_styled = df_clean.style.format({col: format_rupiah for col in num_cols})
-
-        # st.markdown(
-        #     f"""
-        #     <div style='display: flex; justify-content: space-between; 
-        #                 align-items: center; margin-bottom: 8px;'>
-        #         <span style='font-size:15px;'>✨ {name}</span>
-        #         <span style='font-size:12px; color:#808080;'>
-        #             Total rows: <b>{len(df_clean):,}</b>
-        #         </span>
-        #     </div>
-        #     """,
-        #     unsafe_allow_html=True
-        # )
-
-        result[name] = df_clean
-        # st.dataframe(df_styled, hide_index=True)
-
-        # # --- NOTIFIKASI KHUSUS ---
-        # if (rows_after < rows_before) or (cols_after < cols_before):
-        #     st.markdown(
-        #         "<p style='font-size:12px; color:#808080; margin-top:-15px; margin-bottom:0;'>"
-        #         "Preprocessing completed! Hidden rows and columns removed ✅</p>",
-        #         unsafe_allow_html=True
-        #     )
+    # Clean -> merge -> cost summary / pivot TCO / analysis, tiap tahap di-memo
+    run = pipeline.run(raw=all_df)
+    result = run["clean"]
 
     st.session_state["result_tco_by_year_region"] = result
     # st.divider()
@@ -662,94 +348,21 @@ def page():
     # MERGEE
     st.markdown("##### 🗃️ Merge Data")
 
-    merged_list = []
-
-    for vendor_name, df_vendor in result.items():
-        df_temp = df_vendor.copy()
-
-        # Identifikasi kolom
-        non_num_cols = df_temp.select_dtypes(exclude=["number"]).columns.tolist()
-        num_cols     = df_temp.select_dtypes(include=["number"]).columns.tolist()
-
-        # Ambil dua pertama untuk grouping utama (year & scope)
-        year_col  = non_num_cols[0]
-        scope_col = non_num_cols[1]
-
-        # Tambahkan kolom VENDOR
-        df_temp.insert(0, "VENDOR", vendor_name)
-
-        vendor_result = []
-
-        # --- Loop tiap YEAR (dynamic)
-        for year, group_year in df_temp.groupby(year_col, dropna=False):
-
-            # --- Row TOTAL per year
-            total_row = {
-                "VENDOR": vendor_name,
-                year_col: year,
-                scope_col: "TOTAL"
-            }
-
-            # Untuk kolom non-numeric lainnya (selain year & scope), isi kosong
-            for col in non_num_cols[2:]:
-                total_row[col] = ""
-
-            # Numeric sum
-            for col in num_cols:
-                total_row[col] = group_year[col].sum(numeric_only=True)
-
-            tco_year_with_total = pd.concat(
-                [group_year, pd.DataFrame([total_row])],
-                ignore_index=True
-            )
-
-            vendor_result.append(tco_year_with_total)
-
-        # --- Gabungkan semua year untuk vendor ini
-        df_vendor_with_year_total = pd.concat(vendor_result, ignore_index=True)
-
-        # --- TOTAL BESAR per vendor → hanya dari row TOTAL tiap year
-        total_rows = df_vendor_with_year_total[df_vendor_with_year_total[scope_col] == "TOTAL"]
-
-        vendor_total = {"VENDOR": vendor_name}
-
-        vendor_total[year_col] = "TOTAL"
-        vendor_total[scope_col] = ""
-
-        # Kosongkan semua non_num selain year & scope
-        for col in non_num_cols[2:]:
-            vendor_total[col] = ""
-
-        # Sum semua numeric
-        for col in num_cols:
-            vendor_total[col] = total_rows[col].sum(numeric_only=True)
-
-        # Gabungkan ke dataframe vendor
-        df_vendor_final = pd.concat(
-            [df_vendor_with_year_total, pd.DataFrame([vendor_total])],
-            ignore_index=True
-        )
-
-        merged_list.append(df_vendor_final)
-
-    # --- Gabungkan semua vendor ---
-    df_merge = pd.concat(merged_list, ignore_index=True)
-
-    # --- Urutkan kolom supaya rapi: VENDOR + non-num + num-col ---
-    final_cols = ["VENDOR"] + non_num_cols + num_cols
-    df_merge = df_merge[final_cols]
+    df_merge = run["merge"]
 
     # --- Styling (opsional) ---
     num_cols = df_merge.select_dtypes(include=["number"]).columns
-    df_merge_styled = (
-        df_merge.style
-        .format({col: format_rupiah for col in num_cols})
-        .apply(highlight_total_per_year, axis=1)
-        .apply(highlight_vendor_total, axis=1)
-    )
+    format_dict = rupiah_formats(df_merge, num_cols)
+    def style_merge(frame):
+        return (
+            frame.style
+            .format(format_dict)
+            .apply(highlight_total_per_year, axis=None)
+            .apply(highlight_vendor_total, axis=None)
+        )
 
     st.caption(f"Data from **{total_sheets} vendors** have been successfully consolidated, analyzing a total of **{len(df_merge):,} combined records**.")
-    st.dataframe(df_merge_styled, hide_index=True)
+    paged_dataframe(df_merge, style_merge, key="merge_tco_by_year_region", hide_index=True)
 
     # Download button to Excel
     excel_data = get_excel_download_with_highlight(df_merge)
@@ -768,36 +381,8 @@ def page():
     # COST SUMMARY
     st.markdown("##### 📑 Cost Summary")
 
-    # --- Identifikasi kolom non-numeric dan numeric ---
-    non_num_cols = df_merge.select_dtypes(exclude=["number"]).columns.tolist()
-    numeric_cols = df_merge.select_dtypes(include=["number"]).columns.tolist()
-
-    vendor_col = non_num_cols[0]
-    year_col   = non_num_cols[1]
-    scope_col  = non_num_cols[2]
-
-    # --- Sisa non-number (dinamis) ---
-    other_non_num = [c for c in non_num_cols if c not in [vendor_col, year_col, scope_col]]
-
-    # --- Region columns = semua numeric kecuali kolom 'TOTAL' ---
-    region_cols = [c for c in numeric_cols if c.upper() != "TOTAL"]
-
-    # --- Transform to long format (Vendor, Year, Region, Scope, Price)
-    df_cost_summary = df_merge.melt(
-        id_vars=[vendor_col, year_col, scope_col] + other_non_num,
-        value_vars=region_cols,
-        var_name="REGION",
-        value_name="[PRICE]"
-    )
-
-    # --- Rapikan urutan kolom ---
-    final_cols = (
-        [vendor_col, year_col, "REGION", scope_col] 
-        + other_non_num 
-        + ["[PRICE]"]
-    )
-
-    df_cost_summary = df_cost_summary[final_cols]
+    # Long format Vendor, Year, Region, Scope, Price (tahap cost_summary)
+    df_cost_summary = run["cost_summary"]
 
     # Simpan ke session_state jika perlu
     st.session_state["merged_long_format_total_price"] = df_cost_summary
@@ -805,9 +390,9 @@ def page():
     # Format Rupiah untuk kolom PRICE
     df_cost_summary_styled = (
         df_cost_summary.style
-        .format({"[PRICE]": format_rupiah})
-        .apply(highlight_total_per_year, axis=1)
-        .apply(highlight_vendor_total, axis=1)
+        .format(rupiah_formats(df_cost_summary, ["[PRICE]"]))
+        .apply(highlight_total_per_year, axis=None)
+        .apply(highlight_vendor_total, axis=None)
     )
 
     # Tampilkan
@@ -830,43 +415,19 @@ def page():
     st.markdown("##### 💸 TCO Summary")
     tab1, tab2, tab3 = st.tabs(["YEAR", "REGION", "SCOPE"])
 
-    vendor_col = "VENDOR"
-    year_col = df_cost_summary.columns[1]
-    region_col = "REGION"
-    scope_col = df_cost_summary.columns[3]
-    price_col = "[PRICE]"
-
     # Tab1: YEAR
-    # --- Hapus baris TOTAL agar tidak double count ---
-    tco_year_clean = df_cost_summary[
-        (df_cost_summary[year_col].astype(str).str.upper() != "TOTAL") &
-        (df_cost_summary[scope_col].astype(str).str.upper() != "TOTAL")
-    ]
-
-    tco_year = tco_year_clean.pivot_table(
-        index=year_col,
-        columns="VENDOR",
-        values="[PRICE]",
-        aggfunc="sum",
-        fill_value=0
-    ).reset_index()
-
-    total_row = pd.DataFrame({
-        year_col: ["TOTAL"], 
-        **{col: [tco_year[col].sum()] for col in tco_year.columns if col != year_col}
-    })
-    tco_year = pd.concat([tco_year, total_row], ignore_index=True)
+    tco_year = run["tco_year"]
 
     num_cols_year = tco_year.select_dtypes(include=["number"]).columns
 
     # Format rupiah, exclude kolom pertama (YEAR)
-    format_dict = {col: format_rupiah for col in tco_year.columns[1:]}  # skip kolom pertama
+    format_dict = rupiah_formats(tco_year, tco_year.columns[1:])  # skip kolom pertama
 
     tco_year_styled = (
         tco_year.style
         .format(format_dict)  # hanya format kolom numeric
-        .apply(highlight_total_row, axis=1)
-        .apply(lambda row: highlight_rank_summary(row, num_cols_year), axis=1)
+        .apply(highlight_total_row, axis=None)
+        .apply(rank_summary_styles, axis=None, num_cols=num_cols_year)
     )
 
     tab1.markdown(
@@ -901,36 +462,15 @@ def page():
             )
 
     # Tab2: REGION
-    # --- Hapus baris TOTAL agar tidak double count ---
-    tco_region_clean = df_cost_summary[
-        (df_cost_summary[year_col].astype(str).str.upper() != "TOTAL") &
-        (df_cost_summary[scope_col].astype(str).str.upper() != "TOTAL")
-    ]
-
-    # --- Buat pivot ---
-    tco_region = tco_region_clean.pivot_table(
-        index=region_col,
-        columns=vendor_col,
-        values="[PRICE]",
-        aggfunc="sum",
-        fill_value=0
-    ).reset_index()
-
-    # --- Tambahkan baris TOTAL ---
-    total_row = pd.DataFrame({
-        region_col: ["TOTAL"],
-        **{col: [tco_region[col].sum()] for col in tco_region.columns if col != region_col}
-    })
-
-    tco_region = pd.concat([tco_region, total_row], ignore_index=True)
+    tco_region = run["tco_region"]
 
     num_cols_region = tco_region.select_dtypes(include=["number"]).columns
 
     tco_region_styled = (
         tco_region.style
-        .format(format_rupiah)
-        .apply(highlight_total_row, axis=1)
-        .apply(lambda row: highlight_rank_summary(row, num_cols_region), axis=1)
+        .format(rupiah_formats(tco_region))
+        .apply(highlight_total_row, axis=None)
+        .apply(rank_summary_styles, axis=None, num_cols=num_cols_region)
     )
 
     tab2.markdown(
@@ -965,33 +505,15 @@ def page():
             )
 
     # Tab3: Scope
-    tco_scope_clean = df_cost_summary[
-        (df_cost_summary[year_col].astype(str).str.upper() != "TOTAL") &
-        (df_cost_summary[scope_col].astype(str).str.upper() != "TOTAL")
-    ]
-
-    tco_scope = tco_scope_clean.pivot_table(
-        index=scope_col,
-        columns=vendor_col,
-        values=price_col,
-        aggfunc="sum",
-        fill_value=0
-    ).reset_index()
-
-    total_row = pd.DataFrame({
-        scope_col: ["TOTAL"],
-        **{col: [tco_scope[col].sum()] for col in tco_scope.columns if col != scope_col}
-    })
-
-    tco_scope = pd.concat([tco_scope, total_row], ignore_index=True)
+    tco_scope = run["tco_scope"]
 
     num_cols_scope = tco_scope.select_dtypes(include=["number"]).columns
 
     tco_scope_styled = (
         tco_scope.style
-        .format(format_rupiah)
-        .apply(highlight_total_row, axis=1)
-        .apply(lambda row: highlight_rank_summary(row, num_cols_scope), axis=1)
+        .format(rupiah_formats(tco_scope))
+        .apply(highlight_total_row, axis=None)
+        .apply(rank_summary_styles, axis=None, num_cols=num_cols_scope)
     )
 
     tab3.markdown(
@@ -1030,208 +552,121 @@ def page():
     # --- ANALYTICAL COLUMNS ---
     st.markdown("##### 🧠 Bid & Price Analysis")
 
-    # ---- COPY ----
-    df_clean = df_merge.copy()
+    # Pivot Year/Region/Scope x vendor + 1st/2nd Lowest, Gap, Median (tahap analysis)
+    df_summary = run["analysis"]
 
-    # ---- IDENTIFIKASI KOLUMN ----
-    non_num_cols = df_clean.select_dtypes(exclude=["number"]).columns.tolist()
-    numeric_cols  = df_clean.select_dtypes(include=["number"]).columns.tolist()
+    # Kolom vendor = kolom yang punya deviasi ke median
+    vendor_cols = [c for c in df_summary.columns if f"{c} to Median (%)" in df_summary.columns]
 
-    vendor_col = non_num_cols[0]          # contoh: VENDOR
-    year_col   = non_num_cols[1]          # contoh: YEAR
-    scope_col  = non_num_cols[2]          # contoh: SCOPE
+    # Slicer + tabel + download sebagai fragment: ganti filter hanya menjalankan
+    # ulang bagian ini di atas df_summary dari run penuh terakhir
+    @st.fragment
+    def bid_analysis_section(df_summary):
+        # --- 🎯 Tambahkan slicer
+        all_year = sorted(df_summary["YEAR"].dropna().unique())
+        all_region = sorted(df_summary["REGION"].dropna().unique())
+        all_1st = sorted(df_summary["1st Vendor"].dropna().unique())
+        all_2nd = sorted(df_summary["2nd Vendor"].dropna().unique())
+
+        col_sel_1, col_sel_2, col_sel_3, col_sel_4 = st.columns(4)
+        with col_sel_1:
+            selected_year = st.multiselect(
+                "Filter: Year",
+                options=all_year,
+                default=None,
+                placeholder="Choose years",
+                key="filter_year"
+            )
+        with col_sel_2:
+            selected_region = st.multiselect(
+                "Filter: Region",
+                options=all_region,
+                default=None,
+                placeholder="Choose region",
+                key="filter_region"
+            )
+        with col_sel_3:
+            selected_1st = st.multiselect(
+                "Filter: 1st vendor",
+                options=all_1st,
+                default=None,
+                placeholder="Choose vendors",
+                key="filter_1st_vendor"
+            )
+        with col_sel_4:
+            selected_2nd = st.multiselect(
+                "Filter: 2nd vendor",
+                options=all_2nd,
+                default=None,
+                placeholder="Choose vendors",
+                key="filter_2nd_vendor"
+            )
 
-    # kolom non-num tambahan seperti DESC, UOM, Category, dsb
-    extra_non_num = non_num_cols[3:]      # boleh kosong
+        # --- Terapkan filter AND secara dinamis
+        df_filtered_analysis = df_summary.copy()
 
-    # --- Ubah dari format wide (Region1, Region2, dst) ke long ---
-    df_melted = df_clean.melt(
-        id_vars=[vendor_col, year_col, scope_col] + extra_non_num,
-        value_vars=[c for c in numeric_cols if c.upper() != "TOTAL"],
-        var_name="REGION",
-        value_name="[PRICE]"
-    )
+        if selected_year:
+            df_filtered_analysis = df_filtered_analysis[df_filtered_analysis["YEAR"].isin(selected_year)]
 
-    df_melted["[PRICE]"] = pd.to_numeric(df_melted["[PRICE]"], errors="coerce").fillna(0)
+        if selected_region:
+            df_filtered_analysis = df_filtered_analysis[df_filtered_analysis["REGION"].isin(selected_region)]
 
-    # --- Pivot untuk jadi format kolom per vendor ---
-    df_pivot = df_melted.pivot_table(
-        index=[year_col, "REGION", scope_col] + extra_non_num,
-        columns=vendor_col,
-        values="[PRICE]",
-        aggfunc="sum",
-        fill_value=0
-    ).reset_index()
+        if selected_1st:
+            df_filtered_analysis = df_filtered_analysis[df_filtered_analysis["1st Vendor"].isin(selected_1st)]
 
-    # Identifikasi kolom
-    vendor_cols = df_pivot.select_dtypes(include=["number"]).columns.tolist()
+        if selected_2nd:
+            df_filtered_analysis = df_filtered_analysis[df_filtered_analysis["2nd Vendor"].isin(selected_2nd)]
 
-    # Hapus baris TOTAL untuk analisis per komponen
-    df_no_total = df_pivot[
-        ~df_pivot.apply(
-            lambda row: row.astype(str).str.upper().eq("TOTAL").any(),
-            axis=1
-        )
-    ].copy()
-
-    # Penanganan untuk 0 value
-    vendor_values = df_no_total[vendor_cols].copy()
-    vendor_values = vendor_values.replace(0, pd.NA)
-    vendor_values = vendor_values.apply(pd.to_numeric, errors="coerce")
-
-    # Hitung nilai analisis per baris
-    df_no_total["1st Lowest"] = vendor_values.min(axis=1)
-    # df_no_total["1st Vendor"] = vendor_values.idxmin(axis=1)
-
-    # Penanganan khusus 1st Vendor
-    mask_all_nan1 = vendor_values.isna().all(axis=1)
-    df_no_total["1st Vendor"] = None
-    valid_idx1 = (~mask_all_nan1)
-    df_no_total.loc[valid_idx1, "1st Vendor"] = vendor_values.loc[valid_idx1].idxmin(axis=1) 
-
-    # Hitung 2nd Lowest
-    # Hilangkan dulu nilai 1st Lowest dari kandidat (agar kita dapat 2nd Lowest yang benar)
-    temp = vendor_values.mask(vendor_values.eq(df_no_total["1st Lowest"], axis=0))
-
-    df_no_total["2nd Lowest"] = temp.min(axis=1)
-    # df_no_total["2nd Vendor"] = temp.idxmin(axis=1)
-
-    # Penanganan khusus 2nd Vendor
-    mask_all_nan2 = temp.isna().all(axis=1)
-    df_no_total["2nd Vendor"] = None
-    valid_idx2 = (~mask_all_nan2)
-    df_no_total.loc[valid_idx2, "2nd Vendor"] = temp.loc[valid_idx2].idxmin(axis=1)
-
-    # Hitung Gap 1 to 2 (%)
-    df_no_total["Gap 1 to 2 (%)"] = (
-        (df_no_total["2nd Lowest"] - df_no_total["1st Lowest"])
-        / df_no_total["1st Lowest"] * 100
-    ).round(2)
-
-    # Hitung median price
-    df_no_total["Median Price"] = vendor_values.median(axis=1)
-    df_no_total["Median Price"] = pd.to_numeric(df_no_total["Median Price"], errors="coerce")
-
-    # Hitung deviasi tiap vendor terhadap median
-    for v in vendor_cols:
-        df_no_total[f"{v} to Median (%)"] = (
-            (df_no_total[v] - df_no_total["Median Price"])
-            / df_no_total["Median Price"] * 100
-        ).round(2)
+        # --- Format rupiah & persentase hanya untuk df_filtered_analysis
+        num_cols = df_filtered_analysis.select_dtypes(include=["number"]).columns
+        format_dict = rupiah_formats(df_filtered_analysis, num_cols)
+        format_dict.update({"Gap 1 to 2 (%)": "{:.1f}%"})
+        for v in vendor_cols:
+            format_dict[f"{v} to Median (%)"] = "{:+.1f}%"
 
-    # --- Urutkan kolom agar rapi ---
-    summary_cols = (
-        [year_col, "REGION", scope_col] +
-        extra_non_num +
-        vendor_cols +
-        ["1st Lowest", "1st Vendor",
-        "2nd Lowest", "2nd Vendor",
-        "Gap 1 to 2 (%)", "Median Price"] +
-        [f"{v} to Median (%)" for v in vendor_cols]
-    )
+        def style_summary(frame):
+            return (
+                frame.style
+                .format(format_dict)
+                .apply(vendor_rank_styles, axis=None, columns=df_filtered_analysis.columns)
+            )
 
-    df_summary = df_no_total[summary_cols]
-
-    # --- 🎯 Tambahkan slicer
-    all_year = sorted(df_summary["YEAR"].dropna().unique())
-    all_region = sorted(df_summary["REGION"].dropna().unique())
-    all_1st = sorted(df_summary["1st Vendor"].dropna().unique())
-    all_2nd = sorted(df_summary["2nd Vendor"].dropna().unique())
-
-    col_sel_1, col_sel_2, col_sel_3, col_sel_4 = st.columns(4)
-    with col_sel_1:
-        selected_year = st.multiselect(
-            "Filter: Year",
-            options=all_year,
-            default=None,
-            placeholder="Choose years",
-            key="filter_year"
-        )
-    with col_sel_2:
-        selected_region = st.multiselect(
-            "Filter: Region",
-            options=all_region,
-            default=None,
-            placeholder="Choose region",
-            key="filter_region"
-        )
-    with col_sel_3:
-        selected_1st = st.multiselect(
-            "Filter: 1st vendor",
-            options=all_1st,
-            default=None,
-            placeholder="Choose vendors",
-            key="filter_1st_vendor"
-        )
-    with col_sel_4:
-        selected_2nd = st.multiselect(
-            "Filter: 2nd vendor",
-            options=all_2nd,
-            default=None,
-            placeholder="Choose vendors",
-            key="filter_2nd_vendor"
+        st.markdown(
+            f"""
+            <div style="display:flex; justify-content:space-between; align-items:center; margin-bottom:15px;">
+                <div style="font-size:0.88rem; color:gray;">
+                    ✨ Total number of data entries: <b>{len(df_filtered_analysis)}</b>
+                </div>
+                <div style="text-align:right;">
+                    <span style="background:#C6EFCE; padding:2px 8px; border-radius:6px; font-weight:600; font-size: 0.75rem; color: black">1st Lowest</span>
+                    &nbsp;
+                    <span style="background:#FFEB9C; padding:2px 8px; border-radius:6px; font-weight:600; font-size: 0.75rem; color: black">2nd Lowest</span>
+                </div>
+            </div>
+            """,
+            unsafe_allow_html=True
         )
 
-    # --- Terapkan filter AND secara dinamis
-    df_filtered_analysis = df_summary.copy()
-
-    if selected_year:
-        df_filtered_analysis = df_filtered_analysis[df_filtered_analysis["YEAR"].isin(selected_year)]
+        # --- Tampilkan hasil ---
+        paged_dataframe(df_filtered_analysis, style_summary, key="analysis_tco_by_year_region", hide_index=True)
 
-    if selected_region:
-        df_filtered_analysis = df_filtered_analysis[df_filtered_analysis["REGION"].isin(selected_region)]
+        # Simpan hasil ke variabel
+        excel_data = get_excel_download_highlight_1st_2nd_lowest(df_filtered_analysis)
 
-    if selected_1st:
-        df_filtered_analysis = df_filtered_analysis[df_filtered_analysis["1st Vendor"].isin(selected_1st)]
-
-    if selected_2nd:
-        df_filtered_analysis = df_filtered_analysis[df_filtered_analysis["2nd Vendor"].isin(selected_2nd)]
-
-    # --- Format rupiah & persentase hanya untuk df_filtered_analysis
-    num_cols = df_filtered_analysis.select_dtypes(include=["number"]).columns
-    format_dict = {col: format_rupiah for col in num_cols}
-    format_dict.update({"Gap 1 to 2 (%)": "{:.1f}%"})
-    for v in vendor_cols:
-        format_dict[f"{v} to Median (%)"] = "{:+.1f}%"
-
-    df_summary_styled = (
-        df_filtered_analysis.style
-        .format(format_dict)
-        .apply(lambda row: highlight_1st_2nd_vendor(row, df_filtered_analysis.columns), axis=1)
-    )
-
-    st.markdown(
-        f"""
-        <div style="display:flex; justify-content:space-between; align-items:center; margin-bottom:15px;">
-            <div style="font-size:0.88rem; color:gray;">
-                ✨ Total number of data entries: <b>{len(df_filtered_analysis)}</b>
-            </div>
-            <div style="text-align:right;">
-                <span style="background:#C6EFCE; padding:2px 8px; border-radius:6px; font-weight:600; font-size: 0.75rem; color: black">1st Lowest</span>
-                &nbsp;
-                <span style="background:#FFEB9C; padding:2px 8px; border-radius:6px; font-weight:600; font-size: 0.75rem; color: black">2nd Lowest</span>
-            </div>
-        </div>
-        """,
-        unsafe_allow_html=True
-    )
-
-    # --- Tampilkan hasil ---
-    st.dataframe(df_summary_styled, hide_index=True)
+        # Layout tombol (rata kanan)
+        col1, col2, col3 = st.columns([2.3,2,1])
+        with col3:
+            st.download_button(
+                label="Download",
+                data=excel_data,
+                file_name="Bid & Price Analysis - TCO by Year Region.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                icon=":material/download:"
+            )
 
-    # Simpan hasil ke variabel
-    excel_data = get_excel_download_highlight_1st_2nd_lowest(df_filtered_analysis)
+        return publish_frame("tco_by_year_region", "Bid & Price Analysis", df_filtered_analysis)
 
-    # Layout tombol (rata kanan)
-    col1, col2, col3 = st.columns([2.3,2,1])
-    with col3:
-        st.download_button(
-            label="Download",
-            data=excel_data,
-            file_name="Bid & Price Analysis - TCO by Year Region.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            icon=":material/download:"
-        )
+    df_filtered_analysis = bid_analysis_section(df_summary)
 
     # VISUALIZATION
     st.markdown("##### 📊 Visualization")
@@ -1410,7 +845,7 @@ def page():
             ''')
 
             num_cols = df_summary_chart.select_dtypes(include=["number"]).columns
-            format_dict = {col: format_rupiah for col in num_cols}
+            format_dict = rupiah_formats(df_summary_chart, num_cols)
             format_dict.update({
                 "1st Win Rate (%)": "{:.1f}%",
                 "2nd Win Rate (%)": "{:.1f}%"
@@ -1549,14 +984,16 @@ def page():
 
     # SUPERRR BUTTONN
     st.markdown("##### 🧑‍💻 Super Download — Export Selected Sheets")
-    dataframes = {
+    # Dict bersama di session_state: fragment filter mengganti sheet-nya, dan
+    # tombol Download membaca dict ini saat diklik
+    dataframes = export_frames("tco_by_year_region", {
         "Merge Data": df_merge,
         "Cost Summary": df_cost_summary,
         "TCO Summary (Year)": tco_year,
         "TCO Summary (Region)": tco_region,
         "TCO Summary (Scope)": tco_scope,
         "Bid & Price Analysis": df_filtered_analysis,
-    }
+    })
 
     # Tampilkan multiselect
     selected_sheets = st.multiselect(
@@ -1567,133 +1004,8 @@ def page():
 
     # Fungsi "Super Button" & Formatting
     def generate_multi_sheet_excel(selected_sheets, df_dict):
-        output = BytesIO()
-
-        with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
-            for sheet in selected_sheets:
-                df = df_dict[sheet]
-                df.to_excel(writer, index=False, sheet_name=sheet)
-
-                workbook  = writer.book
-                worksheet = writer.sheets[sheet]
-
-                # ================= FORMAT =================
-                fmt_rp   = workbook.add_format({'num_format': '#,##0'})
-                fmt_pct  = workbook.add_format({'num_format': '#,##0.0"%"'})
-                fmt_bold = workbook.add_format({'bold': True, 'num_format': '#,##0'})
-
-                # Merge / Cost Summary
-                fmt_total_year = workbook.add_format({
-                    'bold': True, 'bg_color': '#FFEB9C', 'font_color': '#9C6500', 'num_format': '#,##0'
-                })
-                fmt_total_vendor = workbook.add_format({
-                    'bold': True, 'bg_color': '#C6EFCE', 'font_color': '#006100', 'num_format': '#,##0'
-                })
-
-                # Ranking
-                fmt_1  = workbook.add_format({'bg_color': '#C6EFCE', 'num_format': '#,##0'})
-                fmt_2  = workbook.add_format({'bg_color': '#FFEB9C', 'num_format': '#,##0'})
-                fmt_1b = workbook.add_format({'bg_color': '#C6EFCE', 'bold': True, 'num_format': '#,##0'})
-                fmt_2b = workbook.add_format({'bg_color': '#FFEB9C', 'bold': True, 'num_format': '#,##0'})
-
-                num_cols = df.select_dtypes(include=["number"]).columns.tolist()
-                pct_cols = [c for c in df.columns if "%" in c]
-
-                # Cost Summary dynamic column
-                year_col  = next((c for c in df.columns if "YEAR" in c.upper()), None)
-                scope_col = next((c for c in df.columns if "SCOPE" in c.upper()), None)
-                year_idx  = df.columns.get_loc(year_col) if year_col else None
-                scope_idx = df.columns.get_loc(scope_col) if scope_col else None
-
-                # ================= LOOP ROW =================
-                for r, (_, row) in enumerate(df.iterrows(), start=1):
-
-                    is_total = any(str(x).strip().upper() == "TOTAL" for x in row)
-                    row_fmt = None
-                    first = second = None
-
-                    # ---------- MERGE DATA ----------
-                    if sheet == "Merge Data":
-                        year_val  = str(row.iloc[1]).strip().upper()
-                        scope_val = str(row.iloc[2]).strip().upper()
-
-                        if scope_val == "TOTAL" and year_val != "TOTAL":
-                            row_fmt = fmt_total_year
-                        elif year_val == "TOTAL":
-                            row_fmt = fmt_total_vendor
-
-                    # ---------- COST SUMMARY ----------
-                    elif sheet == "Cost Summary":
-                        year_val  = str(row.iloc[year_idx]).strip().upper() if year_idx is not None else ""
-                        scope_val = str(row.iloc[scope_idx]).strip().upper() if scope_idx is not None else ""
-
-                        if scope_val == "TOTAL" and year_val != "TOTAL":
-                            row_fmt = fmt_total_year
-                        elif year_val == "TOTAL":
-                            row_fmt = fmt_total_vendor
-
-                    # ---------- TCO SUMMARY ----------
-                    elif sheet in ["TCO Summary (Year)", "TCO Summary (Region)", "TCO Summary (Scope)"]:
-                        numeric_vals = row[num_cols]
-                        numeric_vals = numeric_vals[(numeric_vals.notna()) & (numeric_vals != 0)]
-
-                        if not numeric_vals.empty:
-                            sorted_vals = numeric_vals.sort_values()
-                            first = sorted_vals.index[0]
-                            if len(sorted_vals) > 1:
-                                second = sorted_vals.index[1]
-
-                    # ---------- BID & PRICE ----------
-                    elif sheet == "Bid & Price Analysis":
-                        first = row.get("1st Vendor")
-                        second = row.get("2nd Vendor")
-
-                    # ================= WRITE CELL =================
-                    for c, col in enumerate(df.columns):
-                        val = row[col]
-
-                        if pd.isna(val) or (isinstance(val, (int, float)) and np.isinf(val)):
-                            worksheet.write(r, c, "")
-                            continue
-
-                        fmt = None
-                        is_zero = isinstance(val, (int, float)) and val == 0
-
-                        # --- ranking highlight ---
-                        if sheet in ["TCO Summary (Year)", "TCO Summary (Region)", "TCO Summary (Scope)"] and not is_zero:
-                            if col == first:
-                                fmt = fmt_1b if is_total else fmt_1
-                            elif col == second:
-                                fmt = fmt_2b if is_total else fmt_2
-
-                        # --- Bid & Price ---
-                        elif sheet == "Bid & Price Analysis":
-                            if col == first:
-                                fmt = fmt_1
-                            elif col == second:
-                                fmt = fmt_2
-
-                        # --- TOTAL text ---
-                        if is_total and fmt is None and row_fmt is None:
-                            fmt = fmt_bold
-
-                        # --- WRITE ---
-                        if col in pct_cols:
-                            worksheet.write_number(r, c, val, fmt or fmt_pct)
-                        elif col in num_cols:
-                            worksheet.write_number(r, c, val, fmt or (row_fmt or fmt_rp))
-                        else:
-                            worksheet.write(r, c, val, row_fmt or fmt)
-
-                # ================= AUTOFIT =================
-                for i, col in enumerate(df.columns):
-                    worksheet.set_column(
-                        i, i,
-                        max(len(str(col)), df[col].astype(str).map(len).max()) + 2
-                    )
-
-        output.seek(0)
-        return output.getvalue()
+        # Tiap sheet di-plan paralel di thread pool, lalu ditulis ke satu workbook
+        return build_super_download(SUPER_DOWNLOAD, df_dict, selected_sheets)
 
     # --- FRAGMENT UNTUK BALLOONS ---
     @st.fragment
@@ -1702,14 +1014,17 @@ def page():
 
     # ---- DOWNLOAD BUTTON ----
     if selected_sheets:
-        excel_bytes = generate_multi_sheet_excel(selected_sheets, dataframes)
+        excel_bytes = deferred(generate_multi_sheet_excel, selected_sheets, dataframes)
 
         st.download_button(
             label="Download",
             data=excel_bytes,
-            file_name="TCO Comparison by Year + Region.xlsx",
+            file_name=SUPER_DOWNLOAD.file_name,
             mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
             on_click=release_the_balloons,
             type="primary",
             use_container_width=True,
         )
+
+    # Tahap yang dihitung ulang vs diambil dari cache (INSPIRE_SHOW_STAGES=1)
+    stage_report(run, "tco_by_year_region")
@@ -1,44 +1,19 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
 import altair as alt
-import time
-from io import BytesIO
-
-def round_half_up(series):
-    return np.floor(series * 100 + 0.5) / 100
-
-def format_rupiah(x):
-    if pd.isna(x):
-        return ""
-    # pastikan bisa diubah ke float
-    try:
-        x = float(x)
-    except:
-        return x  # biarin apa adanya kalau bukan angka
-
-    # kalau tidak punya desimal (misal 7000.0), tampilkan tanpa ,00
-    if x.is_integer():
-        formatted = f"{int(x):,}".replace(",", ".")
-    else:
-        formatted = f"{x:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-        # hapus ,00 kalau desimalnya 0 semua (misal 7000,00 → 7000)
-        if formatted.endswith(",00"):
-            formatted = formatted[:-3]
-    return formatted
-
-# Header detection function
-# Logic:
-# 1) Jika satu baris == semua string
-# 2) AND >= x% column adalah non-numerik
-# 3) AND row berada setelah GAP -> anggap sebagai header baru
-def is_header_row(row):
-    str_ratio = row.apply(lambda x: isinstance(x, str)).mean()
-    non_numeric = row.apply(
-        lambda x: not pd.to_numeric(str(x), errors="coerce") == x
-    ).mean()
-
-    return str_ratio > 0.8 and non_numeric > 0.8
+
+from inspire_core import (
+    read_workbook,
+    sheet_progress,
+    upload_summary,
+    round_half_up,
+    rupiah_formats,
+    normalize_dtypes,
+    split_tables,
+    find_header_row,
+    deferred,
+    get_excel_download_tables,
+)
+
 
 def page():
     # Header Title
@@ -71,18 +46,12 @@ def page():
     if upload_file is not None:
         st.session_state["uploaded_file_table_extraction"] = upload_file
 
-        # --- Animasi proses upload ---
+        # --- Progress upload (dilaporkan langsung dari proses parse) ---
         msg = st.toast("📂 Uploading file...")
-        time.sleep(1.2)
-
-        msg.toast("🔍 Reading sheets...")
-        time.sleep(1.2)
-
-        msg.toast("✅ File uploaded successfully!")
-        time.sleep(0.5)
 
         # Baca semua sheet sekaligus
-        all_df = pd.read_excel(upload_file, sheet_name=None)
+        all_df = read_workbook(upload_file, on_sheet=sheet_progress(msg.toast))
+        msg.toast(upload_summary(all_df.values()))
         st.session_state["all_df_table_extraction_raw"] = all_df  # simpan versi mentah
 
     elif "all_df_table_extraction_raw" in st.session_state:
@@ -99,95 +68,40 @@ def page():
 
     for tab, (sheet_name, df_raw) in zip(sheet_tabs, all_df.items()):
         with tab:
-            df = df_raw.copy()
-
-            # Logic 1: Split berdasarkan ROW kosong
-            tables = []
-            current_table = []
-
-            # Split berdasarkan row kosong
-            for idx, row in df.iterrows():
-                if row.isna().all():
-                    if current_table:
-                        tables.append(pd.DataFrame(current_table))
-                        current_table = []
-                else:
-                    current_table.append(row)
-
-            if current_table:
-                tables.append(pd.DataFrame(current_table))
-
-            # Logic 2: Horizontal split berdasarkan NaN col
-            final_tables = []
-
-            for t in tables:
-                # Cari kolom tidak kosong
-                non_empty_cols = [c for c in t.columns if not t[c].isna().all()]
-                if not non_empty_cols:
-                    continue
-
-                blocks = []
-                current_block = [non_empty_cols[0]]
-
-                # Horizontal block detection
-                for col in non_empty_cols[1:]:
-                    prev = t.columns.get_loc(current_block[-1])
-                    curr = t.columns.get_loc(col)
-
-                    if curr == prev + 1:
-                        current_block.append(col)
-                    else:
-                        blocks.append(current_block)
-                        current_block = [col]
-
-                blocks.append(current_block)
-
-                # Extract per-block
-                for block_cols in blocks:
-                    df_block = t[block_cols].copy()
-                    final_tables.append(df_block)
-
-            # Logic 3: Cleaning NaN row -> already clean the NaN col on the 2nd step
+            # Logic 1-3: split per ROW kosong, lalu per COL kosong, buang row kosong per block
+            final_tables = split_tables(df_raw)
+
             clean_tables = []
 
             for i, t in enumerate(final_tables, start=1):
                 df_clean = t.copy()
-                df_clean = df_clean.dropna(axis=0, how='all')
 
                 # Header detection
-                if not df_clean.empty and is_header_row(df_clean.iloc[0]):
-                    df_clean.columns = df_clean.iloc[0].astype(str)
-                    df_clean = df_clean.iloc[1:].reset_index(drop=True)
+                # Logic (dicek sekaligus untuk beberapa baris teratas block):
+                # 1) > 80% cell di baris adalah string
+                # 2) AND > 80% cell non-numerik
+                # -> kandidat hanya sampai baris data pertama; skor tertinggi jadi header,
+                #    baris di atasnya (kosong / judul) dibuang
+                header_idx = find_header_row(df_clean)
+
+                if header_idx is not None:
+                    df_clean.columns = df_clean.iloc[header_idx].astype(str)
+                    df_clean = df_clean.iloc[header_idx + 1:].reset_index(drop=True)
 
                 # Fallback: jika kolom masih Unnamed
                 elif any("Unnamed" in str(c) for c in df_clean.columns):
                     df_clean.columns = df_clean.iloc[0].astype(str)
                     df_clean = df_clean.iloc[1:].reset_index(drop=True)
 
-                # Konversi tipe data otomatis ke pandas dtypes yang lebih fleksibel
-                df_clean = df_clean.convert_dtypes()
-
-                # Bersihkan tipe numpy di kolom, index, dan isi
-                def safe_convert(x):
-                    if isinstance(x, (np.generic, np.number)):
-                        return x.item()
-                    return x
-
-                # Terapkan ke seluruh dataframe
-                df_clean = df_clean.map(safe_convert)
-                df_clean.columns = [safe_convert(c) for c in df_clean.columns]
-                df_clean.index = [safe_convert(i) for i in df_clean.index]
-
-                # Paksa semua header & index ke string agar JSON safe untuk Streamlit
-                df_clean.columns = df_clean.columns.map(str)
-                df_clean.index = df_clean.index.map(str)
+                # Konversi tipe data + header & index string agar JSON safe untuk Streamlit
+                df_clean = normalize_dtypes(df_clean)
 
                 # Pembulatan
                 num_cols = df_clean.select_dtypes(include=["number"]).columns
                 df_clean[num_cols] = df_clean[num_cols].apply(round_half_up)
 
                 # Format Rupiah
-                df_clean_styled = df_clean.style.format({col: format_rupiah for col in num_cols})
+                df_clean_styled = df_clean.style.format(rupiah_formats(df_clean, num_cols))
 
                 st.markdown(
                     f"""
@@ -214,39 +128,20 @@ def page():
     st.markdown("##### 🧑‍💻 Super Download — Export Selected Sheets")
 
     # Fungsi untuk convert list of DataFrame per sheet ke Excel
+    # (satu tab per tabel, ditulis lewat export bersama: constant_memory + spool)
     def to_excel(dfs_dict):
-        output = BytesIO()
-
-        with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
-            workbook = writer.book
-            fmt_rp = workbook.add_format({'num_format': '#,##0'})
-
-            for sheet_name, dfs in dfs_dict.items():
-                for idx, df in enumerate(dfs, start=1):
-                    df = df.copy()
-
-                    num_cols = df.select_dtypes(include=["number"]).columns.tolist()
-                    for col in num_cols:
-                        df[col] = round_half_up(df[col])
-
-                    sheet_tab_name = f"{sheet_name}_Table{idx}"
-                    df.to_excel(writer, index=False, sheet_name=sheet_tab_name)
-                    worksheet = writer.sheets[sheet_tab_name]
-
-                    # ===== AUTOFIT + FORMAT (SATU LOOP) =====
-                    for i, col in enumerate(df.columns):
-                        max_len = max(
-                            len(str(col)),
-                            df[col].astype(str).map(len).max()
-                        ) + 2
-
-                        if col in num_cols:
-                            worksheet.set_column(i, i, max_len, fmt_rp)
-                        else:
-                            worksheet.set_column(i, i, max_len)
-
-        output.seek(0)
-        return output.getvalue()
+        tables = {}
+        for sheet_name, dfs in dfs_dict.items():
+            for idx, df in enumerate(dfs, start=1):
+                df = df.copy()
+
+                num_cols = df.select_dtypes(include=["number"]).columns.tolist()
+                for col in num_cols:
+                    df[col] = round_half_up(df[col])
+
+                tables[f"{sheet_name}_Table{idx}"] = df
+
+        return get_excel_download_tables(tables)
     
     # Buat multiselect untuk user pilih sheet
     selected_sheets = st.multiselect(
@@ -265,8 +160,8 @@ def page():
         # Filter dict sesuai pilihan user
         dfs_to_export = {k: v for k, v in all_sheets_tables.items() if k in selected_sheets}
         
-        # Generate Excel
-        excel_data = to_excel(dfs_to_export)
+        # Excel dibuat saat tombol Download diklik
+        excel_data = deferred(to_excel, dfs_to_export)
 
         # Tombol download
         st.download_button(
@@ -2,374 +2,354 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import altair as alt
-import time
 import math
 import os
-import re
-from io import BytesIO
-
-def round_half_up_num(series):
-    return np.floor(series * 100 + 0.5) / 100
-
-def format_rupiah(x):
-    if pd.isna(x):
-        return ""
-    # pastikan bisa diubah ke float
-    try:
-        x = float(x)
-    except:
-        return x  # biarin apa adanya kalau bukan angka
-
-    # kalau tidak punya desimal (misal 7000.0), tampilkan tanpa ,00
-    if x.is_integer():
-        formatted = f"{int(x):,}".replace(",", ".")
-    else:
-        formatted = f"{x:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-        # hapus ,00 kalau desimalnya 0 semua (misal 7000,00 → 7000)
-        if formatted.endswith(",00"):
-            formatted = formatted[:-3]
-    return formatted
-
-def highlight_total_row(row):
-    # Cek apakah ada kolom yang berisi "TOTAL" (case-insensitive)
-    if any(str(x).strip().upper() == "TOTAL" for x in row):
-        return ["font-weight: bold;"] * len(row)
-    else:
-        return [""] * len(row)
-    
-def highlight_total_row_v2(row):
-    if any(str(x).strip().upper() == "TOTAL" for x in row):
-        return ["font-weight: bold; background-color: #D9EAD3; color: #1A5E20;"] * len(row)
-    else:
-        return [""] * len(row)
-    
-def highlight_1st_2nd_vendor(row, columns):
-    styles = [""] * len(columns)
-    first_vendor = row.get("1st Vendor")
-    second_vendor = row.get("2nd Vendor")
-
-    for i, col in enumerate(columns):
-        if col == first_vendor:
-            styles[i] = "background-color: #C6EFCE; color: #006100;"
-        elif col == second_vendor:
-            styles[i] = "background-color: #FFEB9C; color: #9C6500;"
-    return styles
-
-# Download button to Excel
-@st.cache_data
-def get_excel_download(df, sheet_name="Sheet1"):
-    output = BytesIO()
-
-    with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
-        df.to_excel(writer, index=False, sheet_name=sheet_name)
-
-        workbook  = writer.book
-        worksheet = writer.sheets[sheet_name]
-
-        # ================= FORMAT =================
-        fmt_rupiah = workbook.add_format({"num_format": "#,##0"})
-        fmt_pct = workbook.add_format({"num_format": '#,##0.0"%"'})
-
-        # ================= COLUMN GROUP =================
-        num_cols = df.select_dtypes(include=["number"]).columns.tolist()
-        pct_cols = [c for c in df.columns if "%" in c]
-
-        # ================= REWRITE CELLS =================
-        for row_idx, row in enumerate(df.itertuples(index=False), start=1):
-            for col_idx, col_name in enumerate(df.columns):
-                val = row[col_idx]
-
-                # Safety NaN / inf
-                if pd.isna(val) or (isinstance(val, (int, float)) and np.isinf(val)):
-                    worksheet.write(row_idx, col_idx, "")
-                    continue
-
-                # ===== PERCENT COLUMN =====
-                if col_name in pct_cols:
-                    worksheet.write_number(
-                        row_idx,
-                        col_idx,
-                        val,
-                        fmt_pct
-                    )
 
-                # ===== NUMERIC COLUMN =====
-                elif col_name in num_cols:
-                    worksheet.write_number(
-                        row_idx,
-                        col_idx,
-                        val,
-                        fmt_rupiah
-                    )
+from inspire_core import (
+    read_workbooks,
+    RoundStore,
+    sheet_progress,
+    clean_progress,
+    upload_summary,
+    round_half_up,
+    rupiah_formats,
+    total_row_styles_v2,
+    vendor_rank_styles,
+    clean_dataframe,
+    extract_round_number,
+    add_bid_analysis,
+    add_group_totals,
+    mark_totals,
+    drop_total_rows,
+    add_price_movement,
+    deferred,
+    lazy_export,
+    plan_round_sheet,
+    Pipeline,
+    Batch,
+    SuperDownload,
+    build_super_download,
+)
+from inspire_core import export
+from inspire_ui import (
+    paged_dataframe,
+    publish_frame,
+    export_frames,
+    stage_report,
+)
+
+# Excel dibuat saat tombol Download diklik, hasilnya di-cache per isi dataframe
+get_excel_download = lazy_export(export.get_excel_download)
+get_excel_download_highlight_total = lazy_export(export.get_excel_download_highlight_total)
+get_excel_download_highlight_price_trend = lazy_export(export.get_excel_download_highlight_price_trend)
+get_excel_download_highlight_1st_2nd_lowest = lazy_export(export.get_excel_download_highlight_1st_2nd_lowest)
+
+
+# ================= PIPELINE =================
+# Parse & cleaning per file sudah di-cache oleh RoundStore; tahap di bawah
+# di-memo per fingerprint round yang ter-upload, jadi rerun tanpa perubahan
+# file tidak menghitung ulang merge, pivot, analisis maupun price movement
+pipeline = Pipeline("upl_comparison_round")
+
+
+@pipeline.stage("combined", inputs=["rounds"])
+def combine_rounds(rounds):
+    # STEP 4: MERGE SEMUA FILE (tanpa baris TOTAL, dipakai pivot & transpose)
+    return pd.concat(rounds, ignore_index=True)
+
+
+@pipeline.stage("merge", inputs=["combined"])
+def merge_rounds(final_df):
+    # === MENAMBAHKAN TOTAL ROW ===
+    # Per (ROUND, VENDOR): kolom pertama setelah ROUND & VENDOR -> 'TOTAL',
+    # kolom numerik terakhir dijumlah
+    numeric_cols = final_df.select_dtypes(include="number").columns
+    final_df = add_group_totals(
+        final_df, ["ROUND", "VENDOR"],
+        label_col=final_df.columns[2],
+        sum_cols=numeric_cols[-1:],
+        sort=True,
+    )
 
-                # ===== TEXT COLUMN =====
-                else:
-                    worksheet.write(row_idx, col_idx, val)
-
-        # ================= AUTOFIT =================
-        for i, col in enumerate(df.columns):
-            max_len = max(
-                df[col].astype(str).map(len).max(),
-                len(str(col))
-            ) + 2
-            worksheet.set_column(i, i, max_len)
-
-    output.seek(0)
-    return output.getvalue()
-
-# Download highlight total
-@st.cache_data
-def get_excel_download_highlight_total(df, sheet_name="Sheet1"):
-    output = BytesIO()
-
-    with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
-        df.to_excel(writer, index=False, sheet_name=sheet_name)
-        workbook  = writer.book
-        worksheet = writer.sheets[sheet_name]
-
-        # ================= FORMAT =================
-        format_rupiah = workbook.add_format({"num_format": "#,##0"})
-
-        highlight_format = workbook.add_format({
-            "bold": True,
-            "bg_color": "#D9EAD3",
-            "font_color": "#1A5E20",
-            "num_format": "#,##0"
-        })
+    # Pembulatan
+    num_cols = final_df.select_dtypes(include=["number"]).columns
+    final_df[num_cols] = final_df[num_cols].apply(round_half_up)
+    return final_df
 
-        # ================= NUMERIC COLUMNS =================
-        num_cols = df.select_dtypes(include=["number"]).columns
 
-        # ================= LOOP DATA =================
-        for row_idx, row in enumerate(df.itertuples(index=False), start=1):
+@pipeline.stage("pivot", inputs=["combined"])
+def pivot_rounds(raw_transpose):
+    raw_transpose = raw_transpose.copy()
 
-            is_total = any(
-                str(x).strip().upper() == "TOTAL"
-                for x in row if pd.notna(x)
-            )
+    # Normalisasi nama vendor
+    raw_transpose["VENDOR"] = raw_transpose["VENDOR"].str.upper().str.strip()
 
-            for col_idx, col_name in enumerate(df.columns):
-                value = row[col_idx]
-
-                # NaN / inf safety
-                if pd.isna(value) or (isinstance(value, (int, float)) and np.isinf(value)):
-                    value = ""
-
-                # ===== TOTAL ROW =====
-                if is_total:
-                    if col_name in num_cols and value != "":
-                        worksheet.write_number(
-                            row_idx, col_idx, value, highlight_format
-                        )
-                    else:
-                        worksheet.write(
-                            row_idx, col_idx, value, highlight_format
-                        )
-
-                # ===== NORMAL ROW =====
-                else:
-                    if col_name in num_cols and value != "":
-                        worksheet.write_number(
-                            row_idx, col_idx, value, format_rupiah
-                        )
-                    else:
-                        worksheet.write(
-                            row_idx, col_idx, value
-                        )
-
-        # ================= AUTOFIT =================
-        for i, col in enumerate(df.columns):
-            max_len = max(
-                df[col].astype(str).map(len).max(),
-                len(str(col))
-            ) + 2
-            worksheet.set_column(i, i, max_len)
-
-    output.seek(0)
-    return output.getvalue()
-
-# Download highlight total
-@st.cache_data
-def get_excel_download_highlight_price_trend(df_raw, sheet_name="Sheet1"):
-    output = BytesIO()
-
-    # ===== COERCE NUMERIC (INI KUNCI UTAMA) =====
-    df = df_raw.copy()
-    numeric_cols = []
-
-    for col in df.columns:
-        coerced = pd.to_numeric(df[col], errors="coerce")
-        if coerced.notna().any():
-            df[col] = coerced
-            numeric_cols.append(col)
-
-    value_cols = [
-        c for c in df.columns
-        if "PRICE REDUCTION (VALUE)" in c or "STANDARD DEVIATION" in c
-    ]
+    # Identifikasi kolom
+    non_num_cols = raw_transpose.select_dtypes(exclude=["number"]).columns.tolist()
+    non_num_cols = [c for c in non_num_cols if c not in ["ROUND", "VENDOR"]]
 
-    pct_cols = [
-        c for c in df.columns
-        if "PRICE REDUCTION (%)" in c or "PRICE STABILITY INDEX (%)" in c
-    ]
+    # Ambil kolom  numerik
+    price_cols = raw_transpose.select_dtypes(include=["number"]).columns.tolist()
 
-    with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
-        df.to_excel(writer, index=False, sheet_name=sheet_name)
-        workbook  = writer.book
-        worksheet = writer.sheets[sheet_name]
+    # Long format
+    df_long = raw_transpose.melt(
+        id_vars=["ROUND", "VENDOR"] + non_num_cols,
+        value_vars=price_cols,
+        var_name="PRICE_COL",
+        value_name="[PRICE]"
+    )
 
-        # ===== FORMAT =====
-        fmt_rp = workbook.add_format({'num_format': '#,##0'})
-        fmt_pct = workbook.add_format({'num_format': '#,##0.0"%"'})
+    # Pivot ke format wide (Vendor Round)
+    df_pivot = df_long.pivot_table(
+        index=non_num_cols,
+        columns=["VENDOR", "ROUND"],
+        values="[PRICE]",
+        aggfunc="first"
+    )
 
-        fmt_total_rp = workbook.add_format({
-            "bold": True,
-            "bg_color": "#D9EAD3",
-            "font_color": "#1A5E20",
-            "num_format": "#,##0"
-        })
+    # Rapikan header (flatten)
+    df_pivot.columns = [f"{vendor} {rnd}" for vendor, rnd in df_pivot.columns]
+    df_pivot = df_pivot.reset_index()
 
-        fmt_total_pct = workbook.add_format({
-            "bold": True,
-            "bg_color": "#D9EAD3",
-            "font_color": "#1A5E20",
-            'num_format': '#,##0.0"%"'
-        })
+    # Tambahkan row "TOTAL"
+    total_row = {col: "" for col in df_pivot.columns}
 
-        fmt_total_text = workbook.add_format({
-            "bold": True,
-            "bg_color": "#D9EAD3",
-            "font_color": "#1A5E20"
-        })
+    # Isi kolom identifier TOTAL
+    total_row[non_num_cols[0]] = "TOTAL"
 
-        # ===== COLUMN FORMAT (AMANN) =====
-        for col_idx, col in enumerate(df.columns):
-            if col in pct_cols:
-                worksheet.set_column(col_idx, col_idx, 15, fmt_pct)
-            elif col in value_cols or col in numeric_cols:
-                worksheet.set_column(col_idx, col_idx, 15, fmt_rp)
-
-        # ===== LOOP DATA =====
-        for row_idx, (_, row) in enumerate(df.iterrows(), start=1):
-            is_total = any(
-                isinstance(x, str) and x.strip().upper() == "TOTAL"
-                for x in row if pd.notna(x)
-            )
+    # Hitung total untuk kolom numeric pivot
+    for col in df_pivot.columns:
+        if col not in non_num_cols:
+            total_row[col] = df_pivot[col].sum(numeric_only=True)
 
-            for col_idx, col in enumerate(df.columns):
-                val = row[col]
-
-                # ===== PICK FORMAT =====
-                if is_total:
-                    if col in pct_cols:
-                        fmt = fmt_total_pct
-                    elif col in value_cols or col in numeric_cols:
-                        fmt = fmt_total_rp
-                    else:
-                        fmt = fmt_total_text
-                else:
-                    if col in pct_cols:
-                        fmt = fmt_pct
-                    elif col in value_cols or col in numeric_cols:
-                        fmt = fmt_rp
-                    else:
-                        fmt = None
-
-                # ===== WRITE (TYPE SAFE) =====
-                if pd.isna(val) or (isinstance(val, float) and np.isinf(val)):
-                    worksheet.write_blank(row_idx, col_idx, None, fmt)
-                elif col in pct_cols or col in numeric_cols:
-                    worksheet.write_number(row_idx, col_idx, val, fmt)
-                else:
-                    worksheet.write(row_idx, col_idx, val, fmt)
-
-        # ===== AUTOFIT =====
-        for i, col in enumerate(df.columns):
-            worksheet.set_column(
-                i, i,
-                max(len(str(col)), df[col].astype(str).map(len).max()) + 2
-            )
+    # Append TOTAL row
+    df_pivot = pd.concat([df_pivot, pd.DataFrame([total_row])], ignore_index=True)
+    return mark_totals(df_pivot, non_num_cols[0])
 
-    output.seek(0)
-    return output.getvalue()
 
-# Download Highlight 1st & 2nd Vendors
-def get_excel_download_highlight_1st_2nd_lowest(df, sheet_name="Sheet1"):
-    output = BytesIO()
+@pipeline.stage("transpose", inputs=["combined"])
+def transpose_rounds(raw_transpose):
+    df = raw_transpose.copy()
+    all_rounds_list = []
 
-    with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
-        df.to_excel(writer, index=False, sheet_name=sheet_name)
-        workbook  = writer.book
-        worksheet = writer.sheets[sheet_name]
+    # Ambil nama kolom
+    round_col = df.columns[0]
+    vendor_col = df.columns[1]
+    scope_cols = list(df.columns[2:-1])
+    price_col = df.columns[-1]
 
-        # ========== FORMAT ==========
-        format_rupiah_xls = workbook.add_format({'num_format': '#,##0'})
-        fmt_pct_rupiah = workbook.add_format({'num_format': '#,##0.0"%"'})
+    for round_name, df_round in df.groupby(round_col):
+        df_temp = df_round.copy()
 
-        format_first = workbook.add_format({
-            'bg_color': '#C6EFCE',
-            'num_format': '#,##0'
-        })
+        # Normalisasi vendor
+        df_temp[vendor_col] = df_temp[vendor_col].astype(str).str.strip().str.upper()
 
-        format_second = workbook.add_format({
-            'bg_color': '#FFEB9C',
-            'num_format': '#,##0'
-        })
+        # Simpan urutan
+        # unique_order = df_temp[list(scope_cols)].drop_duplicates().reset_index(drop=True)
+        df_temp["__order"] = df_temp.groupby(scope_cols + [vendor_col]).cumcount()
 
-        # ========== COLUMN GROUP ==========
-        num_cols = df.select_dtypes(include=["number"]).columns
-        pct_cols = [c for c in df.columns if "%" in c]
-
-        # ========== LOOP DATA ==========
-        for row_idx, (_, row) in enumerate(df.iterrows(), start=1):
-            first_vendor  = row.get("1st Vendor")
-            second_vendor = row.get("2nd Vendor")
-
-            for col_idx, col in enumerate(df.columns):
-                value = row[col]
-
-                # NaN / inf safety
-                if pd.isna(value) or (isinstance(value, (int, float)) and np.isinf(value)):
-                    worksheet.write(row_idx, col_idx, "")
-                    continue
-
-                # ===== PICK FORMAT =====
-                fmt = None
-                if col == first_vendor:
-                    fmt = format_first
-                elif col == second_vendor:
-                    fmt = format_second
-
-                # ===== WRITE CELL =====
-                if col in pct_cols:
-                    worksheet.write_number(
-                        row_idx,
-                        col_idx,
-                        value,
-                        fmt or fmt_pct_rupiah
-                    )
+        # Simpan urutan asli (scope + __order) untuk menjaga ordering input
+        scope_order = df_temp[scope_cols + ["__order"]].drop_duplicates().reset_index(drop=True)
 
-                elif col in num_cols:
-                    worksheet.write_number(
-                        row_idx,
-                        col_idx,
-                        value,
-                        fmt or format_rupiah_xls
-                    )
+        # Pivot
+        pivot_df = (df_temp.pivot_table(
+            index=scope_cols + ["__order"],
+            columns=vendor_col,
+            values=price_col,
+            aggfunc="first",    # ambil value apa adanya (bukan sum)
+            sort=False
+        ).reset_index())
+
+        # Merge agar urutan sesuai
+        # pivot_df = unique_order.merge(pivot_df, on=list(scope_cols), how="left")
+        pivot_df = scope_order.merge(pivot_df, on=scope_cols + ["__order"], how="left")
+        pivot_df = pivot_df.drop(columns="__order")
+
+        # Tambahkan kolom ROUND
+        pivot_df.insert(0, "ROUND", round_name.upper())
+
+        # Tambahkan baris TOTAL per round
+        total_row = {col: "" for col in pivot_df.columns}
+        total_row["ROUND"] = round_name.upper()
+        total_row[scope_cols[0]] = "TOTAL"
+
+        # for v in pivot_df.columns:
+        #     if v not in ["ROUND", *scope_cols]:
+        #         total_row[v] = pivot_df[v].sum()
+
+        num_cols_round = pivot_df.select_dtypes(include=["number"]).columns
+        for c in num_cols_round:
+            total_row[c] = pivot_df[c].sum()
+
+        pivot_df = pd.concat([pivot_df, pd.DataFrame([total_row])], ignore_index=True)
+
+        all_rounds_list.append(pivot_df)
+
+    # Gabungkan semua round (baris TOTAL per round ditandai di kolom scope pertama)
+    return mark_totals(pd.concat(all_rounds_list, ignore_index=True), scope_cols[0])
+
+
+@pipeline.stage("analysis", inputs=["transpose"])
+def bid_analysis(df_summary):
+    analysis_results = {}
+
+    round_col = df_summary.columns[0]
+
+    for round_name, df_round in df_summary.groupby(round_col):
+        # Skip TOTAL
+        if round_name == "TOTAL":
+            continue
+
+        # Hapus baris TOTAL per round
+        df_clean = drop_total_rows(df_round)
+
+        # Kolom vendor dinamis
+        vendor_cols = df_summary.select_dtypes(include=["number"]).columns.tolist()
+
+        # 1st/2nd Lowest, Gap, Median & deviasi ke median (0 = tidak ikut tender)
+        df_clean = add_bid_analysis(df_clean, vendor_cols)
+
+        # Hapus kolom ROUND
+        df_clean = df_clean.drop(columns=[round_col])
+
+        # Simpan hasil untuk tab
+        analysis_results[round_name] = df_clean
+
+    # MERGEDD BID & PRICE ANALYSIS
+    summary_list = []
+
+    for round_name, df_analysis in analysis_results.items():
+        df_temp = df_analysis.copy()
+        df_temp.insert(0, "ROUND", round_name)
+        summary_list.append(df_temp)
+
+    return pd.concat(summary_list, ignore_index=True)
+
+
+@pipeline.stage("price_movement", inputs=["combined"])
+def price_movement(raw_transpose):
+    round_col  = raw_transpose.columns[0]
+    vendor_col = raw_transpose.columns[1]
+    scope_cols = raw_transpose.columns[2:-1]
+    price_col  = raw_transpose.columns[-1]
+
+    df = raw_transpose.copy()
+
+    # Standardisasi nama vendor
+    df[vendor_col] = df[vendor_col].astype(str).str.strip().str.upper()
+
+    # --- Buat SCOPE_KEY untuk kombinasi seluruh kolom scope ---
+    df["SCOPE_KEY"] = df[scope_cols].astype(str).agg("|".join, axis=1)
+
+    # --- Tambahkan kolom __order untuk menangani duplicate Scope per vendor per round ---
+    df["__order"] = df.groupby([vendor_col, "SCOPE_KEY", round_col]).cumcount()
+
+    # Pivot
+    df_pivot = (
+        df.pivot_table(
+            index=[vendor_col, "SCOPE_KEY", "__order"],
+            columns=round_col,
+            values=price_col,
+            aggfunc="mean",
+            sort=False
+        )
+        .reset_index()
+    )
+
+    # Pisahkan kembali SCOPE_KEY ke kolom scope asli
+    df_pivot[scope_cols] = df_pivot["SCOPE_KEY"].str.split("|", expand=True)
+
+    # Ambil semua nama round unik dan urutkan berdasarkan nomor round
+    round_order = sorted(df[round_col].unique(), key=extract_round_number)
+
+    # # --- Susun ulang kolom: vendor, scope_cols, rounds ---
+    # round_order = list(df[round_col].unique())
+    df_pivot = df_pivot[[vendor_col, *scope_cols, "__order", *round_order, "SCOPE_KEY"]]
+
+    # Sorting sesuai urutan kemunculan asli scope per vendor
+    scope_order_map = (
+        df.drop_duplicates([vendor_col, "SCOPE_KEY"])
+        .groupby(vendor_col)["SCOPE_KEY"]
+        .apply(list)
+        .to_dict()
+    )
+
+    df_pivot["SCOPE_ORDER"] = df_pivot.apply(
+        lambda row: scope_order_map[row[vendor_col]].index(row["SCOPE_KEY"])
+        if row["SCOPE_KEY"] in scope_order_map[row[vendor_col]] else 9999,
+        axis=1
+    )
+
+    df_pivot = (
+        df_pivot
+        .sort_values([vendor_col, "SCOPE_ORDER", "__order"])
+        .drop(columns=["SCOPE_ORDER", "__order"])
+        .reset_index(drop=True)
+    )
+
+    # PRICE REDUCTION, PRICE TREND, STANDARD DEVIATION & PRICE STABILITY INDEX (PSI)
+    # dihitung sekaligus dari matrix harga per ROUND (round kosong dilewati)
+    df_pivot = add_price_movement(df_pivot, round_order, reduction="last_minus_first")
+
+    # Hapus helper column
+    df_pivot = df_pivot.drop(columns=["SCOPE_KEY"])
+
+    # Adding "TOTAL" rows: sum per ROUND untuk tiap vendor, ditaruh di akhir
+    # blok vendor (pivot sudah terurut VENDOR + urutan scope)
+    return add_group_totals(
+        df_pivot, ["VENDOR"],
+        label_col=scope_cols[0],
+        sum_cols=round_order,
+        fill=np.nan,
+    )
+
+
+# ================= BATCH =================
+# Super Download (semua sheet, tanpa filter): dipakai tombol Download di page
+# dan oleh ``inspire.py run`` untuk banyak tender sekaligus
+def clean_round(sheets, filename):
+    # Satu file round: cleaning tiap sheet (dict nama vendor -> sheet), kolom
+    # VENDOR & ROUND di depan, digabung jadi satu dataframe
+    merged_per_file = []            # penampung merge sheet untuk satu file
+
+    for sheet, df_raw in sheets.items():
+        df_clean = clean_dataframe(df_raw)      # cleaning
+        df_clean.insert(0, "VENDOR", sheet)     # tambahkan kolom VENDOR
+        merged_per_file.append(df_clean)
+
+    df_merge_sheet = pd.concat(merged_per_file, ignore_index=True)
+    df_merge_sheet.insert(0, "ROUND", filename)
+    return df_merge_sheet
 
-                else:
-                    worksheet.write(row_idx, col_idx, value)
 
-        # ================= AUTOFIT =================
-        for i, col in enumerate(df.columns):
-            max_len = max(
-                df[col].astype(str).map(len).max(),
-                len(str(col))
-            ) + 2
-            worksheet.set_column(i, i, max_len)
+def price_movement_export(df_pivot):
+    # NaN / Inf -> string kosong supaya xlsxwriter tidak error
+    return df_pivot.replace([np.nan, np.inf, -np.inf], "")
+
+
+SUPER_DOWNLOAD = SuperDownload(
+    "UPL Comparison Round by Round.xlsx",
+    {
+        "Merge Data": "merge",
+        "Pivot Table": "pivot",
+        "Bid & Price Analysis": "analysis",
+        "Price Movement Analysis": ("price_movement", price_movement_export),
+    },
+    plan_round_sheet,
+    {"bid_sheet": "Bid & Price Analysis"},
+)
+
+
+def read_tender(paths):
+    # Satu folder = satu tender, satu workbook per round (semua sheet vendor)
+    rounds = []
+    for path, sheets in zip(paths, read_workbooks(paths)):
+        rounds.append(clean_round(sheets, os.path.splitext(os.path.basename(path))[0]))
+    return {"rounds": rounds}
+
+
+batch = Batch(pipeline, read_tender, [SUPER_DOWNLOAD], rounds=True)
 
-    output.seek(0)
-    return output.getvalue()
 
 def page():
     # Header Title
@@ -411,8 +391,11 @@ def page():
         new_files = st.session_state.get(key, None)
 
         if new_files:
-            # Overwrite file lama
-            st.session_state.uploaded_files_upl = new_files
+            # Tambahkan ke file lama (round baru saja yang diproses);
+            # file dengan nama sama diganti versi barunya
+            merged_files = {f.name: f for f in st.session_state.uploaded_files_upl}
+            merged_files.update((f.name, f) for f in new_files)
+            st.session_state.uploaded_files_upl = list(merged_files.values())
 
         # Reset processing flag
         st.session_state.pop("already_processed_upl_round_by_round", None)
@@ -460,49 +443,19 @@ def page():
                         f"<p style='margin:0; padding:2px 4px;'>{text}</p>",
                         unsafe_allow_html=True
                     )
- 
-    # Pre-processing
-    def clean_dataframe(df):
-        rows_before, cols_before = df.shape
-
-        # Data cleaning
-        df_clean = df.replace(r'^\s*$', np.nan, regex=True)
-        df_clean = df_clean.dropna(how="all", axis=0).dropna(how="all", axis=1)
-
-        # Header handling logic
-        cols = df_clean.columns.astype(str)
 
-        # Case 1: Semua kolom 'Unnamed'
-        if len(cols) > 0 and all(col.startswith("Unnamed") for col in cols):
-            # Gunakan baris pertama sebagai header
-            df_clean.columns = df_clean.iloc[0]
-            df_clean = df_clean[1:].reset_index(drop=True)
-
-        # Case 2: Hanya beberapa kolom yang 'Unnamed'
-        else:
-            df_clean = df_clean.loc[:, ~cols.str.startswith("Unnamed")]
-
-        rows_after, cols_after = df_clean.shape
-
-        # Konversi tipe data
-        df_clean = df_clean.convert_dtypes()
-
-        # Safe conversion from numpy types
-        def safe_convert(x):
-            if isinstance(x, (np.generic, np.number)):
-                return x.item()
-            return x 
-        
-        df_clean = df_clean.map(safe_convert)
-        df_clean.columns = [safe_convert(c) for c in df_clean.columns]
-        df_clean.index = [safe_convert(i) for i in df_clean.index]
-
-        # Paksa nama kolom dan index menjadi string
-        df_clean.columns = df_clean.columns.map(str)
-        df_clean.index = df_clean.index.map(str)
-
-        return df_clean
+        # Hapus semua round yang sudah di-upload
+        def clear_files():
+            st.session_state.uploaded_files_upl = []
+            st.session_state.pop("already_processed_upl_round_by_round", None)
 
+        st.button(
+            "Clear files",
+            icon=":material/delete:",
+            on_click=clear_files,
+            key="clear_files_upl_round_by_round"
+        )
+ 
     # # Kalau ada upload baru → overwrite & reset flag
     # if upload_files:
     #     st.session_state["upload_multi_file_upl_round_by_round"] = upload_files
@@ -518,70 +471,45 @@ def page():
     if not files_to_process:
         st.stop()
 
-    # Proses upload hanya sekali per set file
+    # Progress upload hanya sekali per set file (dilaporkan dari proses parse & cleaning)
+    msg = None
     if "already_processed_upl_round_by_round" not in st.session_state:
-        # --- Animasi proses upload ---
         msg = st.toast("📂 Uploading files...")
-        time.sleep(1.2)
 
-        msg.toast("🔍 Reading sheets...")
-        time.sleep(1.2)
-
-        msg.toast("✅ File uploaded successfully!")
-        time.sleep(0.5)
-
-    all_rounds = []
-    for file in files_to_process:
-        # STEP 1: ambil nama file sebagai ROUND
-        filename = os.path.splitext(file.name)[0]   # contoh: "L2R1"
-
-        # STEP 2: baca semua sheet dalam file
-        xls = pd.ExcelFile(file)
-        sheets = xls.sheet_names    # list nama vendor
-
-        merged_per_file = []        # penampung merge sheet untuk satu file
-
-        for sheet in sheets:
-            df_raw = pd.read_excel(xls, sheet_name=sheet)
-            df_clean = clean_dataframe(df_raw)      # cleaning
-            df_clean.insert(0, "VENDOR", sheet)     # tambahkan kolom VENDOR
-            merged_per_file.append(df_clean)
-
-        # STEP 3: merge semua sheet dalam 1 file
-        df_merge_sheet = pd.concat(merged_per_file, ignore_index=True)
-        df_merge_sheet.insert(0, "ROUND", filename)
-        all_rounds.append(df_merge_sheet)   # masukkan ke list besar
-
-    # STEP 4: MERGE SEMUA FILE
-    final_df = pd.concat(all_rounds, ignore_index=True)
-
-    # Simpan untuk transpose nanti
-    raw_transpose = final_df.copy()
+    # Hanya file round yang baru (atau isinya berubah) yang di-parse & di-cleaning
+    def process_new_rounds(new_files):
+        # Baca semua file & sheet vendor secara paralel (urutan tetap sesuai upload)
+        raw_rounds = read_workbooks(
+            new_files,
+            on_sheet=sheet_progress(msg.toast) if msg else None
+        )
 
-    # === MENAMBAHKAN TOTAL ROW ===
-    df_with_total = []
+        processed = []
+        for idx, (file, sheets) in enumerate(zip(new_files, raw_rounds), start=1):
+            # STEP 1: ambil nama file sebagai ROUND
+            filename = os.path.splitext(file.name)[0]   # contoh: "L2R1"
 
-    for (rnd, vendor), group in final_df.groupby(["ROUND", "VENDOR"]):
-        df_temp = group.copy()
+            # STEP 2 & 3: cleaning tiap sheet vendor, merge jadi satu per file
+            df_merge_sheet = clean_round(sheets, filename)
+            if msg:
+                clean_progress(msg.toast, filename, len(df_merge_sheet), idx, len(new_files))
 
-        numeric_cols = df_temp.select_dtypes(include="number").columns
-        last_numeric_col = numeric_cols[-1] if len(numeric_cols) else None
+            processed.append(df_merge_sheet)
 
-        total_row = {col: "" for col in df_temp.columns}
-        total_row["ROUND"] = rnd
-        total_row["VENDOR"] = vendor
+        if msg:
+            msg.toast(upload_summary(
+                [df for sheets in raw_rounds for df in sheets.values()],
+                files=len(new_files)
+            ))
+        return processed
 
-        # Kolom pertama setelah ROUND & VENDOR -> jadi 'TOTAL'
-        first_data_col = df_temp.columns[2]
-        total_row[first_data_col] = "TOTAL"
+    # Store hasil proses per file (key: nama file + hash isi file)
+    store = st.session_state.setdefault("round_store_upl_round_by_round", RoundStore())
+    all_rounds = store.sync(files_to_process, process_new_rounds)
 
-        if last_numeric_col:
-            total_row[last_numeric_col] = df_temp[last_numeric_col].sum(skipna=True)
-        
-        df_temp = pd.concat([df_temp, pd.DataFrame([total_row])], ignore_index=True)
-        df_with_total.append(df_temp)
-    
-    final_df = pd.concat(df_with_total, ignore_index=True)
+    # STEP 4: MERGE SEMUA FILE -> pivot / analisis / price movement, tiap tahap di-memo
+    run = pipeline.run(rounds=all_rounds)
+    final_df = run["merge"]
 
     # Simpan ke session_state (supaya ga hilang saat pindah tab)
     st.session_state["merge_upl_round_by_round"] = final_df
@@ -593,92 +521,53 @@ def page():
     st.markdown("##### 🗃️ Merge Data")
     st.caption(f"Successfully consolidated data from **{len(files_to_process)} files**.")
 
-    # Pembulatan
     num_cols = final_df.select_dtypes(include=["number"]).columns
-    final_df[num_cols] = final_df[num_cols].apply(round_half_up_num)
 
     # Format Rupiah
-    df_styled = (
-        final_df.style
-        .format({col: format_rupiah for col in num_cols})
-        .apply(highlight_total_row_v2, axis=1)
-    )
-    st.dataframe(df_styled, hide_index=True)
+    format_dict = rupiah_formats(final_df, num_cols)
+    def style_df(frame):
+        return (
+            frame.style
+            .format(format_dict)
+            .apply(total_row_styles_v2, axis=None)
+        )
+    paged_dataframe(final_df, style_df, key="merge_upl_by_round", hide_index=True)
 
     # Download
     excel_data = get_excel_download_highlight_total(final_df)
-    col1, col2, col3 = st.columns([2.3,2,1])
-    with col3:
-        st.download_button(
-            label="Download",
-            data=excel_data,
-            file_name="Merge Data - UPL by Round.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            icon=":material/download:",
-        )
-
-    st.divider()
-
-    # PIVOTT TABLEE
-    st.markdown("##### 🛸 Pivot Table")
-    st.caption("Pivoted price comparison table showing vendor offers per round for each item.")
-
-    # Normalisasi nama vendor
-    raw_transpose["VENDOR"] = raw_transpose["VENDOR"].str.upper().str.strip()
-
-    # Identifikasi kolom
-    non_num_cols = raw_transpose.select_dtypes(exclude=["number"]).columns.tolist()
-    non_num_cols = [c for c in non_num_cols if c not in ["ROUND", "VENDOR"]]
-
-    # Ambil kolom  numerik
-    price_cols = raw_transpose.select_dtypes(include=["number"]).columns.tolist()
-
-    # Long format
-    df_long = raw_transpose.melt(
-        id_vars=["ROUND", "VENDOR"] + non_num_cols,
-        value_vars=price_cols,
-        var_name="PRICE_COL",
-        value_name="[PRICE]"
-    )
-
-    # Pivot ke format wide (Vendor Round)
-    df_pivot = df_long.pivot_table(
-        index=non_num_cols,
-        columns=["VENDOR", "ROUND"],
-        values="[PRICE]",
-        aggfunc="first"
-    )
-
-    # Rapikan header (flatten)
-    df_pivot.columns = [f"{vendor} {rnd}" for vendor, rnd in df_pivot.columns]
-    df_pivot = df_pivot.reset_index()
-
-    # Tambahkan row "TOTAL"
-    total_row = {col: "" for col in df_pivot.columns}
+    col1, col2, col3 = st.columns([2.3,2,1])
+    with col3:
+        st.download_button(
+            label="Download",
+            data=excel_data,
+            file_name="Merge Data - UPL by Round.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            icon=":material/download:",
+        )
 
-    # Isi kolom identifier TOTAL
-    total_row[non_num_cols[0]] = "TOTAL"
+    st.divider()
 
-    # Hitung total untuk kolom numeric pivot
-    for col in df_pivot.columns:
-        if col not in non_num_cols:
-            total_row[col] = df_pivot[col].sum(numeric_only=True)
+    # PIVOTT TABLEE
+    st.markdown("##### 🛸 Pivot Table")
+    st.caption("Pivoted price comparison table showing vendor offers per round for each item.")
 
-    # Append TOTAL row
-    df_pivot = pd.concat([df_pivot, pd.DataFrame([total_row])], ignore_index=True)
+    # Harga per vendor x round + baris TOTAL (tahap pivot)
+    df_pivot = run["pivot"]
 
     # Format
     num_cols = df_pivot.select_dtypes(include=["number"]).columns
 
-    df_pivot_styled = (
-        df_pivot.style
-        .format({col: format_rupiah for col in num_cols})
-        .apply(highlight_total_row_v2, axis=1)
-    )
+    format_dict = rupiah_formats(df_pivot, num_cols)
+    def style_pivot(frame):
+        return (
+            frame.style
+            .format(format_dict)
+            .apply(total_row_styles_v2, axis=None)
+        )
 
     # Tampilkan
     st.session_state["pivot2_upl_by_round"] = df_pivot
-    st.dataframe(df_pivot_styled, hide_index=True)
+    paged_dataframe(df_pivot, style_pivot, key="pivot_upl_by_round", hide_index=True)
 
     # Download
     excel_data = get_excel_download_highlight_total(df_pivot)
@@ -698,64 +587,8 @@ def page():
     # st.markdown("##### 🛸 Transpose Data")
     # st.caption("Cross-vendor price mapping to simplify analysis and highlight pricing differences.")
     
-    df = raw_transpose.copy()
-    all_rounds_list = []
-
-    # Ambil nama kolom
-    round_col = df.columns[0]
-    vendor_col = df.columns[1]
-    scope_cols = list(df.columns[2:-1])
-    price_col = df.columns[-1]
-
-    for round_name, df_round in df.groupby(round_col):
-        df_temp = df_round.copy()
-
-        # Normalisasi vendor
-        df_temp[vendor_col] = df_temp[vendor_col].astype(str).str.strip().str.upper()
-
-        # Simpan urutan
-        # unique_order = df_temp[list(scope_cols)].drop_duplicates().reset_index(drop=True)
-        df_temp["__order"] = df_temp.groupby(scope_cols + [vendor_col]).cumcount()
-
-        # Simpan urutan asli (scope + __order) untuk menjaga ordering input
-        scope_order = df_temp[scope_cols + ["__order"]].drop_duplicates().reset_index(drop=True)
-
-        # Pivot
-        pivot_df = (df_temp.pivot_table(
-            index=scope_cols + ["__order"],
-            columns=vendor_col,
-            values=price_col,
-            aggfunc="first",    # ambil value apa adanya (bukan sum)
-            sort=False
-        ).reset_index())
-
-        # Merge agar urutan sesuai
-        # pivot_df = unique_order.merge(pivot_df, on=list(scope_cols), how="left")
-        pivot_df = scope_order.merge(pivot_df, on=scope_cols + ["__order"], how="left")
-        pivot_df = pivot_df.drop(columns="__order")
-
-        # Tambahkan kolom ROUND
-        pivot_df.insert(0, "ROUND", round_name.upper())
-
-        # Tambahkan baris TOTAL per round
-        total_row = {col: "" for col in pivot_df.columns}
-        total_row["ROUND"] = round_name.upper()
-        total_row[scope_cols[0]] = "TOTAL"
-
-        # for v in pivot_df.columns:
-        #     if v not in ["ROUND", *scope_cols]:
-        #         total_row[v] = pivot_df[v].sum()
-
-        num_cols_round = pivot_df.select_dtypes(include=["number"]).columns
-        for c in num_cols_round:
-            total_row[c] = pivot_df[c].sum()
-
-        pivot_df = pd.concat([pivot_df, pd.DataFrame([total_row])], ignore_index=True)
-
-        all_rounds_list.append(pivot_df)
-
-    # Gabungkan semua round
-    df_summary = pd.concat(all_rounds_list, ignore_index=True)
+    # Pivot vendor per round + baris TOTAL per round (tahap transpose)
+    df_summary = run["transpose"]
 
     # # TOTAL BESARR
     # total_all_row = {col: "" for col in df_summary.columns}
@@ -777,15 +610,6 @@ def page():
     # Simpan dan tampilkan
     st.session_state["upl_comparison_round_by_round_pivot"] = df_summary
 
-    num_cols = df_summary.select_dtypes(include=["number"]).columns
-    df_pivot_style = (
-        df_summary.style
-            .format({col: format_rupiah for col in num_cols})
-            .apply(highlight_total_row_v2, axis=1)
-    )
-
-    # st.dataframe(df_pivot_style, hide_index=True)
-
     # # Download button to Excel
     # excel_data = get_excel_download_highlight_total(df_summary)
     # # Pastikan berada di tab atau st
@@ -804,415 +628,199 @@ def page():
     # BIDD & PRICEE ANALYSIS
     st.markdown("##### 🧠 Bid & Price Analysis")
     
-    analysis_results = {}
+    # 1st/2nd Lowest, Gap, Median per round tanpa baris TOTAL (tahap analysis)
+    df_analysis_summary = run["analysis"]
 
-    round_col = df_summary.columns[0]
+    # Kolom vendor dinamis
+    vendor_cols = df_summary.select_dtypes(include=["number"]).columns.tolist()
 
-    for round_name, df_round in df_summary.groupby(round_col):
-        # Skip TOTAL
-        if round_name == "TOTAL":
-            continue
+    # Simpan ke session state
+    st.session_state["bid_and_price_summary_upl_round"] = df_analysis_summary
 
-        # Hapus baris TOTAL per round
-        df_clean = df_round[
-            ~df_round.apply(
-                lambda row: row.astype(str).str.upper().eq("TOTAL").any(),
-                axis=1
+    # Slicer + tabel + download sebagai fragment: ganti filter hanya menjalankan
+    # ulang bagian ini di atas df_analysis_summary dari run penuh terakhir
+    @st.fragment
+    def bid_analysis_section(df_analysis_summary):
+        # --- 🎯 Tambahkan slicer
+        all_round = sorted(df_analysis_summary["ROUND"].dropna().unique())
+        all_1st = sorted(df_analysis_summary["1st Vendor"].dropna().unique())
+        all_2nd = sorted(df_analysis_summary["2nd Vendor"].dropna().unique())
+
+        col_sel_1, col_sel_2, col_sel_3 = st.columns(3)
+        with col_sel_1:
+            selected_round = st.multiselect(
+                "Filter: Round",
+                options=all_round,
+                default=[],
+                placeholder="Choose rounds",
+            )
+        with col_sel_2:
+            selected_1st = st.multiselect(
+                "Filter: 1st vendor",
+                options=all_1st,
+                default=[],
+                placeholder="Choose vendors",
+            )
+        with col_sel_3:
+            selected_2nd = st.multiselect(
+                "Filter: 2nd vendor",
+                options=all_2nd,
+                default=[],
+                placeholder="Choose vendors",
             )
-        ].copy()
-
-        # Kolom vendor dinamis
-        vendor_cols = df_summary.select_dtypes(include=["number"]).columns.tolist()
-
-        # Penanganan untuk 0 value
-        vendor_values = df_summary[vendor_cols].copy()
-        vendor_values = vendor_values.replace(0, pd.NA)
-        vendor_values = vendor_values.apply(pd.to_numeric, errors="coerce")
-
-        # Hitung 1st dan 2nd lowest
-        df_clean["1st Lowest"] = vendor_values.min(axis=1)
-        # df_clean["1st Vendor"] = vendor_values.idxmin(axis=1)
-
-        # Penanganan khusus 1st Vendor
-        mask_all_nan1 = vendor_values.isna().all(axis=1)
-        df_clean["1st Vendor"] = None
-        valid_idx1 = (~mask_all_nan1)
-        df_clean.loc[valid_idx1, "1st Vendor"] = vendor_values.loc[valid_idx1].idxmin(axis=1)
-
-        # Hitung 2nd Lowest
-        # Hilangkan dulu nilai 1st Lowest dari kandidat (agar kita dapat 2nd Lowest yang benar)
-        temp = vendor_values.mask(vendor_values.eq(df_clean["1st Lowest"], axis=0))
-
-        df_clean["2nd Lowest"] = temp.min(axis=1)
-        # df_clean["2nd Vendor"] = temp.idxmin(axis=1)
-
-        # Penanganan khusus 2nd Vendor
-        mask_all_nan2 = temp.isna().all(axis=1)
-        df_clean["2nd Vendor"] = None
-        valid_idx2 = (~mask_all_nan2)
-        df_clean.loc[valid_idx2, "2nd Vendor"] = temp.loc[valid_idx2].idxmin(axis=1)
-
-        # Hitung gap antara 1st dan 2nd lowest (%)
-        df_clean["Gap 1 to 2 (%)"] = ((df_clean["2nd Lowest"] - df_clean["1st Lowest"]) / df_clean["1st Lowest"] * 100).round(2)
-
-        # Hitung median price
-        df_clean["Median Price"] = vendor_values.median(axis=1)
-        df_clean["Median Price"] = pd.to_numeric(df_clean["Median Price"], errors="coerce")
-
-        # Hitung selisih tiap vendor dengan median (%)
-        for v in vendor_cols:
-            df_clean[f"{v} to Median (%)"] = ((df_clean[v] - df_clean["Median Price"]) / df_clean["Median Price"] * 100).round(2)
 
-        # Hapus kolom ROUND
-        df_clean = df_clean.drop(columns=[round_col])
+        # --- Terapkan filter AND secara dinamis
+        df_filtered_summary = df_analysis_summary.copy()
 
-        # Simpan hasil untuk tab
-        analysis_results[round_name] = df_clean
+        if selected_round:
+            df_filtered_summary = df_filtered_summary[df_filtered_summary["ROUND"].isin(selected_round)]
 
-    # MERGEDD BID & PRICE ANALYSIS
-    summary_list = []
+        if selected_1st:
+            df_filtered_summary = df_filtered_summary[df_filtered_summary["1st Vendor"].isin(selected_1st)]
 
-    for round_name, df_analysis in analysis_results.items():
-        df_temp = df_analysis.copy()
-        df_temp.insert(0, "ROUND", round_name)
-        summary_list.append(df_temp)
+        if selected_2nd:
+            df_filtered_summary = df_filtered_summary[df_filtered_summary["2nd Vendor"].isin(selected_2nd)]
 
-    df_analysis_summary = pd.concat(summary_list, ignore_index=True)
+        # Format
+        num_cols = df_filtered_summary.select_dtypes(include=["number"]).columns
+        format_dict = rupiah_formats(df_filtered_summary, num_cols)
+        format_dict.update({"Gap 1 to 2 (%)": "{:.1f}%"})
+        for vendor in vendor_cols:
+            format_dict[f"{vendor} to Median (%)"] = "{:+.1f}%"
 
-    # Simpan ke session state
-    st.session_state["bid_and_price_summary_upl_round"] = df_analysis_summary
+        def style_summary(frame):
+            return (
+                frame.style
+                .format(format_dict)
+                .apply(vendor_rank_styles, axis=None, columns=df_filtered_summary.columns)
+            )
 
-    # --- 🎯 Tambahkan slicer
-    all_round = sorted(df_analysis_summary["ROUND"].dropna().unique())
-    all_1st = sorted(df_analysis_summary["1st Vendor"].dropna().unique())
-    all_2nd = sorted(df_analysis_summary["2nd Vendor"].dropna().unique())
-
-    col_sel_1, col_sel_2, col_sel_3 = st.columns(3)
-    with col_sel_1:
-        selected_round = st.multiselect(
-            "Filter: Round",
-            options=all_round,
-            default=[],
-            placeholder="Choose rounds",
-        )
-    with col_sel_2:
-        selected_1st = st.multiselect(
-            "Filter: 1st vendor",
-            options=all_1st,
-            default=[],
-            placeholder="Choose vendors",
-        )
-    with col_sel_3:
-        selected_2nd = st.multiselect(
-            "Filter: 2nd vendor",
-            options=all_2nd,
-            default=[],
-            placeholder="Choose vendors",
+        st.markdown(
+            f"""
+            <div style="display:flex; justify-content:space-between; align-items:center; margin-bottom:15px;">
+                <div style="font-size:0.88rem; color:gray;">
+                    ✨ Total number of data entries: <b>{len(df_filtered_summary)}</b>
+                </div>
+                <div style="text-align:right;">
+                    <span style="background:#C6EFCE; padding:2px 8px; border-radius:6px; font-weight:600; font-size: 0.75rem; color: black">1st Lowest</span>
+                    &nbsp;
+                    <span style="background:#FFEB9C; padding:2px 8px; border-radius:6px; font-weight:600; font-size: 0.75rem; color: black">2nd Lowest</span>
+                </div>
+            </div>
+            """,
+            unsafe_allow_html=True
         )
 
-    # --- Terapkan filter AND secara dinamis
-    df_filtered_summary = df_analysis_summary.copy()
-
-    if selected_round:
-        df_filtered_summary = df_filtered_summary[df_filtered_summary["ROUND"].isin(selected_round)]
-
-    if selected_1st:
-        df_filtered_summary = df_filtered_summary[df_filtered_summary["1st Vendor"].isin(selected_1st)]
-
-    if selected_2nd:
-        df_filtered_summary = df_filtered_summary[df_filtered_summary["2nd Vendor"].isin(selected_2nd)]
-
-    # Format
-    num_cols = df_filtered_summary.select_dtypes(include=["number"]).columns
-    format_dict = {col: format_rupiah for col in num_cols}
-    format_dict.update({"Gap 1 to 2 (%)": "{:.1f}%"})
-    for vendor in vendor_cols:
-        format_dict[f"{vendor} to Median (%)"] = "{:+.1f}%"
-
-    df_summary_style = (
-        df_filtered_summary.style
-        .format(format_dict)
-        .apply(lambda row: highlight_1st_2nd_vendor(row, df_filtered_summary.columns), axis=1)
-    )
+        paged_dataframe(df_filtered_summary, style_summary, key="analysis_upl_by_round", hide_index=True)
 
-    st.markdown(
-        f"""
-        <div style="display:flex; justify-content:space-between; align-items:center; margin-bottom:15px;">
-            <div style="font-size:0.88rem; color:gray;">
-                ✨ Total number of data entries: <b>{len(df_filtered_summary)}</b>
-            </div>
-            <div style="text-align:right;">
-                <span style="background:#C6EFCE; padding:2px 8px; border-radius:6px; font-weight:600; font-size: 0.75rem; color: black">1st Lowest</span>
-                &nbsp;
-                <span style="background:#FFEB9C; padding:2px 8px; border-radius:6px; font-weight:600; font-size: 0.75rem; color: black">2nd Lowest</span>
-            </div>
-        </div>
-        """,
-        unsafe_allow_html=True
-    )
+        # Download button to Excel
+        excel_data = get_excel_download_highlight_1st_2nd_lowest(df_filtered_summary)
 
-    st.dataframe(df_summary_style, hide_index=True)
+        # Layout tombol (rata kanan)
+        col1, col2, col3 = st.columns([2.3,2,1])
+        with col3:
+            st.download_button(
+                label="Download",
+                data=excel_data,
+                file_name="Bid & Price Analysis - UPL by Round.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                icon=":material/download:"
+            )
 
-    # Download button to Excel
-    excel_data = get_excel_download_highlight_1st_2nd_lowest(df_filtered_summary)
+        return publish_frame("upl_by_round", "Bid & Price Analysis", df_filtered_summary)
 
-    # Layout tombol (rata kanan)
-    col1, col2, col3 = st.columns([2.3,2,1])
-    with col3:
-        st.download_button(
-            label="Download",
-            data=excel_data,
-            file_name="Bid & Price Analysis - UPL by Round.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            icon=":material/download:"
-        )
+    df_filtered_summary = bid_analysis_section(df_analysis_summary)
 
     st.divider()
 
     # PRICE MOVEMENTT ANALYSISS
     st.markdown("##### 💸 Price Movement Analysis")
 
-    round_col  = raw_transpose.columns[0]
-    vendor_col = raw_transpose.columns[1]
-    scope_cols = raw_transpose.columns[2:-1]
-    price_col  = raw_transpose.columns[-1]
-
-    df = raw_transpose.copy()
-
-    # Standardisasi nama vendor
-    df[vendor_col] = df[vendor_col].astype(str).str.strip().str.upper()
-
-    # --- Buat SCOPE_KEY untuk kombinasi seluruh kolom scope ---
-    df["SCOPE_KEY"] = df[scope_cols].astype(str).agg("|".join, axis=1)
-
-    # --- Tambahkan kolom __order untuk menangani duplicate Scope per vendor per round ---
-    df["__order"] = df.groupby([vendor_col, "SCOPE_KEY", round_col]).cumcount()
-
-    # Pivot
-    df_pivot = (
-        df.pivot_table(
-            index=[vendor_col, "SCOPE_KEY", "__order"],
-            columns=round_col,
-            values=price_col,
-            aggfunc="mean",
-            sort=False
-        )
-        .reset_index()
-    )
-
-    # Pisahkan kembali SCOPE_KEY ke kolom scope asli
-    df_pivot[scope_cols] = df_pivot["SCOPE_KEY"].str.split("|", expand=True)
-
-    # Fungsi untuk mengekstrak nomor round dari string, misal "L2R4" → 4
-    def extract_round_number(name):
-        """
-        Extracts the round number from various round naming formats:
-        - 'L2R4' -> 4
-        - 'Round 3' -> 3
-        - '4' -> 4
-        If no number is found, returns a large number to push it to the end.
-        """
-        name = str(name)
-        
-        # Coba cari pola R<number> dulu (untuk L2R4)
-        m = re.search(r'R(\d+)', name)
-        if m:
-            return int(m.group(1))
-        
-        # Kalau tidak ada, ambil angka pertama yang muncul di string
-        m2 = re.search(r'\d+', name)
-        if m2:
-            return int(m2.group())
-        
-        # Jika tidak ketemu angka sama sekali
-        return 9999
-
-    # Ambil semua nama round unik dan urutkan berdasarkan nomor round
-    round_order = sorted(df[round_col].unique(), key=extract_round_number)
-
-    # # --- Susun ulang kolom: vendor, scope_cols, rounds ---
-    # round_order = list(df[round_col].unique())
-    df_pivot = df_pivot[[vendor_col, *scope_cols, "__order", *round_order, "SCOPE_KEY"]]
-
-    # Sorting sesuai urutan kemunculan asli scope per vendor
-    scope_order_map = (
-        df.drop_duplicates([vendor_col, "SCOPE_KEY"])
-        .groupby(vendor_col)["SCOPE_KEY"]
-        .apply(list)
-        .to_dict()
-    )
-
-    df_pivot["SCOPE_ORDER"] = df_pivot.apply(
-        lambda row: scope_order_map[row[vendor_col]].index(row["SCOPE_KEY"])
-        if row["SCOPE_KEY"] in scope_order_map[row[vendor_col]] else 9999,
-        axis=1
-    )
-
-    df_pivot = (
-        df_pivot
-        .sort_values([vendor_col, "SCOPE_ORDER", "__order"])
-        .drop(columns=["SCOPE_ORDER", "__order"])
-        .reset_index(drop=True)
-    )
-
-    # PRICE REDUCTION
-    def compute_price_reduction(row):
-        prices = row[round_order]
-        valid_prices = prices.dropna()
-
-        if len(valid_prices) < 2:
-            return pd.Series({
-                "PRICE REDUCTION (VALUE)": np.nan, 
-                "PRICE REDUCTION (%)": np.nan
-            })
-
-        first_val = valid_prices.iloc[0]
-        last_val  = valid_prices.iloc[-1]
-
-        reduction_value = last_val - first_val
-        reduction_pct   = (reduction_value / first_val) * 100
-
-        return pd.Series({
-            "PRICE REDUCTION (VALUE)": reduction_value,
-            "PRICE REDUCTION (%)": round(reduction_pct, 2)
-        }) 
-    
-    df_pivot[["PRICE REDUCTION (VALUE)", "PRICE REDUCTION (%)"]] = (
-        df_pivot.apply(compute_price_reduction, axis=1)
-    )
-
-    # PRICE TREND
-    def detect_trend(row):
-        prices = row[round_order].values.astype(float)
-        prices = prices[~np.isnan(prices)]
-
-        if len(prices) <= 1:
-            return "Insufficient Data"
-        if all(prices[i] > prices[i+1] for i in range(len(prices)-1)):
-            return "Consistently Down"
-        if all(prices[i] < prices[i+1] for i in range(len(prices)-1)):
-            return "Consistently Up"
-        if len(set(prices)) == 1:
-            return "No Change"
-        
-        return "Fluctuating"
-    
-    df_pivot["PRICE TREND"] = df_pivot.apply(detect_trend, axis=1)
-
-    # PRICE STABILITY INDEX (PSI)
-    def compute_psi(row):
-        prices = row[round_order].astype(float)
-        prices = prices[~np.isnan(prices)]
-        if len(prices) == 0:
-            return np.nan
-        return ((prices.max() - prices.min()) / prices.mean()) * 100
-    
-    df_pivot["STANDARD DEVIATION"] = df_pivot[round_order].std(axis=1, ddof=0).round(4)
-    df_pivot["PRICE STABILITY INDEX (%)"] = df_pivot.apply(compute_psi, axis=1).round(2)
-
-    # Hapus helper column
-    df_pivot = df_pivot.drop(columns=["SCOPE_KEY"])
-
-    # Adding "TOTAL" columns
-    round_cols = round_order.copy()
-
-    total_rows = []
-    for vendor in df_pivot["VENDOR"].unique():
-        df_vendor = df_pivot[df_pivot["VENDOR"] == vendor]
-
-        # Hitung sum per ROUND
-        total_data = df_vendor[round_cols].sum(numeric_only=True)
-
-        # Buat row kosong
-        total_row = {col: np.nan for col in df_pivot.columns}
-
-        total_row["VENDOR"] = vendor
-        total_row[scope_cols[0]] = "TOTAL"
-
-        # Masukkan total ROUND
-        for col in round_cols:
-            total_row[col] = total_data[col]
-
-        total_rows.append(total_row)
+    # Harga per round, reduction, trend, PSI + TOTAL per vendor (tahap price_movement)
+    df_pivot = run["price_movement"]
+    vendor_col = df_pivot.columns[0]
 
-    df_total_rows = pd.DataFrame(total_rows)
-    df_pivot = pd.concat([df_pivot, df_total_rows], ignore_index=True)
+    # Slicer + tabel + download sebagai fragment: ganti filter hanya menjalankan
+    # ulang bagian ini di atas df_pivot dari run penuh terakhir
+    @st.fragment
+    def price_movement_section(df_pivot):
+        # Tambahkan slicer 
+        all_vendor = sorted(df_pivot[vendor_col].dropna().unique())
+        all_trend  = sorted(df_pivot["PRICE TREND"].dropna().unique())
+
+        col_sel_1, col_sel_2 = st.columns(2)
+        with col_sel_1:
+            selected_vendor = st.multiselect(
+                "Filter: Vendor",
+                options=all_vendor,
+                default=None,
+                placeholder="Choose one or more vendors",
+                key="filter_vendor"
+            )
+        with col_sel_2:
+            selected_trend = st.multiselect(
+                "Filter: Price Trend",
+                options=all_trend,
+                default=None,
+                placeholder="Choose one or more price trends",
+                key="filter_price_trend"
+            )
 
-    # Urutkan lagi: vendor tetap grouping
-    df_pivot = df_pivot.sort_values(["VENDOR", scope_cols[0]], key=lambda s: s.replace("TOTAL", "ZZZ"))
-    
-    # Tambahkan slicer 
-    all_vendor = sorted(df_pivot[vendor_col].dropna().unique())
-    all_trend  = sorted(df_pivot["PRICE TREND"].dropna().unique())
-
-    col_sel_1, col_sel_2 = st.columns(2)
-    with col_sel_1:
-        selected_vendor = st.multiselect(
-            "Filter: Vendor",
-            options=all_vendor,
-            default=None,
-            placeholder="Choose one or more vendors",
-            key="filter_vendor"
-        )
-    with col_sel_2:
-        selected_trend = st.multiselect(
-            "Filter: Price Trend",
-            options=all_trend,
-            default=None,
-            placeholder="Choose one or more price trends",
-            key="filter_price_trend"
-        )
+        # Terapkan filter dengan logika AND
+        if selected_vendor and selected_trend:
+            df_filter_pivot = df_pivot[
+                df_pivot["VENDOR"].isin(selected_vendor) &
+                df_pivot["PRICE TREND"].isin(selected_trend)
+            ]
+        elif selected_vendor:
+            df_filter_pivot = df_pivot[df_pivot["VENDOR"].isin(selected_vendor)]
+        elif selected_trend:
+            df_filter_pivot = df_pivot[df_pivot["PRICE TREND"].isin(selected_trend)]
+        else:
+            df_filter_pivot = df_pivot.copy()
+
+        # Format
+        num_cols = df_filter_pivot.select_dtypes(include=["number"]).columns
+        format_dict = rupiah_formats(df_filter_pivot, num_cols)
+        format_dict.update({
+            "PRICE REDUCTION (%)": "{:+.1f}%",
+            "PRICE STABILITY INDEX (%)": "{:.1f}%"
+        })
 
-    # Terapkan filter dengan logika AND
-    if selected_vendor and selected_trend:
-        df_filter_pivot = df_pivot[
-            df_pivot["VENDOR"].isin(selected_vendor) &
-            df_pivot["PRICE TREND"].isin(selected_trend)
-        ]
-    elif selected_vendor:
-        df_filter_pivot = df_pivot[df_pivot["VENDOR"].isin(selected_vendor)]
-    elif selected_trend:
-        df_filter_pivot = df_pivot[df_pivot["PRICE TREND"].isin(selected_trend)]
-    else:
-        df_filter_pivot = df_pivot.copy()
+        def style_pivot(frame):
+            return (
+                frame.style
+                .format(format_dict)
+                .apply(total_row_styles_v2, axis=None)
+            )
 
-    # Format
-    num_cols = df_filter_pivot.select_dtypes(include=["number"]).columns
-    format_dict = {col: format_rupiah for col in num_cols}
-    format_dict.update({
-        "PRICE REDUCTION (%)": "{:+.1f}%",
-        "PRICE STABILITY INDEX (%)": "{:.1f}%"
-    })
+        # Tampilkan
+        st.caption(f"✨ Total number of data entries: **{len(df_filter_pivot)}**")
+        paged_dataframe(df_filter_pivot, style_pivot, key="price_movement_upl_by_round", hide_index=True)
 
-    df_pivot_style = (
-        df_filter_pivot.style
-        .format(format_dict)
-        .apply(highlight_total_row_v2, axis=1)
-    )
+        # --- Prepare dataframe for Excel export ---
+        df_export = df_filter_pivot.copy()
 
-    # Tampilkan
-    st.caption(f"✨ Total number of data entries: **{len(df_filter_pivot)}**")
-    st.dataframe(df_pivot_style, hide_index=True)
+        # Replace NaN / Inf with empty string to avoid xlsxwriter error
+        df_export = price_movement_export(df_export)
 
-    # --- Prepare dataframe for Excel export ---
-    df_export = df_filter_pivot.copy()
+        # Simpan hasil ke variabel
+        excel_data = get_excel_download_highlight_price_trend(df_export)
 
-    # Replace NaN / Inf with empty string to avoid xlsxwriter error
-    df_export = df_export.replace([np.nan, np.inf, -np.inf], "")
+        # Layout tombol (rata kanan)
+        col1, col2, col3 = st.columns([2.3,2,1])
+        with col3:
+            st.download_button(
+                label="Download",
+                data=excel_data,
+                file_name="Price Movement Analysis - UPL by Round.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                icon=":material/download:"
+            )
 
-    # Simpan hasil ke variabel
-    excel_data = get_excel_download_highlight_price_trend(df_export)
+        return publish_frame("upl_by_round", "Price Movement Analysis", df_export)
 
-    # Layout tombol (rata kanan)
-    col1, col2, col3 = st.columns([2.3,2,1])
-    with col3:
-        st.download_button(
-            label="Download",
-            data=excel_data,
-            file_name="Price Movement Analysis - UPL by Round.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            icon=":material/download:"
-        )
+    df_export = price_movement_section(df_pivot)
 
     # VISUALIZATIONN
     st.markdown("##### 📊 Visualization")
@@ -1348,7 +956,7 @@ def page():
             ''')
 
             num_cols = win_table.select_dtypes(include=["number"]).columns
-            format_dict = {col: format_rupiah for col in num_cols}
+            format_dict = rupiah_formats(win_table, num_cols)
 
             win_table_styled = win_table.style.format(format_dict)
             st.dataframe(win_table_styled, hide_index=True)
@@ -1522,7 +1130,7 @@ def page():
             ''')
 
             num_cols = trend_table.select_dtypes(include=["number"]).columns
-            format_dict = {col: format_rupiah for col in num_cols}
+            format_dict = rupiah_formats(trend_table, num_cols)
 
             trend_table_styled = trend_table.style.format(format_dict)
             st.dataframe(trend_table_styled, hide_index=True)
@@ -1545,12 +1153,14 @@ def page():
 
     # SUPERRR BUTTONN
     st.markdown("##### 🧑‍💻 Super Download — Export Selected Sheets")
-    dataframes = {
+    # Dict bersama di session_state: fragment filter mengganti sheet-nya, dan
+    # tombol Download membaca dict ini saat diklik
+    dataframes = export_frames("upl_by_round", {
         "Merge Data": final_df,
-        "Pivot Table": df_pivot,
+        "Pivot Table": run["pivot"],   # df_pivot sudah diganti hasil price movement
         "Bid & Price Analysis": df_filtered_summary,
         "Price Movement Analysis": df_export
-    }
+    })
 
     # Tampilkan multiselect
     selected_sheets = st.multiselect(
@@ -1561,116 +1171,8 @@ def page():
 
     # Fungsi "Super Button" & Formatting
     def generate_multi_sheet_excel(selected_sheets, df_dict):
-
-        output = BytesIO()
-
-        with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
-            for sheet in selected_sheets:
-                df_raw = df_dict[sheet].copy()
-
-                # ===== COERCE NUMERIC SAFELY =====
-                df = df_raw.copy()
-                numeric_cols = []
-
-                for col in df.columns:
-                    coerced = pd.to_numeric(df[col], errors="coerce")
-                    if coerced.notna().any():
-                        df[col] = coerced
-                        numeric_cols.append(col)
-
-                pct_cols = [c for c in df.columns if "%" in c]
-
-                df.to_excel(writer, index=False, sheet_name=sheet)
-                workbook  = writer.book
-                worksheet = writer.sheets[sheet]
-
-                # ===== FORMAT =====
-                fmt_rupiah = workbook.add_format({"num_format": "#,##0"})
-                fmt_pct    = workbook.add_format({'num_format': '#,##0.0"%"'})
-
-                fmt_total = workbook.add_format({
-                    "bold": True,
-                    "bg_color": "#D9EAD3",
-                    "font_color": "#1A5E20",
-                    "num_format": "#,##0"
-                })
-
-                fmt_first = workbook.add_format({
-                    "bg_color": "#C6EFCE",
-                    "num_format": "#,##0"
-                })
-
-                fmt_second = workbook.add_format({
-                    "bg_color": "#FFEB9C",
-                    "num_format": "#,##0"
-                })
-
-                # ===== COLUMN FORMAT =====
-                for col_idx, col_name in enumerate(df.columns):
-                    if col_name in numeric_cols:
-                        worksheet.set_column(col_idx, col_idx, 15, fmt_rupiah)
-                    if col_name in pct_cols:
-                        worksheet.set_column(col_idx, col_idx, 15, fmt_pct)
-
-                # ===== LOOP DATA =====
-                for row_idx, row in enumerate(df.itertuples(index=False), start=1):
-
-                    is_total_row = any(
-                        isinstance(x, str) and x.strip().upper() == "TOTAL"
-                        for x in row
-                        if pd.notna(x)
-                    )
-
-                    # Bid & Price vendor index
-                    first_idx = second_idx = None
-                    if sheet == "Bid & Price Analysis":
-                        first_vendor  = row[df.columns.get_loc("1st Vendor")]
-                        second_vendor = row[df.columns.get_loc("2nd Vendor")]
-
-                        if first_vendor in numeric_cols:
-                            first_idx = df.columns.get_loc(first_vendor)
-                        if second_vendor in numeric_cols:
-                            second_idx = df.columns.get_loc(second_vendor)
-
-                    for col_idx, col_name in enumerate(df.columns):
-                        value = row[col_idx]
-                        fmt = None
-
-                        # ===== PICK FORMAT =====
-                        if sheet == "Bid & Price Analysis":
-                            if col_idx == first_idx:
-                                fmt = fmt_first
-                            elif col_idx == second_idx:
-                                fmt = fmt_second
-                        elif is_total_row:
-                            fmt = fmt_total
-
-                        # ===== WRITE CELL (TYPE SAFE) =====
-                        if pd.isna(value) or (isinstance(value, float) and np.isinf(value)):
-                            worksheet.write_blank(row_idx, col_idx, None, fmt)
-
-                        elif col_name in pct_cols:
-                            worksheet.write_number(
-                                row_idx, col_idx, value, fmt or fmt_pct
-                            )
-
-                        elif col_name in numeric_cols:
-                            worksheet.write_number(
-                                row_idx, col_idx, value, fmt or fmt_rupiah
-                            )
-
-                        else:
-                            worksheet.write(row_idx, col_idx, value, fmt)
-
-                # ===== AUTOFIT =====
-                for i, col in enumerate(df.columns):
-                    worksheet.set_column(
-                        i, i,
-                        max(len(str(col)), df[col].astype(str).map(len).max()) + 2
-                    )
-
-        output.seek(0)
-        return output.getvalue()
+        # Tiap sheet di-plan paralel di thread pool, lalu ditulis ke satu workbook
+        return build_super_download(SUPER_DOWNLOAD, df_dict, selected_sheets)
 
     # --- FRAGMENT UNTUK BALLOONS ---
     @st.fragment
@@ -1679,14 +1181,17 @@ def page():
 
     # ---- DOWNLOAD BUTTON ----
     if selected_sheets:
-        excel_bytes = generate_multi_sheet_excel(selected_sheets, dataframes)
+        excel_bytes = deferred(generate_multi_sheet_excel, selected_sheets, dataframes)
 
         st.download_button(
             label="Download",
             data=excel_bytes,
-            file_name="UPL Comparison Round by Round.xlsx",
+            file_name=SUPER_DOWNLOAD.file_name,
             mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
             on_click=release_the_balloons,
             type="primary",
             use_container_width=True,
-        )
\ No newline at end of file
+        )
+
+    # Tahap yang dihitung ulang vs diambil dari cache (INSPIRE_SHOW_STAGES=1)
+    stage_report(run, "upl_comparison_round")